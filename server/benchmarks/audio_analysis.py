@@ -0,0 +1,165 @@
+"""Benchmark del análisis de audio con pistas sintéticas de referencia
+
+Para cada duración sintetiza una pista de batería con beats y onsets
+conocidos, la escribe como WAV a 44.1 kHz y ejecuta las etapas del análisis
+por separado (load_audio, _detect_beats, _detect_onsets, _combine_events y
+_structure_events), igual que EventGenerator, con cada perfil de análisis
+(Config.AUDIO_PROFILES). Reporta el tiempo de cada
+etapa, el pico de memoria (tracemalloc, en una segunda pasada para no
+distorsionar los tiempos) y la F-measure con tolerancia de 50 ms.
+
+Todo corre en CPU y sin red. La salida es JSON para poder compararla
+entre commits.
+
+Uso (desde la raíz del repositorio):
+    python -m server.benchmarks.audio_analysis [duraciones en segundos...] [--profiles fast balanced]
+        [--output resultados.json]
+"""
+import os
+import json
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import librosa
+import numpy as np
+import soundfile as sf
+from typing import Dict, List
+from server.core.config import Config
+from server.core.audio_processor.beat_detection import AudioAnalyzer
+from server.core.audio_processor.event_generation import EventGenerator
+from server.core.audio_processor.analysis_cache import analysis_fingerprint
+from .synthetic import drum_track
+
+DEFAULT_DURATIONS = [30.0, 180.0, 600.0, 1800.0, 3600.0]
+SOURCE_SR = 44100
+TOLERANCE = 0.05
+STAGES = ['load_audio', '_detect_beats', '_detect_onsets', '_combine_events', '_structure_events']
+
+
+def f_measure(reference: np.ndarray, estimated: np.ndarray, tolerance: float = TOLERANCE) -> Dict[str, float]:
+    """Precisión, exhaustividad y F-measure con emparejamiento uno a uno dentro de la tolerancia"""
+    reference = np.sort(np.asarray(reference, dtype=float))
+    estimated = np.sort(np.asarray(estimated, dtype=float))
+    matched = 0
+    i = j = 0
+    # Ambas listas están ordenadas: emparejamiento voraz con dos punteros
+    while i < len(reference) and j < len(estimated):
+        diff = estimated[j] - reference[i]
+        if abs(diff) <= tolerance:
+            matched += 1
+            i += 1
+            j += 1
+        elif diff < 0:
+            j += 1
+        else:
+            i += 1
+
+    precision = matched / len(estimated) if len(estimated) else 0.0
+    recall = matched / len(reference) if len(reference) else 0.0
+    f = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {'precision': round(precision, 4), 'recall': round(recall, 4), 'f_measure': round(f, 4)}
+
+
+def _run_stages(path: str, duration: float, profile: str) -> Dict:
+    """Ejecuta las etapas en orden y devuelve sus tiempos y resultados"""
+    generator = EventGenerator(profile=profile)
+    analyzer = generator.analyzer
+    streaming = duration >= generator.cfg['streaming_threshold']
+    timings = {}
+
+    def timed(name, fn):
+        start = time.perf_counter()
+        result = fn()
+        timings[name] = time.perf_counter() - start
+        return result
+
+    if streaming:
+        y, tempo = timed('load_audio', lambda: analyzer.load_audio_streaming(path))
+    else:
+        y, tempo = timed('load_audio', lambda: analyzer.load_audio(path))
+    beats = timed('_detect_beats', lambda: analyzer._detect_beats(y))
+    onsets = timed('_detect_onsets', lambda: analyzer._detect_onsets(y))
+    event_times = timed('_combine_events', lambda: analyzer._combine_events(beats, onsets))
+    events = timed('_structure_events', lambda: generator._structure_events(list(event_times), y))
+
+    return {'streaming': streaming, 'tempo': tempo, 'timings': timings,
+            'beats': beats, 'onsets': onsets, 'events': events}
+
+
+def run(duration: float, work_dir: str, profiles: List[str], bpm: float = 120.0) -> List[Dict]:
+    y, beat_times, onset_times = drum_track(duration, sr=SOURCE_SR, bpm=bpm)
+    path = os.path.join(work_dir, f'drums_{int(duration)}s.wav')
+    sf.write(path, y, SOURCE_SR, subtype='PCM_16')
+    del y
+
+    results = [_measure(path, duration, profile, bpm, beat_times, onset_times) for profile in profiles]
+    os.remove(path)
+    return results
+
+
+def _measure(path: str, duration: float, profile: str, bpm: float,
+             beat_times: np.ndarray, onset_times: np.ndarray) -> Dict:
+    result = _run_stages(path, duration, profile)
+
+    # Segunda pasada sólo para medir memoria (tracemalloc ralentiza la ejecución)
+    tracemalloc.start()
+    _run_stages(path, duration, profile)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings = result['timings']
+    return {
+        'profile': profile,
+        'duration_s': duration,
+        'path': 'streaming' if result['streaming'] else 'batch',
+        'tempo': {'reference': bpm, 'estimated': round(float(result['tempo']), 2)},
+        'counts': {'beats': len(result['beats']), 'onsets': len(result['onsets']),
+                   'events': len(result['events'])},
+        'seconds': {name: round(timings[name], 4) for name in STAGES},
+        'total_seconds': round(sum(timings.values()), 4),
+        'realtime_factor': round(duration / sum(timings.values()), 1),
+        'peak_memory_mb': round(peak / 1024**2, 1),
+        'accuracy': {
+            'beats': f_measure(beat_times, result['beats']),
+            'onsets': f_measure(onset_times, result['onsets']),
+            # Los eventos están espaciados por min_event_interval: interesa sobre todo la precisión
+            'events': f_measure(onset_times, result['events'].start_times),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('durations', nargs='*', type=float, default=DEFAULT_DURATIONS)
+    parser.add_argument('--profiles', nargs='+', default=list(Config.AUDIO_PROFILES),
+                        choices=list(Config.AUDIO_PROFILES))
+    parser.add_argument('--output', help='Archivo JSON de salida (por defecto, salida estándar)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        # Calentar los kernels JIT de librosa antes de medir
+        run(5.0, work_dir, args.profiles)
+        results = [r for d in args.durations for r in run(d, work_dir, args.profiles)]
+
+    report = {
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'librosa': librosa.__version__,
+            'analysis_fingerprints': {p: analysis_fingerprint(Config.get_audio_profile(p)) for p in args.profiles},
+        },
+        'tolerance_s': TOLERANCE,
+        'results': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Benchmark y comprobaciones de EventBudgetPlanner
+
+Genera una canción sintética con introducción en silencio, un hueco
+silencioso a mitad y música (beats y onsets) en el resto, la reduce a
+varios presupuestos y comprueba:
+- que no hay más eventos con difusión que el presupuesto,
+- que los eventos siguen cubriendo la canción sin huecos,
+- que ningún evento silencioso absorbe música (tras la introducción
+  silenciosa, el primer evento con música se conserva).
+- que el plan empieza en 0 s.
+
+Además repite las comprobaciones con canciones aleatorias con muchos
+silencios (más que presupuesto) y con o sin introducción silenciosa.
+
+Uso (desde la raíz del repositorio):
+    python -m server.benchmarks.event_planner [presupuestos...] [--duration 240] [--trials 500]
+"""
+import json
+import time
+import argparse
+import numpy as np
+from typing import Dict
+from server.core.event_table import EventTable
+from server.core.audio_processor.event_planner import EventBudgetPlanner
+
+DEFAULT_BUDGETS = [10, 50, 150]
+
+
+def synthetic_events(duration: float, intro: float = 12.0, gap: tuple = (100.0, 120.0), seed: int = 0) -> EventTable:
+    rng = np.random.default_rng(seed)
+    starts = np.arange(0.0, duration, 0.5) + rng.uniform(0.0, 0.1, int(np.ceil(duration / 0.5)))
+    starts[0] = 0.0
+    ends = np.append(starts[1:], duration)
+    silent = (starts < intro) | ((starts >= gap[0]) & (starts < gap[1]))
+    return EventTable.from_columns(
+        starts, ends,
+        rng.choice(['beat', 'onset'], len(starts)),
+        np.where(silent, 0.0, rng.random(len(starts))),
+        silent=[bool(s) or None for s in silent],
+    )
+
+
+def check(events: EventTable, planned: EventTable, budget: int) -> Dict:
+    silent = np.array([bool(s) for s in events.column('silent')], dtype=bool)
+    planned_silent = np.array([bool(s) for s in planned.column('silent')], dtype=bool)
+    merged = np.array([m if m is not None else 1 for m in planned.column('merged')], dtype=int)
+    first = np.searchsorted(events.start_times, planned.start_times)
+
+    # Eventos silenciosos conservados que se tragaron eventos con música
+    absorbed = [int(i) for i, count in zip(first[planned_silent], merged[planned_silent])
+                if not silent[i:i + count].all()]
+    music_start = events.start_times[np.flatnonzero(~silent)[0]]
+    return {
+        'within_budget': int((~planned_silent).sum()) <= budget,
+        'contiguous': bool(np.allclose(planned.end_times[:-1], planned.start_times[1:])
+                           and planned.end_times[-1] == events.end_times[-1]),
+        'silent_absorbs_music': len(absorbed) > 0,
+        'intro_music_kept': bool(np.any(planned.start_times[~planned_silent] == music_start)),
+        'starts_at_zero': bool(planned.start_times[0] == 0.0),
+    }
+
+
+def gappy_events(rng: np.random.Generator) -> EventTable:
+    """Canción aleatoria con muchos silencios cortos, con o sin introducción silenciosa"""
+    n = int(rng.integers(20, 400))
+    starts = np.cumsum(rng.uniform(0.2, 1.0, n))
+    starts[0] = 0.0
+    ends = np.append(starts[1:], starts[-1] + 1.0)
+    silent = rng.random(n) < rng.uniform(0.1, 0.6)
+    # Siempre algo de música
+    silent[int(rng.integers(0, n))] = False
+    return EventTable.from_columns(
+        starts, ends,
+        rng.choice(['beat', 'onset', 'lyric'], n),
+        np.where(silent, 0.0, rng.random(n)),
+        silent=[bool(s) or None for s in silent],
+    )
+
+
+def check_many_gaps(trials: int, seed: int = 1) -> Dict:
+    rng = np.random.default_rng(seed)
+    planner = EventBudgetPlanner({'max_images': 500, 'images_per_minute': None})
+    worst = 0.0
+    for _ in range(trials):
+        events = gappy_events(rng)
+        budget = int(rng.integers(1, 40))
+        planned = planner.plan(events, float(events.end_times[-1]), budget)
+        result = check(events, planned, budget)
+        assert result['within_budget'] and result['starts_at_zero'], (budget, result)
+        assert result['contiguous'] and not result['silent_absorbs_music'], (budget, result)
+        assert result['intro_music_kept'], (budget, result)
+        diffusion = sum(not s for s in planned.column('silent'))
+        worst = max(worst, diffusion / budget)
+    return {'trials': trials, 'max_diffusion_over_budget': round(worst, 3)}
+
+
+def run(duration: float, budgets, trials: int = 500) -> Dict:
+    events = synthetic_events(duration)
+    planner = EventBudgetPlanner({'max_images': max(budgets), 'images_per_minute': None})
+    results = []
+    for budget in budgets:
+        start = time.perf_counter()
+        planned = planner.plan(events, duration, budget)
+        elapsed = time.perf_counter() - start
+        result = {'budget': budget, 'events': len(planned), 'ms': round(elapsed * 1000, 3),
+                  **check(events, planned, budget)}
+        assert result['within_budget'] and result['contiguous'], result
+        assert not result['silent_absorbs_music'] and result['intro_music_kept'], result
+        assert result['starts_at_zero'], result
+        results.append(result)
+    silent = sum(bool(s) for s in events.column('silent'))
+    return {'duration': duration, 'events': len(events), 'silent_events': silent, 'results': results,
+            'many_gaps': check_many_gaps(trials)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de EventBudgetPlanner")
+    parser.add_argument('budgets', nargs='*', type=int, default=DEFAULT_BUDGETS)
+    parser.add_argument('--duration', type=float, default=240.0)
+    parser.add_argument('--trials', type=int, default=500, help="Canciones aleatorias con muchos silencios")
+    args = parser.parse_args()
+    print(json.dumps(run(args.duration, args.budgets, args.trials), indent=2))
+
+
+if __name__ == "__main__":
+    main()
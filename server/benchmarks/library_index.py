@@ -0,0 +1,91 @@
+"""Benchmark de consultas al índice de la biblioteca
+
+Llena un LibraryIndex temporal con pistas sintéticas (tempo, duración y
+energía aleatorios) y mide la escritura y varias consultas típicas. La
+salida es JSON para poder compararla entre commits.
+
+Uso (desde la raíz del repositorio):
+    python -m server.benchmarks.library_index [número de pistas...] [--repeat 20]
+"""
+import json
+import time
+import argparse
+import platform
+import tempfile
+import numpy as np
+from typing import Dict
+from server.core.audio_processor.library_index import LibraryIndex
+
+DEFAULT_SIZES = [10_000, 100_000, 250_000]
+QUERIES = {
+    '120-128 bpm, high energy': dict(tempo=(120, 128), energy='high'),
+    '120-128 bpm, octaves': dict(tempo=(120, 128), tempo_octaves=True),
+    'short and calm': dict(duration=(None, 180), energy='low', order_by='duration', descending=False),
+    'all, by tempo': dict(order_by='tempo'),
+}
+
+
+def synthetic_rows(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    tempo = rng.normal(118, 20, n).clip(60, 200)
+    duration = rng.gamma(9, 25, n).clip(30, 3600)
+    energy = rng.beta(2, 3, n)
+    for i in range(n):
+        yield {
+            'audio_hash': f'{i:064x}',
+            'tempo': tempo[i],
+            'duration': duration[i],
+            'event_density': tempo[i] / 2,
+            'energy': energy[i],
+            'energy_peak': min(1.0, energy[i] * 1.5),
+            'energy_profile': np.full(LibraryIndex.PROFILE_BINS, energy[i], dtype=np.float32),
+            'sections': 4,
+            'added_at': 0.0,
+        }
+
+
+def run(n: int, repeat: int) -> Dict:
+    with tempfile.TemporaryDirectory() as index_dir:
+        index = LibraryIndex(index_dir)
+        start = time.perf_counter()
+        index.add_many(synthetic_rows(n))
+        write = time.perf_counter() - start
+
+        # Una actualización de una sola pista, como al terminar un trabajo
+        start = time.perf_counter()
+        index.add_many(synthetic_rows(1, seed=1))
+        single = time.perf_counter() - start
+
+        reader = LibraryIndex(index_dir)
+        start = time.perf_counter()
+        reader.columns()
+        load = time.perf_counter() - start
+
+        queries = {}
+        for name, kwargs in QUERIES.items():
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                result = reader.query(limit=100, **kwargs)
+                times.append(time.perf_counter() - start)
+            queries[name] = {'matches': result['count'], 'median_ms': round(1000 * float(np.median(times)), 3)}
+
+    return {'tracks': n, 'bulk_write_s': round(write, 3), 'single_update_ms': round(1000 * single, 2),
+            'load_ms': round(1000 * load, 3), 'queries': queries}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('sizes', nargs='*', type=int, default=DEFAULT_SIZES)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    report = {
+        'environment': {'python': platform.python_version(), 'numpy': np.__version__},
+        'results': [run(n, args.repeat) for n in args.sizes],
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
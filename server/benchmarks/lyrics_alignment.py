@@ -0,0 +1,95 @@
+"""Benchmark de la asignación de letras a eventos
+
+Genera eventos de audio (beats y onsets a intervalos aleatorios) y líneas
+de letra sintéticas (LRC extendido, con tiempo por palabra) sobre la
+misma duración y mide parse_lrc y LyricsHandler._assign_lyrics_to_events.
+El caso por defecto, 10k eventos y 2k líneas, corresponde a una mezcla
+larga con letra. La salida es JSON para poder compararla entre commits.
+
+Uso (desde la raíz del repositorio):
+    python -m server.benchmarks.lyrics_alignment [eventos:líneas...] [--repeat 5]
+"""
+import json
+import time
+import argparse
+import platform
+import numpy as np
+from typing import Dict, List, Tuple
+from server.core.event_table import EventTable
+from server.core.lyrics_handler import LyricsHandler
+from server.core.lyrics_handler.lrc_parser import parse_lrc
+
+DEFAULT_SIZES = ['1000:200', '10000:2000', '50000:10000']
+
+
+def synthetic_song(n_events: int, n_lines: int, seed: int = 0) -> Tuple[EventTable, List[Tuple[float, str]]]:
+    rng = np.random.default_rng(seed)
+    # Unos 4 eventos por segundo, como un perfil normal a ~120 bpm
+    starts = np.cumsum(rng.exponential(0.25, n_events))
+    events = EventTable.from_columns(
+        starts,
+        starts + rng.uniform(0.1, 2.0, n_events),
+        rng.choice(['beat', 'onset'], n_events),
+        rng.random(n_events),
+    )
+    duration = float(starts[-1]) if n_events else 60.0
+    times = np.sort(rng.uniform(0.0, duration * 1.05, n_lines))
+    lyrics = [(float(t), f"línea {i} de la canción") for i, t in enumerate(times)]
+    return events, lyrics
+
+
+def _stamp(time: float) -> str:
+    minutes, seconds = divmod(time, 60)
+    return f"{int(minutes):02d}:{seconds:05.2f}"
+
+
+def synthetic_lrc(lyrics: List[Tuple[float, str]]) -> str:
+    """LRC extendido: cada palabra con su tiempo, separadas 0.3 s"""
+    lines = ['[ar:Synthetic]', '[ti:Benchmark]', '[offset:+100]']
+    for time, text in lyrics:
+        words = ' '.join(f"<{_stamp(time + 0.3 * i)}>{word}" for i, word in enumerate(text.split()))
+        lines.append(f"[{_stamp(time)}]{words}")
+    return '\n'.join(lines)
+
+
+def run(n_events: int, n_lines: int, repeat: int) -> Dict:
+    events, lyrics = synthetic_song(n_events, n_lines)
+    # Sin __init__: sólo se mide la asignación, no la caché ni las búsquedas
+    handler = LyricsHandler.__new__(LyricsHandler)
+    lrc = synthetic_lrc(lyrics)
+    parse_timings, timings = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parsed = parse_lrc(lrc)
+        parse_timings.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        result = handler._assign_lyrics_to_events(events, parsed, 0.5)
+        timings.append(time.perf_counter() - start)
+    types = result.column('type')
+    return {
+        'events': n_events,
+        'lyric_lines': n_lines,
+        'output_events': len(result),
+        'lyric_events': int(np.sum(types == 'lyric')),
+        'words': len(parsed.word_times),
+        'parse_best_ms': round(min(parse_timings) * 1000, 2),
+        'best_ms': round(min(timings) * 1000, 2),
+        'median_ms': round(float(np.median(timings)) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la asignación de letras")
+    parser.add_argument('sizes', nargs='*', default=DEFAULT_SIZES, help="eventos:líneas")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        n_events, n_lines = (int(value) for value in size.split(':'))
+        results.append(run(n_events, n_lines, args.repeat))
+    print(json.dumps({'python': platform.python_version(), 'results': results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Comprobaciones de la caché de letras contra un servidor lrclib local
+
+Levanta un servidor HTTP de pega (http.server) que imita /api/get y
+/api/search de lrclib y cuenta las peticiones, y comprueba con una caché
+SQLite temporal que:
+- un acierto en caché no hace ninguna petición,
+- un "sin letra" se guarda, no repite la petición y caduca tras su TTL,
+- las búsquedas simultáneas de la misma pista se agrupan en una sola
+  (search_many, que es lo que usa prefetch),
+- una entrada caducada más cercana en duración no oculta una vigente, y
+  un "sin letra" sin duración no responde a búsquedas con duración,
+- un candidato sólo con letra plana se guarda como "sin letra" (TTL
+  negativo), no como acierto.
+
+Uso (desde la raíz del repositorio):
+    python -m server.benchmarks.lyrics_cache [--delay 0.2] [--concurrency 16]
+"""
+import json
+import time
+import sqlite3
+import asyncio
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from typing import Dict, List
+from server.core.lyrics_handler.api_lyrics import LyricsFetcher
+from server.core.lyrics_handler.lyrics_cache import LyricsCache, MISSING
+
+SONGS = [
+    {'id': 1, 'trackName': 'Song', 'artistName': 'Band', 'albumName': 'Album', 'duration': 200,
+     'syncedLyrics': '[00:01.00]hola\n[00:03.00]mundo', 'plainLyrics': 'hola\nmundo'},
+    {'id': 2, 'trackName': 'Plain', 'artistName': 'Band', 'albumName': 'Album', 'duration': 150,
+     'syncedLyrics': None, 'plainLyrics': 'sólo\ntexto'},
+]
+
+
+class StubLrclib:
+    """Servidor lrclib mínimo en un hilo, con retardo configurable por petición"""
+
+    def __init__(self, songs: List[Dict], delay: float = 0.0):
+        self.songs = songs
+        self.delay = delay
+        self.requests = []
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                with stub._lock:
+                    stub.requests.append(url.path)
+                time.sleep(stub.delay)
+                code, body = stub.respond(url.path, query)
+                payload = json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def respond(self, path: str, query: Dict[str, str]):
+        title = query.get('track_name', '').lower()
+        matches = [s for s in self.songs if s['trackName'].lower() == title]
+        if path == '/api/search':
+            return 200, matches
+        if path == '/api/get':
+            matches = [s for s in matches if s['artistName'].lower() == query.get('artist_name', '').lower()
+                       and abs(s['duration'] - float(query.get('duration', 0))) <= 2]
+            return (200, matches[0]) if matches else (404, {'code': 404})
+        return 404, {}
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def check_hit(stub: StubLrclib, db: str) -> Dict:
+    fetcher = LyricsFetcher(LyricsCache(db), stub.url)
+    first = fetcher.search_lyrics('Band', 'Song', 200.4)
+    before = len(stub.requests)
+    # Misma pista con otra forma del título y duración dentro de la tolerancia
+    second = LyricsFetcher(LyricsCache(db), stub.url).search_lyrics('BAND', 'Song (Remastered 2011)', 201.0)
+    assert first and first['id'] == 1, first
+    assert second == first, second
+    assert len(stub.requests) == before, "cache hit went to the network"
+    return {'first_requests': before, 'hit_requests': len(stub.requests) - before}
+
+
+def check_negative(stub: StubLrclib, db: str, ttl: float) -> Dict:
+    cache = LyricsCache(db, negative_ttl=ttl)
+    fetcher = LyricsFetcher(cache, stub.url)
+    start = len(stub.requests)
+    assert fetcher.search_lyrics('Nobody', 'Unknown Song', 180) is None
+    miss_requests = len(stub.requests) - start
+    assert miss_requests > 0
+    assert fetcher.search_lyrics('Nobody', 'Unknown Song', 180) is None
+    assert len(stub.requests) - start == miss_requests, "negative result was not cached"
+
+    time.sleep(ttl + 0.1)
+    assert fetcher.search_lyrics('Nobody', 'Unknown Song', 180) is None
+    assert len(stub.requests) - start == 2 * miss_requests, "negative entry did not expire"
+    return {'miss_requests': miss_requests, 'negative_ttl': ttl}
+
+
+def check_coalescing(stub: StubLrclib, db: str, concurrency: int) -> Dict:
+    fetcher = LyricsFetcher(LyricsCache(db), stub.url)
+    start = len(stub.requests)
+    began = time.perf_counter()
+    results = asyncio.run(fetcher.search_many([('Band', 'Song', None, 200)] * concurrency, concurrency))
+    elapsed = time.perf_counter() - began
+    assert all(r and r['id'] == 1 for r in results), results
+    # Una sola búsqueda (exacta) para todas las peticiones simultáneas
+    requests_made = len(stub.requests) - start
+    assert requests_made == 1, f"{requests_made} requests for {concurrency} concurrent lookups"
+    return {'concurrent_lookups': concurrency, 'requests': requests_made, 'seconds': round(elapsed, 3)}
+
+
+def check_expiry_order(db: str) -> Dict:
+    cache = LyricsCache(db, ttl=60, negative_ttl=60)
+    cache.put('Band', 'Song', 200.0, {'id': 1})
+    cache.put('Band', 'Song', 201.0, {'id': 2})
+    # La entrada exacta caducó: debe responder la vecina vigente
+    with sqlite3.connect(db) as conn:
+        conn.execute("UPDATE lyrics SET fetched_at = 0 WHERE duration = 200.0")
+    assert cache.get('Band', 'Song', 200.0) == {'id': 2}, "expired nearest row hid a fresh one"
+
+    cache.put('Nobody', 'Unknown', None, None)
+    assert cache.get('Nobody', 'Unknown') is MISSING
+    assert cache.get('Nobody', 'Unknown', 180.0) is None, "duration-less miss answered a lookup with duration"
+    return {'fresh_neighbour': True, 'durationless_miss_scoped': True}
+
+
+def check_plain_only(stub: StubLrclib, db: str) -> Dict:
+    cache = LyricsCache(db, ttl=3600, negative_ttl=60)
+    assert LyricsFetcher(cache, stub.url).search_lyrics('Band', 'Plain', 150) is None
+    with sqlite3.connect(db) as conn:
+        stored = conn.execute("SELECT result FROM lyrics WHERE title = 'plain'").fetchone()
+    assert stored == (None,), f"plain-only candidate cached as a hit: {stored}"
+    return {'plain_only_cached_as_miss': True}
+
+
+def run(delay: float, concurrency: int, ttl: float = 1.0) -> Dict:
+    with tempfile.TemporaryDirectory() as work_dir, StubLrclib(SONGS, delay) as stub:
+        return {
+            'hit': check_hit(stub, str(Path(work_dir) / 'hit.db')),
+            'negative': check_negative(stub, str(Path(work_dir) / 'negative.db'), ttl),
+            'coalescing': check_coalescing(stub, str(Path(work_dir) / 'coalescing.db'), concurrency),
+            'expiry_order': check_expiry_order(str(Path(work_dir) / 'expiry.db')),
+            'plain_only': check_plain_only(stub, str(Path(work_dir) / 'plain.db')),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comprobaciones de la caché de letras")
+    parser.add_argument('--delay', type=float, default=0.2, help="Retardo del servidor por petición (s)")
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+    print(json.dumps(run(args.delay, args.concurrency), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Benchmark de la detección incremental frente al análisis completo
+
+Sintetiza una pista de batería con beats y onsets conocidos, la escribe
+como WAV y la pasa bloque a bloque por OnlineEventDetector, como si
+llegara por la red. Para cada evento mide el retardo entre su instante y
+el momento en que se emitió (en tiempo de señal: muestras entregadas
+hasta entonces) y compara la F-measure de beats, onsets y eventos con la
+del análisis completo (AudioAnalyzer) sobre el mismo archivo. También
+comprueba que los buffers del detector no crecen con la duración.
+
+Uso (desde la raíz del repositorio):
+    python -m server.benchmarks.online_detection [duración] [--chunk-seconds 0.5] [--output resultados.json]
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+import numpy as np
+import soundfile as sf
+from typing import Dict
+from server.core.audio_processor.beat_detection import AudioAnalyzer
+from server.core.audio_processor.online import OnlineEventDetector, events_table, wav_chunks
+from .audio_analysis import f_measure, SOURCE_SR
+from .synthetic import drum_track
+
+
+def run(duration: float, chunk_seconds: float, work_dir: str, bpm: float = 120.0) -> Dict:
+    y, beat_times, onset_times = drum_track(duration, sr=SOURCE_SR, bpm=bpm)
+    path = os.path.join(work_dir, f'drums_{int(duration)}s.wav')
+    sf.write(path, y, SOURCE_SR, subtype='PCM_16')
+
+    detector = OnlineEventDetector()
+    detector.start(SOURCE_SR)
+    events, beats, delays, received, buffer_frames = [], [], [], 0, 0
+    start = time.perf_counter()
+    for chunk in wav_chunks(path, chunk_seconds):
+        received += len(chunk)
+        new_events = detector.push(chunk)
+        for event in new_events:
+            delays.append(received / SOURCE_SR - event['start_time'])
+        events.extend(new_events)
+        beats.extend(detector.beat_times)
+        buffer_frames = max(buffer_frames, len(detector._env), len(detector._frame_rms))
+    events.extend(detector.flush())
+    beats.extend(detector.beat_times)
+    online_seconds = time.perf_counter() - start
+    online = events_table(events, detector.duration)
+
+    # Memoria acotada: la ventana del tempo más un bloque, con holgura por la duplicación
+    frame_rate = detector.cfg['sr'] / detector.cfg['hop_length']
+    buffer_bound = 2 * (detector._horizon + int(np.ceil(chunk_seconds * frame_rate)) + 8)
+    assert buffer_frames <= buffer_bound, (buffer_frames, buffer_bound)
+
+    analyzer = AudioAnalyzer()
+    start = time.perf_counter()
+    y, _ = analyzer.load_audio(path)
+    offline = analyzer.detect_events(y)
+    offline_seconds = time.perf_counter() - start
+    os.remove(path)
+
+    return {
+        'duration_s': duration,
+        'chunk_seconds': chunk_seconds,
+        'latency_bound_s': round(detector.latency, 4),
+        'delay_s': {'median': round(float(np.median(delays)), 4), 'max': round(float(np.max(delays)), 4)},
+        'seconds': {'online': round(online_seconds, 4), 'offline': round(offline_seconds, 4)},
+        'counts': {'online': len(online), 'offline': len(offline)},
+        'buffer_frames': {'max': buffer_frames, 'bound': buffer_bound},
+        'accuracy': {
+            'online_beats': f_measure(beat_times, np.asarray(beats)),
+            'offline_beats': f_measure(beat_times, analyzer._detect_beats(y)),
+            'online_events': f_measure(onset_times, online.start_times),
+            'offline_events': f_measure(onset_times, offline),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('duration', nargs='?', type=float, default=180.0)
+    parser.add_argument('--chunk-seconds', type=float, default=0.5)
+    parser.add_argument('--output', help='Archivo JSON de salida (por defecto, salida estándar)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        # Calentar los kernels JIT de librosa antes de medir
+        run(5.0, args.chunk_seconds, work_dir)
+        result = run(args.duration, args.chunk_seconds, work_dir)
+
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
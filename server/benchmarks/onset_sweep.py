@@ -0,0 +1,61 @@
+"""Benchmark del barrido de sensibilidad de onsets
+
+Compara, sobre pistas sintéticas de distinta duración:
+- 'waveform': el método original (onset_detect desde la forma de onda, 4 veces)
+- 'librosa':  onset_detect sobre la envolvente compartida
+- 'vectorized': una envolvente normalizada y selección de picos vectorizada
+
+Uso (desde la raíz del repositorio):
+    python -m server.benchmarks.onset_sweep [duraciones en segundos...]
+"""
+import sys
+import time
+import json
+import librosa
+import numpy as np
+from server.core.config import Config
+from server.core.audio_processor.beat_detection import AudioAnalyzer
+from .synthetic import drum_track
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def run(duration: float) -> dict:
+    sr = Config.AUDIO['sr']
+    y, _, _ = drum_track(duration, sr=sr)
+
+    def waveform_sweep():
+        results = [librosa.onset.onset_detect(y=y, sr=sr, units='time', **params)
+                   for params in AudioAnalyzer.ONSET_SENSITIVITY_LEVELS]
+        return max(results, key=len)
+
+    timings = {}
+    outputs = {}
+    outputs['waveform'], timings['waveform'] = _timed(waveform_sweep)
+
+    for mode in ('librosa', 'vectorized'):
+        analyzer = AudioAnalyzer()
+        analyzer.cfg = {**Config.AUDIO, 'onset_sweep': mode}
+        # La envolvente compartida se calcula fuera de la medición
+        _ = analyzer.get_features(y).onset_envelope
+        outputs[mode], timings[mode] = _timed(lambda: analyzer._detect_onsets(y))
+
+    return {
+        'duration_s': duration,
+        'onsets': len(outputs['vectorized']),
+        'identical': all(np.array_equal(outputs['waveform'], outputs[m]) for m in ('librosa', 'vectorized')),
+        'seconds': {k: round(v, 4) for k, v in timings.items()},
+        'speedup_vs_waveform': round(timings['waveform'] / timings['vectorized'], 1),
+        'speedup_vs_librosa': round(timings['librosa'] / timings['vectorized'], 1),
+    }
+
+
+if __name__ == "__main__":
+    durations = [float(d) for d in sys.argv[1:]] or [60.0, 480.0, 1800.0]
+    # Calentar los kernels JIT de librosa antes de medir
+    run(5.0)
+    print(json.dumps([run(d) for d in durations], indent=2))
@@ -0,0 +1,87 @@
+"""Escalado del análisis paralelo por fragmentos frente al número de procesos
+
+Para cada número de procesos calcula las características compartidas
+(ParallelFeatureBundle) y detecta los eventos, y los compara con el
+AudioFeatureBundle en un solo proceso: los eventos, RMS, centroide,
+bandas y tempos deben ser idénticos bit a bit; mel, croma y las
+envolventes (productos de matrices, que BLAS redondea según el ancho)
+deben coincidir con tolerancia de float32. Falla si alguno difiere.
+
+Uso (desde la raíz del repositorio):
+    python -m server.benchmarks.parallel_scaling [duración en segundos] [procesos...]
+"""
+import os
+import sys
+import time
+import json
+import numpy as np
+from server.core.config import Config
+from server.core.audio_processor.beat_detection import AudioAnalyzer
+from server.core.audio_processor.features import AudioFeatureBundle
+from .synthetic import drum_track
+
+
+EXACT_FEATURES = ('rms', 'spectral_centroid', 'band_energy', 'tempo', 'beat_tempo')
+# Dependen de productos de matrices por fragmento: difieren en ~1 ulp
+CLOSE_FEATURES = ('onset_envelope', 'beat_envelope', 'mel_db', 'chroma')
+
+
+def _detect(y: np.ndarray, workers: int):
+    analyzer = AudioAnalyzer()
+    analyzer.cfg = {**Config.AUDIO, 'parallel_workers': workers, 'parallel_min_seconds': 0}
+    start = time.perf_counter()
+    features = analyzer.get_features(y)
+    _ = features.tempo, features.rms, features.spectral_centroid
+    beats = analyzer._detect_beats(y)
+    onsets = analyzer._detect_onsets(y)
+    events = analyzer._combine_events(beats, onsets)
+    return events, time.perf_counter() - start, analyzer.features
+
+
+def _differences(reference: AudioFeatureBundle, features: AudioFeatureBundle):
+    """(características fuera de tolerancia, máxima diferencia relativa de las aproximadas)"""
+    different, max_rel = [], 0.0
+    for name in EXACT_FEATURES + CLOSE_FEATURES:
+        a, b = np.asarray(getattr(reference, name)), np.asarray(getattr(features, name))
+        if a.dtype != b.dtype or a.shape != b.shape:
+            different.append(name)
+        elif name in EXACT_FEATURES:
+            if not np.array_equal(a, b):
+                different.append(name)
+        else:
+            scale = max(float(np.max(np.abs(a))), 1e-12)
+            rel = float(np.max(np.abs(a.astype(np.float64) - b))) / scale
+            max_rel = max(max_rel, rel)
+            if rel > 1e-5:
+                different.append(name)
+    return different, max_rel
+
+
+def run(duration: float, worker_counts) -> dict:
+    y = drum_track(duration, sr=Config.AUDIO['sr'])[0]
+    reference, serial_time, serial_features = _detect(y, 1)
+    assert type(serial_features) is AudioFeatureBundle
+    results = [{'workers': 1, 'seconds': round(serial_time, 3), 'speedup': 1.0, 'events_identical': True}]
+    for workers in worker_counts:
+        if workers <= 1:
+            continue
+        events, elapsed, features = _detect(y, workers)
+        different, max_rel = _differences(serial_features, features)
+        assert not different, f"{workers} workers: {different} differ from the serial bundle"
+        assert np.array_equal(reference, events), f"{workers} workers: events differ"
+        results.append({
+            'workers': workers,
+            'seconds': round(elapsed, 3),
+            'speedup': round(serial_time / elapsed, 2),
+            'events_identical': True,
+            'max_relative_diff': max_rel,
+        })
+    return {'duration_s': duration, 'cpu_count': os.cpu_count(), 'events': len(reference), 'results': results}
+
+
+if __name__ == "__main__":
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 600.0
+    counts = [int(c) for c in sys.argv[2:]] or sorted({2, 4, os.cpu_count() or 1})
+    # Calentar los kernels JIT de librosa antes de medir
+    run(5.0, [2])
+    print(json.dumps(run(duration, counts), indent=2))
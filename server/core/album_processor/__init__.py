@@ -1,6 +1,6 @@
 from .cover_extractor import CoverExtractor
 from .color_palette import ColorPaletteExtractor
-import os
+from ..audio_asset import AudioAsset
 
 class AlbumProcessor:
     def __init__(self, n_colors=5):
@@ -8,22 +8,16 @@ class AlbumProcessor:
         self.cover_extractor = CoverExtractor()
         self.palette_extractor = ColorPaletteExtractor(n_colors=n_colors)
     
-    def process_album(self, mp3_path: str) -> dict:
-        """Procesa un archivo MP3 para extraer paleta de colores de la portada
+    def process_album(self, audio, describe: bool = True) -> dict:
+        """Extrae la paleta de colores de la portada de un AudioAsset (o ruta de audio)
+
+        Con describe=False se omiten los nombres de los colores (ver ColorPaletteExtractor)
         
         Returns:
             Diccionario con información de la paleta o None si no hay portada
         """
-        cover_path = self.cover_extractor.extract_cover(mp3_path)
-        if not cover_path:
+        cover = AudioAsset.coerce(audio).cover_image()
+        if cover is None:
             return None
         
-        palette = self.palette_extractor.extract_palette(cover_path)
-        
-        # Limpiar archivo temporal
-        try:
-            os.unlink(cover_path)
-        except:
-            pass
-        
-        return palette
\ No newline at end of file
+        return self.palette_extractor.extract_palette(cover, describe)
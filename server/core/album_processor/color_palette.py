@@ -10,8 +10,11 @@ class ColorPaletteExtractor:
         self.n_colors = n_colors
         self.resize = resize
     
-    def extract_palette(self, image_path: str) -> dict:
-        """Extrae la paleta de colores dominantes de una imagen
+    def extract_palette(self, image, describe: bool = True) -> dict:
+        """Extrae la paleta de colores dominantes de una imagen (ruta o imagen PIL)
+
+        Con describe=False no se consultan los nombres de los colores (API
+        externa) y 'prompt_description' queda vacío.
         
         Returns:
             Diccionario con:
@@ -20,8 +23,8 @@ class ColorPaletteExtractor:
             - 'color_names': Nombres aproximados de colores
         """
         # 1. Cargar y redimensionar imagen
-        img = Image.open(image_path)
-        img = img.resize(self.resize)
+        img = image if isinstance(image, Image.Image) else Image.open(image)
+        img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB').resize(self.resize)
         img_array = np.array(img)
         
         # 2. Convertir a lista de píxeles
@@ -48,7 +51,7 @@ class ColorPaletteExtractor:
 
         # 7. Obtener nombres de colores
         color_names = []
-        for color in hex_colors:
+        for color in (hex_colors if describe else []):
             name = self.get_color_name(color)
             if name:
                 color_names.append(name)
@@ -56,7 +59,7 @@ class ColorPaletteExtractor:
         return {
             'hex_colors': hex_colors,
             'rgb_colors': [tuple(color) for color in sorted_colors],
-            'prompt_description': self.create_prompt_description(color_names)
+            'prompt_description': self.create_prompt_description(color_names) if color_names else ''
         }
     
     @staticmethod
@@ -1,38 +1,30 @@
 import tempfile
-from mutagen.id3 import ID3, APIC
-from mutagen.mp3 import MP3
+from ..audio_asset import AudioAsset
 
 class CoverExtractor:
     @staticmethod
-    def extract_cover(mp3_path: str) -> str:
-        """Extrae la portada de un MP3 y guarda como archivo temporal
+    def extract_cover(audio) -> str:
+        """Guarda la portada de un archivo de audio (o AudioAsset) como archivo temporal
+
+        Sólo para quien necesite una ruta: las etapas del procesamiento usan
+        directamente AudioAsset.cover / AudioAsset.cover_image().
         
         Returns:
             Ruta del archivo temporal de la imagen o None si no hay portada
         """
         try:
-            audio = MP3(mp3_path, ID3=ID3)
-            
-            # Buscar todas las imágenes
-            images = []
-            for tag in audio.tags.values():
-                if isinstance(tag, APIC):
-                    images.append(tag)
-            
-            if not images:
+            asset = AudioAsset.coerce(audio)
+            if not asset.has_cover:
                 return None
-                
-            # Seleccionar la imagen de mayor tamaño (Portada)
-            largest_image = max(images, key=lambda img: len(img.data))
             
             # Determinar extensión
-            ext = 'jpg' if largest_image.mime == 'image/jpeg' else 'png'
+            ext = 'png' if asset.cover_mime == 'image/png' else 'jpg'
             
             # Crear archivo temporal
             with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{ext}') as temp_file:
-                temp_file.write(largest_image.data)
+                temp_file.write(asset.cover)
                 return temp_file.name
                 
         except Exception as e:
             print(f"Error extrayendo portada: {e}")
-            return None
\ No newline at end of file
+            return None
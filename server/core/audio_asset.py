@@ -0,0 +1,177 @@
+import io
+import base64
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from PIL import Image
+from mutagen import File as MutagenFile
+from mutagen.flac import Picture
+from mutagen.mp4 import MP4Cover
+
+
+# Formatos aceptados (nombre de la clase de mutagen -> extensión)
+SUPPORTED_FORMATS = {
+    'MP3': '.mp3',
+    'FLAC': '.flac',
+    'OggVorbis': '.ogg',
+    'OggOpus': '.opus',
+    'MP4': '.m4a',
+    'WAVE': '.wav',
+}
+
+# Claves de cada familia de etiquetas para título, artista y álbum
+_ID3_KEYS = {'title': 'TIT2', 'artist': 'TPE1', 'album': 'TALB'}
+_VORBIS_KEYS = {'title': 'title', 'artist': 'artist', 'album': 'album'}
+_MP4_KEYS = {'title': '\xa9nam', 'artist': '\xa9ART', 'album': '\xa9alb'}
+
+_DEFAULTS = {'artist': 'Unknown Artist', 'album': 'Unknown Album'}
+_FRONT_COVER = 3
+
+
+class AudioAsset:
+    """Metadatos y portada de un archivo de audio, leídos una sola vez
+
+    Se construye a partir de los bytes del archivo (o de su ruta) y se
+    pasa a todas las etapas del procesamiento, que ya no vuelven a abrir el
+    archivo con mutagen. Soporta MP3, FLAC, OGG Vorbis, Opus, M4A y WAV:
+    las etiquetas ID3, Vorbis y MP4 se normalizan a título, artista y
+    álbum, y la portada se guarda en memoria como bytes (la portada
+    frontal si está marcada, si no la imagen más grande).
+    """
+
+    def __init__(self, path: Optional[str], audio_format: Optional[str], title: str, artist: str, album: str,
+                 duration: float, cover: Optional[bytes] = None, cover_mime: Optional[str] = None):
+        self.path = path
+        self.format = audio_format
+        self.title = title
+        self.artist = artist
+        self.album = album
+        self.duration = duration
+        self.cover = cover
+        self.cover_mime = cover_mime
+        self._cover_image = None
+
+    @classmethod
+    def from_path(cls, path: str) -> 'AudioAsset':
+        # mutagen sólo lee las cabeceras y etiquetas, no todo el archivo
+        with open(path, 'rb') as f:
+            return cls._parse(f, str(path))
+
+    @classmethod
+    def from_bytes(cls, data: bytes, path: Optional[str] = None) -> 'AudioAsset':
+        """Lee etiquetas y portada de un archivo ya cargado en memoria
+
+        `path` es la ruta que recibirán las etapas que decodifican el audio
+        y el respaldo del título.
+        """
+        return cls._parse(io.BytesIO(data), path)
+
+    @classmethod
+    def _parse(cls, fileobj, path: Optional[str]) -> 'AudioAsset':
+        stem = Path(path).stem if path else 'Unknown'
+        try:
+            audio = MutagenFile(fileobj)
+        except Exception as e:
+            print(f" Error leyendo metadatos: {e}\n")
+            audio = None
+        if audio is None:
+            return cls(path, None, stem, _DEFAULTS['artist'], _DEFAULTS['album'], 0.0)
+
+        tags = _tag_values(audio)
+        cover, cover_mime = _pick_cover(_pictures(audio))
+        return cls(path, type(audio).__name__,
+                   title=tags.get('title') or stem,
+                   artist=tags.get('artist') or _DEFAULTS['artist'],
+                   album=tags.get('album') or _DEFAULTS['album'],
+                   duration=float(getattr(audio.info, 'length', 0.0) or 0.0),
+                   cover=cover, cover_mime=cover_mime)
+
+    @classmethod
+    def coerce(cls, source) -> 'AudioAsset':
+        """Acepta un AudioAsset o la ruta de un archivo"""
+        return source if isinstance(source, cls) else cls.from_path(str(source))
+
+    @property
+    def supported(self) -> bool:
+        return self.format in SUPPORTED_FORMATS
+
+    @property
+    def extension(self) -> str:
+        return SUPPORTED_FORMATS.get(self.format, Path(self.path).suffix if self.path else '')
+
+    @property
+    def has_cover(self) -> bool:
+        return self.cover is not None
+
+    def cover_image(self) -> Optional[Image.Image]:
+        """Portada como imagen PIL (decodificada una vez), o None"""
+        if self._cover_image is None and self.cover is not None:
+            try:
+                self._cover_image = Image.open(io.BytesIO(self.cover))
+                self._cover_image.load()
+            except (OSError, ValueError) as e:
+                print(f" No se pudo decodificar la portada: {e}\n")
+                self.cover = None
+        return self._cover_image
+
+    def metadata(self) -> Dict:
+        return {'title': self.title, 'artist': self.artist, 'album': self.album, 'duration': self.duration}
+
+
+def _first(value) -> Optional[str]:
+    if value is None:
+        return None
+    text = getattr(value, 'text', value)
+    if isinstance(text, (list, tuple)):
+        text = text[0] if text else None
+    return str(text).strip() if text is not None and str(text).strip() else None
+
+
+def _tag_values(audio) -> Dict[str, str]:
+    tags = audio.tags
+    if tags is None:
+        return {}
+    name = type(audio).__name__
+    if name == 'MP4':
+        keys = _MP4_KEYS
+    elif name in ('FLAC', 'OggVorbis', 'OggOpus'):
+        keys = _VORBIS_KEYS
+    else:
+        keys = _ID3_KEYS
+    return {field: _first(tags.get(key)) for field, key in keys.items()}
+
+
+def _pictures(audio) -> List[Tuple[int, str, bytes]]:
+    """Imágenes embebidas como (tipo, mime, datos)"""
+    pictures = []
+    if getattr(audio, 'pictures', None):
+        # FLAC: bloques METADATA_BLOCK_PICTURE nativos
+        pictures += [(p.type, p.mime, p.data) for p in audio.pictures]
+    tags = audio.tags
+    if tags is None:
+        return pictures
+
+    name = type(audio).__name__
+    if name == 'MP4':
+        for cover in tags.get('covr', []):
+            mime = 'image/png' if cover.imageformat == MP4Cover.FORMAT_PNG else 'image/jpeg'
+            pictures.append((_FRONT_COVER, mime, bytes(cover)))
+    elif name in ('OggVorbis', 'OggOpus', 'FLAC'):
+        # Vorbis comments: METADATA_BLOCK_PICTURE en base64
+        for encoded in tags.get('metadata_block_picture', []):
+            try:
+                picture = Picture(base64.b64decode(encoded))
+            except Exception:
+                continue
+            pictures.append((picture.type, picture.mime, picture.data))
+    else:
+        for frame in tags.getall('APIC') if hasattr(tags, 'getall') else []:
+            pictures.append((frame.type, frame.mime, frame.data))
+    return pictures
+
+
+def _pick_cover(pictures: List[Tuple[int, str, bytes]]) -> Tuple[Optional[bytes], Optional[str]]:
+    if not pictures:
+        return None, None
+    # Portada frontal primero; entre iguales, la de mayor tamaño
+    _, mime, data = max(pictures, key=lambda p: (p[0] == _FRONT_COVER, len(p[2])))
+    return data, mime
@@ -0,0 +1,159 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import librosa
+import numpy as np
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+from ..config import Config
+from ..event_table import EventTable
+
+# Incrementar cuando cambie la lógica de análisis para invalidar resultados anteriores
+ANALYSIS_VERSION = 4
+# Parámetros de ejecución que no cambian el resultado (no forman parte de la huella)
+EXECUTION_KEYS = ('parallel_workers', 'parallel_chunk_seconds', 'parallel_min_seconds')
+
+
+def analysis_fingerprint(audio_cfg: Optional[Dict] = None) -> str:
+    """Huella de los parámetros que determinan el resultado del análisis"""
+    audio_cfg = audio_cfg or Config.AUDIO
+    payload = json.dumps({
+        'audio': {k: v for k, v in audio_cfg.items() if k not in EXECUTION_KEYS},
+        'version': ANALYSIS_VERSION,
+        'librosa': librosa.__version__,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+class AnalysisCache:
+    """Caché persistente de resultados de EventGenerator
+
+    Los eventos dependen sólo del audio y de la configuración de análisis
+    (el perfil), no del preset de estilo, así que se guardan por (hash del
+    audio, huella de parámetros).
+    Cada resultado es un .npz con la EventTable y un índice SQLite lleva el
+    tamaño, el último uso y los contadores de aciertos/fallos. Si el total
+    supera el límite se eliminan los menos usados recientemente.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.cfg = Config.CACHE
+        self.cache_dir = Path(cache_dir or self.cfg['ANALYSIS_DIR'])
+        self.max_bytes = max_bytes if max_bytes is not None else self.cfg['ANALYSIS_MAX_BYTES']
+        self.db_path = self.cache_dir / 'index.db'
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._init_db()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS entries
+                            (audio_hash TEXT,
+                             fingerprint TEXT,
+                             file_name TEXT,
+                             metadata TEXT,
+                             size INTEGER,
+                             last_used REAL,
+                             PRIMARY KEY (audio_hash, fingerprint))''')
+            conn.execute('''CREATE TABLE IF NOT EXISTS stats
+                            (name TEXT PRIMARY KEY, value INTEGER)''')
+            conn.execute("INSERT OR IGNORE INTO stats VALUES ('hits', 0), ('misses', 0)")
+
+    def _count(self, conn: sqlite3.Connection, name: str):
+        conn.execute("UPDATE stats SET value = value + 1 WHERE name = ?", (name,))
+
+    def get(self, audio_hash: str, fingerprint: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Devuelve {'metadata', 'events'} o None si no está en caché"""
+        fingerprint = fingerprint or analysis_fingerprint()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT file_name, metadata FROM entries WHERE audio_hash = ? AND fingerprint = ?",
+                (audio_hash, fingerprint)).fetchone()
+
+            if row is not None:
+                try:
+                    with np.load(self.cache_dir / row[0], allow_pickle=False) as arrays:
+                        events = EventTable.from_arrays(arrays)
+                except (OSError, ValueError, KeyError):
+                    # Archivo ausente o corrupto: se trata como fallo y se recalcula
+                    conn.execute("DELETE FROM entries WHERE audio_hash = ? AND fingerprint = ?",
+                                 (audio_hash, fingerprint))
+                    row = None
+
+            if row is None:
+                self._count(conn, 'misses')
+                return None
+
+            conn.execute("UPDATE entries SET last_used = ? WHERE audio_hash = ? AND fingerprint = ?",
+                         (time.time(), audio_hash, fingerprint))
+            self._count(conn, 'hits')
+        return {'metadata': json.loads(row[1]), 'events': events}
+
+    def put(self, audio_hash: str, result: Dict[str, Any], fingerprint: Optional[str] = None):
+        """Guarda el resultado de generate_events"""
+        fingerprint = fingerprint or analysis_fingerprint()
+        events = EventTable.coerce(result['events'])
+        file_name = f"{audio_hash}_{fingerprint}.npz"
+        path = self.cache_dir / file_name
+
+        # Escritura atómica: otro trabajo podría estar leyendo la misma entrada
+        temp_path = path.with_name(file_name + '.tmp')
+        with open(temp_path, 'wb') as f:
+            np.savez(f, **events.to_arrays())
+        os.replace(temp_path, path)
+
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                         (audio_hash, fingerprint, file_name,
+                          json.dumps(result['metadata'], default=float),
+                          path.stat().st_size, time.time()))
+            self._evict(conn)
+
+    def results(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """(hash del audio, resultado) de todas las entradas, sin contar aciertos ni actualizar su uso"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT audio_hash, file_name, metadata FROM entries ORDER BY last_used ASC").fetchall()
+        for audio_hash, file_name, metadata in rows:
+            try:
+                with np.load(self.cache_dir / file_name, allow_pickle=False) as arrays:
+                    events = EventTable.from_arrays(arrays)
+            except (OSError, ValueError, KeyError):
+                continue
+            yield audio_hash, {'metadata': json.loads(metadata), 'events': events}
+
+    def _evict(self, conn: sqlite3.Connection):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = conn.execute("SELECT audio_hash, fingerprint, file_name, size FROM entries "
+                            "ORDER BY last_used ASC").fetchall()
+        # La entrada más reciente (la recién escrita) nunca se elimina
+        for audio_hash, fingerprint, file_name, size in rows[:-1]:
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM entries WHERE audio_hash = ? AND fingerprint = ?",
+                         (audio_hash, fingerprint))
+            try:
+                (self.cache_dir / file_name).unlink()
+            except OSError:
+                pass
+            total -= size
+
+    def stats(self) -> Dict[str, int]:
+        """Contadores de aciertos/fallos, número de entradas y bytes ocupados"""
+        with self._connect() as conn:
+            counters = dict(conn.execute("SELECT name, value FROM stats").fetchall())
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {'hits': counters.get('hits', 0), 'misses': counters.get('misses', 0),
+                'entries': entries, 'bytes': size}
@@ -0,0 +1,68 @@
+import numpy as np
+from typing import Dict, Optional, Tuple
+from ..config import Config
+from .features import AudioFeatureBundle
+
+
+class BandOnsetDetector:
+    """Onsets por sub-banda (grave / media / aguda) para tipificar eventos
+
+    Parte de la energía por banda que ya calcula AudioFeatureBundle sobre
+    la STFT compartida, así que no vuelve a tocar la forma de onda. Cada
+    banda tiene su propia envolvente (diferencia positiva en dB entre
+    frames, normalizada por su percentil 99) y cada evento toma el máximo
+    de cada envolvente en una ventana corta alrededor de su inicio. Todo
+    se calcula para todos los eventos a la vez.
+
+    La etiqueta sale de la banda dominante (ver BAND_WEIGHTS): 'kick'
+    (grave), 'snare' (media) o 'hat' (aguda); 'none' si ninguna banda supera
+    `band_min_strength`.
+    """
+
+    LABELS = np.array(['kick', 'snare', 'hat', 'none'])
+    # El ataque del bombo se filtra a la banda media y la caja (ruido de banda
+    # ancha) también excita la aguda: en caso de duda gana la banda más grave
+    BAND_WEIGHTS = np.array([1.25, 1.0, 0.8])
+
+    def __init__(self, cfg: Optional[Dict] = None):
+        self.cfg = cfg or Config.AUDIO
+
+    def envelopes(self, features: AudioFeatureBundle) -> np.ndarray:
+        """Fuerza de onset por banda y frame (3, n_frames) en [0, 1]"""
+        energy_db = 10 * np.log10(np.maximum(np.asarray(features.band_energy, dtype=np.float64), 1e-10))
+        # Piso de 80 dB por banda, como power_to_db en la envolvente principal
+        energy_db = np.maximum(energy_db, energy_db.max(axis=1, keepdims=True) - 80.0)
+        flux = np.zeros_like(energy_db)
+        flux[:, 1:] = np.maximum(0.0, np.diff(energy_db, axis=1))
+
+        scale = np.percentile(flux, 99, axis=1, keepdims=True) if flux.shape[1] else np.ones((3, 1))
+        return np.clip(flux / np.maximum(scale, 1e-6), 0.0, 1.0)
+
+    def event_strengths(self, features: AudioFeatureBundle, start_times: np.ndarray,
+                        envelopes: Optional[np.ndarray] = None) -> np.ndarray:
+        """Fuerza de cada banda al inicio de cada evento (n_events, 3)"""
+        envelopes = self.envelopes(features) if envelopes is None else envelopes
+        n_frames = envelopes.shape[1]
+        if len(start_times) == 0 or n_frames == 0:
+            return np.zeros((len(start_times), 3), dtype=np.float32)
+
+        # Ventana [inicio - 2w, inicio + w] en frames, recortada a la pista: los
+        # onsets detectados llegan algo tarde respecto al golpe por el desfase
+        # de la envolvente principal
+        w = max(1, int(round(self.cfg['band_onset_window'] * features.sr / features.hop_length)))
+        offsets = np.arange(-2 * w, w + 1)
+        frames = np.clip(features.time_to_frames(start_times)[:, None] + offsets, 0, n_frames - 1)
+        return envelopes[:, frames].max(axis=2).T.astype(np.float32)
+
+    def classify(self, strengths: np.ndarray) -> np.ndarray:
+        """Etiqueta de percusión ('kick', 'snare', 'hat' o 'none') por evento"""
+        if len(strengths) == 0:
+            return np.zeros(0, dtype=self.LABELS.dtype)
+        dominant = np.argmax(strengths * self.BAND_WEIGHTS, axis=1)
+        weak = strengths.max(axis=1) < self.cfg['band_min_strength']
+        return self.LABELS[np.where(weak, 3, dominant)]
+
+    def analyze(self, features: AudioFeatureBundle, start_times: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Etiquetas y fuerzas por banda de los eventos que empiezan en `start_times`"""
+        strengths = self.event_strengths(features, np.asarray(start_times, dtype=float))
+        return self.classify(strengths), strengths
@@ -1,26 +1,52 @@
+import os
 import librosa
-from librosa.feature.rhythm import tempo as estimate_tempo
 import numpy as np
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 from ..config import Config
+from .features import AudioFeatureBundle
+from .parallel import ParallelFeatureBundle
+from .peak_picking import peak_pick_sweep
+from .streaming import StreamingAnalyzer
+from .decoder import AudioDecoder
 
 class AudioAnalyzer:
-    def __init__(self):
-        self.cfg = Config.AUDIO
+    ONSET_SENSITIVITY_LEVELS = [
+        {'pre_max': 20, 'post_max': 20, 'pre_avg': 100, 'post_avg': 100, 'delta': 0.2, 'wait': 10},
+        {'pre_max': 30, 'post_max': 30, 'pre_avg': 100, 'post_avg': 100,'delta': 0.1, 'wait': 5},
+        {'pre_max': 40, 'post_max': 40, 'pre_avg': 100, 'post_avg': 100,'delta': 0.08, 'wait': 4},
+        {'pre_max': 50, 'post_max': 50, 'pre_avg': 100, 'post_avg': 100,'delta': 0.05, 'wait': 3}
+    ]
+
+    def __init__(self, cfg: Dict = None):
+        self.cfg = cfg or Config.AUDIO
+        self.features = None
+        self.beat_times = None
     
-    def load_audio(self, file_path: str) -> Tuple[np.ndarray, float]:
-        # Carga el audio 
+    def load_audio(self, file_path: str, content_hash: str = None) -> Tuple[np.ndarray, float]:
+        # Carga el audio (PCM en caché si ya se decodificó este contenido)
         try:
-            y, _ = librosa.load(file_path, sr=self.cfg['sr'], mono=True)
-            tempo = self._validate_tempo(estimate_tempo(y=y, sr=self.cfg['sr'])[0])
+            y = AudioDecoder().load(file_path, self.cfg['sr'], content_hash, self.cfg['res_type'])
+            tempo = self._validate_tempo(self.get_features(y).tempo)
             return y, tempo
         except Exception as e:
             print(f"Error loading {file_path}: {e}")
             raise
     
+    def load_audio_streaming(self, file_path: str) -> Tuple[None, float]:
+        # Analiza el audio por bloques sin cargarlo completo en memoria
+        try:
+            self.features = StreamingAnalyzer(self.cfg).analyze(file_path)
+            tempo = self._validate_tempo(self.features.tempo)
+            return None, tempo
+        except Exception as e:
+            print(f"Error streaming {file_path}: {e}")
+            raise
+    
     def detect_events(self, y: np.ndarray) -> List[float]:
         # Detecta eventos de beat
         beat_times = self._detect_beats(y)
+        # Se conservan para el análisis de estructura
+        self.beat_times = beat_times
         print('Beats: ',len(beat_times))
         # Detecta eventos de onset
         onset_times = self._detect_onsets(y)
@@ -30,24 +56,45 @@ class AudioAnalyzer:
         print('Eventos: ',len(events))
         return events
     
+    def get_features(self, y: np.ndarray) -> AudioFeatureBundle:
+        """Devuelve las características compartidas de `y`, calculándolas una sola vez"""
+        if self.features is None or self.features.y is not y:
+            workers = self.cfg['parallel_workers'] or os.cpu_count() or 1
+            if workers > 1 and len(y) >= self.cfg['parallel_min_seconds'] * self.cfg['sr']:
+                self.features = ParallelFeatureBundle(
+                    y, self.cfg['sr'], self.cfg['hop_length'], self.cfg['n_fft'],
+                    n_workers=workers, chunk_seconds=self.cfg['parallel_chunk_seconds'])
+            else:
+                self.features = AudioFeatureBundle(y, self.cfg['sr'], self.cfg['hop_length'], self.cfg['n_fft'])
+        return self.features
+    
     def _detect_beats(self, y: np.ndarray) -> np.ndarray:
-        _, beats = librosa.beat.beat_track(y=y, sr=self.cfg['sr'], units='time')
+        features = self.get_features(y)
+        # Reutiliza el espectrograma mel ya calculado y el tempo por bloques
+        _, beats = librosa.beat.beat_track(
+            onset_envelope=features.beat_envelope, sr=self.cfg['sr'],
+            hop_length=self.cfg['hop_length'], bpm=features.beat_tempo, units='time')
         return beats
     
     def _detect_onsets(self, y: np.ndarray) -> np.ndarray:
-        results = []
-
-        sensitivity_levels = [
-            {'pre_max': 20, 'post_max': 20, 'pre_avg': 100, 'post_avg': 100, 'delta': 0.2, 'wait': 10},
-            {'pre_max': 30, 'post_max': 30, 'pre_avg': 100, 'post_avg': 100,'delta': 0.1, 'wait': 5},
-            {'pre_max': 40, 'post_max': 40, 'pre_avg': 100, 'post_avg': 100,'delta': 0.08, 'wait': 4},
-            {'pre_max': 50, 'post_max': 50, 'pre_avg': 100, 'post_avg': 100,'delta': 0.05, 'wait': 3}
-        ]
+        features = self.get_features(y)
+        levels = self.ONSET_SENSITIVITY_LEVELS
+        if self.cfg['onset_levels'] is not None:
+            levels = [levels[i] for i in self.cfg['onset_levels']]
 
-        for params in sensitivity_levels:
-            onset_times = librosa.onset.onset_detect(
-                y=y, sr=self.cfg['sr'], units='time', **params)
-            results.append(onset_times)
+        if self.cfg['onset_sweep'] == 'vectorized':
+            # Una sola envolvente normalizada y sólo la selección de picos por nivel
+            results = [
+                librosa.frames_to_time(frames, sr=self.cfg['sr'], hop_length=self.cfg['hop_length'])
+                for frames in peak_pick_sweep(features.onset_envelope, levels)
+            ]
+        else:
+            results = []
+            for params in levels:
+                onset_times = librosa.onset.onset_detect(
+                    onset_envelope=features.onset_envelope, sr=self.cfg['sr'],
+                    hop_length=self.cfg['hop_length'], units='time', **params)
+                results.append(onset_times)
 
         onset = max(results, key=len)
         
@@ -0,0 +1,89 @@
+import os
+import shutil
+import subprocess
+import librosa
+import numpy as np
+from pathlib import Path
+from typing import Optional
+from ..config import Config
+
+# Calidad del remuestreador de ffmpeg (swr) equivalente a cada res_type de librosa/soxr
+_FFMPEG_RESAMPLER = {
+    'soxr_lq': 'filter_size=8:phase_shift=6',
+    'soxr_mq': 'filter_size=16:phase_shift=8',
+    'soxr_hq': 'filter_size=32:phase_shift=10',
+    'soxr_vhq': 'filter_size=64:phase_shift=14',
+}
+
+
+class AudioDecoder:
+    """Decodifica audio a PCM mono float32 a la frecuencia de análisis
+
+    Usa ffmpeg (decodificación, mezcla a mono y remuestreo en un solo paso,
+    directo a un pipe) y recurre a librosa.load si ffmpeg no está
+    disponible. Si se indica el hash del contenido, el PCM se guarda como
+    .npy y las siguientes cargas lo mapean en memoria sin decodificar.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cfg = Config.CACHE
+        self.cache_dir = Path(cache_dir or self.cfg['PCM_DIR'])
+
+    def load(self, file_path: str, sr: int, content_hash: Optional[str] = None,
+             res_type: str = 'soxr_hq') -> np.ndarray:
+        if content_hash is None:
+            return self.decode(file_path, sr, res_type)
+
+        cache_path = self.cache_path(content_hash, sr, res_type)
+        if cache_path.exists():
+            # Marcar como usado recientemente para la limpieza por antigüedad
+            os.utime(cache_path)
+            return np.load(cache_path, mmap_mode='r')
+
+        y = self.decode(file_path, sr, res_type)
+        self._store(cache_path, y)
+        return np.load(cache_path, mmap_mode='r')
+
+    def cache_path(self, content_hash: str, sr: int, res_type: str = 'soxr_hq') -> Path:
+        return self.cache_dir / f"{content_hash}_{sr}_{res_type}.npy"
+
+    def decode(self, file_path: str, sr: int, res_type: str = 'soxr_hq',
+               duration: Optional[float] = None) -> np.ndarray:
+        """PCM sin caché; con `duration`, sólo los primeros `duration` segundos"""
+        if shutil.which('ffmpeg') is None:
+            y, _ = librosa.load(file_path, sr=sr, mono=True, res_type=res_type, duration=duration)
+            return y
+
+        resampler = _FFMPEG_RESAMPLER.get(res_type, _FFMPEG_RESAMPLER['soxr_hq'])
+        cmd = [
+            'ffmpeg', '-nostdin', '-v', 'error',
+            '-i', str(file_path),
+            *(['-t', str(duration)] if duration is not None else []),
+            '-vn', '-ac', '1', '-af', f'aresample={resampler}', '-ar', str(sr),
+            '-f', 'f32le', '-acodec', 'pcm_f32le', '-'
+        ]
+        result = subprocess.run(cmd, capture_output=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg no pudo decodificar {file_path}: {result.stderr.decode(errors='replace')}")
+        return np.frombuffer(result.stdout, dtype=np.float32)
+
+    def _store(self, cache_path: Path, y: np.ndarray):
+        """Escribe el .npy de forma atómica y libera espacio si se supera el límite"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        temp_path = cache_path.with_name(cache_path.name + '.tmp')
+        with open(temp_path, 'wb') as f:
+            np.save(f, y)
+        os.replace(temp_path, cache_path)
+        self._evict()
+
+    def _evict(self):
+        files = sorted(self.cache_dir.glob('*.npy'), key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in files)
+        # El archivo recién escrito (el más nuevo) nunca se elimina
+        while len(files) > 1 and total > self.cfg['PCM_MAX_BYTES']:
+            oldest = files.pop(0)
+            total -= oldest.stat().st_size
+            try:
+                oldest.unlink()
+            except OSError:
+                pass
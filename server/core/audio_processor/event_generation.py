@@ -1,72 +1,117 @@
 import numpy as np
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from ..config import Config
+from ..event_table import EventTable
 from .beat_detection import AudioAnalyzer
-import librosa
+from .streaming import audio_duration
+from .analysis_cache import AnalysisCache, analysis_fingerprint
+from .silence import SilenceDetector
+from .band_onsets import BandOnsetDetector
+from .structure import StructureAnalyzer
 
 class EventGenerator:
-    def __init__(self):
-        self.cfg = Config.AUDIO
-        self.analyzer = AudioAnalyzer()
+    def __init__(self, cache: AnalysisCache = None, profile: str = None):
+        # Perfil de análisis: 'fast', 'balanced' o 'accurate' (ver Config.AUDIO_PROFILES)
+        self.cfg = Config.get_audio_profile(profile)
+        self.analyzer = AudioAnalyzer(self.cfg)
+        self.silence = SilenceDetector(self.cfg)
+        self.bands = BandOnsetDetector(self.cfg)
+        self.structure = StructureAnalyzer(self.cfg)
+        self.cache = cache
     
-    def generate_events(self, audio_path: str) -> List[Dict[str, Any]]:
+    def generate_events(self, audio_path: str, audio_hash: str = None,
+                        duration: Optional[float] = None) -> Dict[str, Any]:
         """
         Procesa el audio y genera eventos estructurados
         
+        Args:
+            audio_path: Ruta al archivo de audio
+            audio_hash: Hash del contenido; si se da, el PCM decodificado y el resultado
+                del análisis se reutilizan entre trabajos
+            duration: Duración ya conocida (AudioAsset.duration); evita volver a leer las cabeceras
+        
         Returns:
-            Lista de diccionarios con:
+            Diccionario con 'metadata' y 'events', una EventTable cuyas filas tienen:
             - 'start_time': tiempo de inicio (segundos)
             - 'end_time': tiempo de fin (segundos)
             - 'type': tipo de evento ('beat' u 'onset')
+            - 'silent': True si el evento cae en silencio o baja energía
+            - 'drum': percusión dominante al inicio ('kick', 'snare', 'hat' o 'none')
+            - 'band_strength': fuerza de onset [grave, media, aguda] en 0-1
+            - 'section': etiqueta de la sección de la canción ('A', 'B'...)
+            - 'section_pos': posición del evento dentro de su sección
         """
-        y, tempo = self.analyzer.load_audio(audio_path)
+        if audio_hash is not None:
+            if self.cache is None:
+                self.cache = AnalysisCache()
+            cached = self.cache.get(audio_hash, analysis_fingerprint(self.cfg))
+            if cached is not None:
+                print(f"Análisis recuperado de caché ({audio_hash[:12]})")
+                return cached
+
+        result = self._analyze(audio_path, audio_hash, duration)
+        if audio_hash is not None:
+            self.cache.put(audio_hash, result, analysis_fingerprint(self.cfg))
+        return result
+
+    def _analyze(self, audio_path: str, audio_hash: str = None, duration: Optional[float] = None) -> Dict[str, Any]:
+        # Las pistas largas (mezclas, sets en vivo) se analizan por bloques
+        if not duration:
+            duration = audio_duration(audio_path)
+        if duration >= self.cfg['streaming_threshold']:
+            y, tempo = self.analyzer.load_audio_streaming(audio_path)
+        else:
+            y, tempo = self.analyzer.load_audio(audio_path, audio_hash)
         event_times = self.analyzer.detect_events(y)
         
         # Clasificar eventos y calcular duraciones
         events = self._structure_events(event_times, y)
+        features = self.analyzer.get_features(y)
+        
+        # Secciones repetidas (estribillos, versos) para reutilizar imágenes
+        sections = self.structure.sections(features, self.analyzer.beat_times)
+        self.structure.label_events(events, sections)
         
         return {
             'metadata': {
                 'tempo': tempo,
                 'total_events': len(events),
-                'duration': len(y)/self.cfg['sr']
+                'duration': features.duration,
+                'profile': self.cfg['profile'],
+                'silent_regions': self.silence.regions(features),
+                'sections': sections
             },
             'events': events
         }
     
-    def _structure_events(self, event_times: List[float], y: np.ndarray) -> List[Dict[str, Any]]:
+    def _structure_events(self, event_times: List[float], y: np.ndarray) -> EventTable:
         """Organiza los tiempos en eventos estructurados"""
         sr = self.cfg['sr']
-        events = []
+        features = self.analyzer.get_features(y)
         
         # Asegurar que el último evento llegue hasta el final del audio
-        event_times.append(len(y)/sr)
+        event_times.append(features.duration)
+        times = np.asarray(event_times, dtype=float)
         
-        for i in range(len(event_times)-1):
-            start = event_times[i]
-            end = event_times[i+1]
-            
-            # Determinar tipo de evento basado en características del segmento
-            segment = y[int(start*sr):int(end*sr)]
-            event_type = self._classify_event(segment, sr)
-            
-            events.append({
-                'start_time': start,
-                'end_time': end,
-                'duration': end - start,
-                'type': event_type,
-                'intensity': self._calculate_intensity(segment)
-            })
+        # Características de todos los segmentos en una sola pasada
+        rms = features.segment_rms((times * sr).astype(int))
+        centroids = features.spectral_centroid[features.time_to_frames(times[:-1])]
+        event_types = self._classify_events(rms, centroids)
+        intensities = self._calculate_intensities(rms)
         
-        return events
-    
-    def _classify_event(self, segment: np.ndarray, sr: int) -> str:
-        """Clasifica el evento como 'beat' u 'onset' basado en características"""
-        rms = np.sqrt(np.mean(segment**2))
-        spectral_centroid = librosa.feature.spectral_centroid(y=segment, sr=sr)[0, 0]
+        # Eventos en silencio: se renderizan con un cuadro estático en lugar de difusión
+        silent = self.silence.silent_events(features, times[:-1], times[1:])
+        
+        # Onsets por banda a partir de la misma STFT, para todos los eventos a la vez
+        drums, band_strengths = self.bands.analyze(features, times[:-1])
         
-        return 'onset' if spectral_centroid > 2000 and rms > 0.05 else 'beat'
+        return EventTable.from_columns(times[:-1], times[1:], event_types, intensities, silent=silent.tolist(),
+                                       drum=drums.tolist(), band_strength=np.round(band_strengths.astype(float), 3).tolist())
+    
+    def _classify_events(self, rms: np.ndarray, spectral_centroids: np.ndarray) -> np.ndarray:
+        """Clasifica cada evento como 'beat' u 'onset' basado en características"""
+        return np.where((spectral_centroids > 2000) & (rms > 0.05), 'onset', 'beat')
     
-    def _calculate_intensity(self, segment: np.ndarray) -> float:
-        """Calcula la intensidad relativa del evento (0-1)"""
-        return float(np.clip(np.sqrt(np.mean(segment**2)) * 2, 0, 1))
\ No newline at end of file
+    def _calculate_intensities(self, rms: np.ndarray) -> np.ndarray:
+        """Calcula la intensidad relativa de cada evento (0-1)"""
+        return np.clip(rms * 2, 0, 1)
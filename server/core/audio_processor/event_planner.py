@@ -0,0 +1,122 @@
+import numpy as np
+from typing import Dict, Optional
+from ..config import Config
+from ..event_table import EventTable
+
+
+class EventBudgetPlanner:
+    """Reduce los eventos a un presupuesto fijo de imágenes repartido por toda la canción
+
+    Sólo cuentan los eventos que se generan con difusión (también los
+    'lyric' que añade la alineación de letras, así que el plan se hace
+    después de ella): los silenciosos (cuadro estático) se conservan. El
+    primer evento con música tras cada silencio también, y cuenta en el
+    presupuesto, para que la música no se fusione con el silencio; si hay
+    más silencios que presupuesto, los de menor prioridad se fusionan
+    enteros con la música anterior. El primer evento se conserva siempre,
+    para que el video empiece en 0 s. La línea de tiempo se divide en
+    tantas franjas iguales como imágenes queden en el presupuesto y en cada
+    franja se queda el evento de mayor prioridad; si quedan franjas vacías,
+    el resto del presupuesto se reparte por prioridad global. Los eventos
+    descartados se fusionan con el evento conservado anterior, que se
+    alarga hasta el siguiente y hereda la mayor intensidad.
+    """
+
+    # Prioridad musical que se suma a la intensidad (0-1)
+    TYPE_PRIORITY = {'beat': 0.2, 'onset': 0.1, 'lyric': 0.3}
+    DRUM_PRIORITY = {'kick': 0.2, 'snare': 0.15, 'hat': 0.05}
+    SECTION_START_PRIORITY = 1.0
+
+    def __init__(self, cfg: Optional[Dict] = None):
+        self.cfg = cfg or Config.EVENT_BUDGET
+
+    def budget(self, duration: float, max_images: Optional[int] = None) -> int:
+        """Número de imágenes para una pista de `duration` segundos"""
+        max_images = max_images if max_images is not None else self.cfg['max_images']
+        per_minute = self.cfg['images_per_minute']
+        if per_minute is None:
+            return max_images
+        return max(1, min(max_images, int(round(per_minute * duration / 60.0))))
+
+    def priorities(self, events: EventTable) -> np.ndarray:
+        """Intensidad más la prioridad por tipo, percusión y comienzo de sección"""
+        score = np.asarray(events.column('intensity'), dtype=np.float64).copy()
+        score += [self.TYPE_PRIORITY.get(t, 0.0) for t in events.column('type')]
+        score += [self.DRUM_PRIORITY.get(d, 0.0) for d in events.column('drum')]
+        score += [self.SECTION_START_PRIORITY if p == 0 else 0.0 for p in events.column('section_pos')]
+        return score
+
+    def plan(self, events: EventTable, duration: float, max_images: Optional[int] = None) -> EventTable:
+        """Devuelve una EventTable con a lo sumo `budget` eventos a generar
+
+        Los eventos conservados llevan en 'merged' cuántos eventos
+        originales representan.
+        """
+        events = EventTable.coerce(events)
+        budget = self.budget(duration, max_images)
+        silent = np.array([bool(s) for s in events.column('silent')], dtype=bool)
+        candidates = np.flatnonzero(~silent)
+        if len(candidates) <= budget:
+            return events
+
+        # El primer evento con música tras un silencio no puede fusionarse
+        # con el silencioso (se vería el cuadro estático)
+        after_silence = np.zeros_like(silent)
+        after_silence[1:] = silent[:-1] & ~silent[1:]
+        keep = silent | after_silence
+        keep[0] = True
+        forced = np.flatnonzero(keep & ~silent)
+        if len(forced) > budget:
+            self._drop_gaps(events, keep, silent, forced, budget)
+        rest = np.flatnonzero(~keep & ~silent)
+        remaining = min(budget - int((keep & ~silent).sum()), len(rest))
+        if remaining > 0:
+            keep[self._select(events, rest, remaining, duration)] = True
+        return self._merge(events, np.flatnonzero(keep))
+
+    def _drop_gaps(self, events: EventTable, keep: np.ndarray, silent: np.ndarray,
+                   forced: np.ndarray, budget: int):
+        """Deja `budget` eventos con música obligados, fusionando los silencios sobrantes
+
+        Cada evento tras un silencio que se descarta se lleva su silencio,
+        que pasa a formar parte del evento con música anterior. El primer
+        evento con música (el inicio del video o el fin de la introducción
+        silenciosa) no tiene música anterior y no se descarta.
+        """
+        score = self.priorities(events)[forced]
+        score[forced == forced[0]] = np.inf
+        for index in forced[np.argsort(score, kind='stable')[:len(forced) - max(budget, 1)]]:
+            start = index
+            while start > 0 and silent[start - 1]:
+                start -= 1
+            keep[start:index + 1] = False
+
+    def _select(self, events: EventTable, candidates: np.ndarray, budget: int, duration: float) -> np.ndarray:
+        """Índices de los `budget` candidatos elegidos (mejor por franja, luego por prioridad)"""
+        score = self.priorities(events)[candidates]
+        # El primer evento cubre el inicio del video
+        score[candidates == 0] = np.inf
+        starts = events.start_times[candidates]
+        slots = np.minimum((starts / max(duration, 1e-9) * budget).astype(np.int64), budget - 1)
+
+        # Mejor evento de cada franja: ordenar por (franja, -prioridad) y tomar el primero
+        order = np.lexsort((-score, slots))
+        first = np.concatenate([[True], slots[order][1:] != slots[order][:-1]])
+        chosen = order[first]
+
+        # Franjas vacías: completar con los mejores restantes
+        missing = budget - len(chosen)
+        if missing > 0:
+            rest = np.setdiff1d(np.arange(len(candidates)), chosen)
+            chosen = np.concatenate([chosen, rest[np.argsort(-score[rest], kind='stable')[:missing]]])
+        return candidates[chosen]
+
+    def _merge(self, events: EventTable, kept: np.ndarray) -> EventTable:
+        """Fusiona cada evento descartado con el conservado anterior"""
+        planned = events.take(kept)
+        end_times = np.append(events.start_times[kept[1:]], events.end_times[-1])
+        planned.set_column('end_time', end_times)
+        planned.set_column('duration', end_times - planned.start_times)
+        planned.set_column('intensity', np.maximum.reduceat(events.column('intensity'), kept))
+        planned.set_column('merged', np.diff(np.append(kept, len(events))).tolist())
+        return planned
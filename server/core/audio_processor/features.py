@@ -0,0 +1,217 @@
+import librosa
+from librosa.feature.rhythm import tempo as estimate_tempo
+import numpy as np
+from functools import cached_property
+from scipy.signal import get_window
+
+# Bordes (Hz) de las bandas grave / media / aguda para los onsets por banda
+BAND_EDGES_HZ = (150.0, 2500.0)
+
+
+def band_energy(S: np.ndarray, sr: int, n_fft: int) -> np.ndarray:
+    """Potencia por banda (grave, media, aguda) de cada frame de una STFT de magnitud
+
+    Returns:
+        Arreglo (3, n_frames) en float32
+    """
+    edges = np.searchsorted(librosa.fft_frequencies(sr=sr, n_fft=n_fft), BAND_EDGES_HZ)
+    return np.add.reduceat(S**2, np.concatenate([[0], edges]), axis=0).astype(np.float32)
+
+
+def blockwise_tempo(envelope: np.ndarray, sr: int, hop_length: int, block_frames: int = 4096) -> float:
+    """Equivale a tempo(onset_envelope=...) sin materializar el tempograma completo
+
+    El tempograma de librosa ocupa win_length x n_frames en float64 (cientos
+    de MB en una mezcla de una hora) aunque luego sólo se usa su media en el
+    tiempo. Aquí esa media se acumula por bloques de frames.
+    """
+    total = tempogram_sum(envelope, sr, hop_length, 0, len(envelope), block_frames)
+    return tempo_from_sum(total, len(envelope), sr, hop_length)
+
+
+def tempogram_sum(envelope: np.ndarray, sr: int, hop_length: int, start: int, stop: int,
+                  block_frames: int = 4096) -> np.ndarray:
+    """Suma en el tiempo de las columnas [start, stop) del tempograma normalizado"""
+    win_length = librosa.time_to_frames(8.0, sr=sr, hop_length=hop_length).item()
+    n = len(envelope)
+    padded = np.pad(envelope, win_length // 2, mode='linear_ramp', end_values=0)
+    frames = librosa.util.frame(padded, frame_length=win_length, hop_length=1)[:, :n]
+    window = get_window('hann', win_length, fftbins=True)[:, None]
+
+    total = np.zeros(win_length)
+    for block_start in range(start, stop, block_frames):
+        block_stop = min(block_start + block_frames, stop)
+        block = librosa.autocorrelate(frames[:, block_start:block_stop] * window, axis=0)
+        total += librosa.util.normalize(block, norm=np.inf, axis=0).sum(axis=1)
+    return total
+
+
+def tempo_from_sum(total: np.ndarray, n_frames: int, sr: int, hop_length: int) -> float:
+    """Tempo a partir de la suma del tempograma de `n_frames` columnas"""
+    return float(estimate_tempo(tg=(total / max(n_frames, 1))[:, None], sr=sr, hop_length=hop_length)[0])
+
+
+class AudioFeatureBundle:
+    """Características espectrales de una pista, calculadas una sola vez
+
+    Todas las etapas de análisis (tempo, beats, onsets, clasificación de
+    eventos) leen de aquí en lugar de recalcular el espectrograma a partir
+    de la forma de onda. Cada característica se calcula la primera vez que
+    se pide y queda en caché.
+    """
+
+    def __init__(self, y: np.ndarray, sr: int, hop_length: int = 512, n_fft: int = 2048):
+        self.y = y
+        self.sr = sr
+        self.hop_length = hop_length
+        self.n_fft = n_fft
+
+    @cached_property
+    def stft(self) -> np.ndarray:
+        """Magnitud de la STFT (n_fft // 2 + 1, n_frames)"""
+        return np.abs(librosa.stft(self.y, n_fft=self.n_fft, hop_length=self.hop_length))
+
+    @cached_property
+    def mel(self) -> np.ndarray:
+        """Espectrograma mel de potencia derivado de la STFT compartida"""
+        return librosa.feature.melspectrogram(S=self.stft**2, sr=self.sr)
+
+    @cached_property
+    def mel_db(self) -> np.ndarray:
+        """Espectrograma mel en dB, base de las envolventes de onset"""
+        return librosa.power_to_db(self.mel)
+
+    @cached_property
+    def onset_envelope(self) -> np.ndarray:
+        """Envolvente de fuerza de onset (equivalente a onset_strength(y=...))"""
+        return librosa.onset.onset_strength(
+            S=self.mel_db, sr=self.sr, hop_length=self.hop_length)
+
+    @cached_property
+    def beat_envelope(self) -> np.ndarray:
+        """Envolvente con agregación por mediana, la que usa beat_track internamente"""
+        return librosa.onset.onset_strength(
+            S=self.mel_db, sr=self.sr, hop_length=self.hop_length,
+            aggregate=np.median)
+
+    @cached_property
+    def rms(self) -> np.ndarray:
+        """RMS por frame"""
+        return librosa.feature.rms(S=self.stft, frame_length=self.n_fft, hop_length=self.hop_length)[0]
+
+    @cached_property
+    def spectral_centroid(self) -> np.ndarray:
+        """Centroide espectral por frame (Hz)"""
+        return librosa.feature.spectral_centroid(
+            S=self.stft, sr=self.sr, n_fft=self.n_fft, hop_length=self.hop_length)[0]
+
+    @cached_property
+    def band_energy(self) -> np.ndarray:
+        """Potencia por banda y frame (3, n_frames), derivada de la STFT compartida"""
+        return band_energy(self.stft, self.sr, self.n_fft)
+
+    @cached_property
+    def chroma(self) -> np.ndarray:
+        """Cromagrama (12, n_frames) derivado de la STFT compartida
+
+        La afinación se fija en 0 en lugar de estimarla, para que el resultado
+        no dependa de cómo se divida la señal (análisis paralelo y por bloques).
+        """
+        return librosa.feature.chroma_stft(S=self.stft**2, sr=self.sr, n_fft=self.n_fft, tuning=0.0)
+
+    @cached_property
+    def mfcc(self) -> np.ndarray:
+        """MFCC (13, n_frames) derivados del espectrograma mel en dB"""
+        return librosa.feature.mfcc(S=self.mel_db, n_mfcc=13)
+
+    @cached_property
+    def tempo(self) -> float:
+        """Tempo global estimado (sin validar) a partir de la envolvente de onset"""
+        return blockwise_tempo(self.onset_envelope, self.sr, self.hop_length)
+
+    @cached_property
+    def beat_tempo(self) -> float:
+        """Tempo que beat_track estimaría internamente a partir de beat_envelope"""
+        return blockwise_tempo(self.beat_envelope, self.sr, self.hop_length)
+
+    @property
+    def duration(self) -> float:
+        return len(self.y) / self.sr
+
+    @property
+    def n_frames(self) -> int:
+        return 1 + len(self.y) // self.hop_length
+
+    def segment_rms(self, boundaries) -> np.ndarray:
+        """RMS exacto de segmentos contiguos de muestras
+
+        Args:
+            boundaries: índices de muestra crecientes; el segmento i es
+                [boundaries[i], boundaries[i+1])
+
+        Returns:
+            Un valor por segmento (0 para segmentos vacíos)
+        """
+        bounds = np.clip(np.asarray(boundaries, dtype=np.int64), 0, len(self.y))
+        counts = np.diff(bounds)
+        sums = np.zeros(len(counts))
+        nonempty = counts > 0
+        if nonempty.any():
+            # Una sola pasada: cada suma va desde su inicio hasta el siguiente inicio no vacío
+            energy = np.square(self.y[:bounds[-1]])
+            sums[nonempty] = np.add.reduceat(energy, bounds[:-1][nonempty])
+        return np.sqrt(np.divide(sums, counts, out=np.zeros_like(sums), where=nonempty))
+
+    def time_to_frames(self, times) -> np.ndarray:
+        """Convierte tiempos (s) a índices de frame válidos"""
+        frames = librosa.time_to_frames(np.asarray(times), sr=self.sr, hop_length=self.hop_length)
+        return np.clip(frames, 0, self.n_frames - 1)
+
+
+class FrameFeatureBundle(AudioFeatureBundle):
+    """Características a nivel de frame calculadas fuera de memoria (sin forma de onda)
+
+    La producen los modos de análisis que nunca tienen la pista completa en
+    memoria. En lugar de `y` guarda la energía por bloque de `hop_length`
+    muestras, suficiente para el RMS de cada evento con resolución de hop.
+    """
+
+    def __init__(self, sr: int, hop_length: int, n_fft: int, n_samples: int,
+                 onset_envelope: np.ndarray, beat_envelope: np.ndarray, rms: np.ndarray,
+                 spectral_centroid: np.ndarray, hop_energy: np.ndarray, band_energy: np.ndarray,
+                 chroma: np.ndarray, mfcc: np.ndarray):
+        super().__init__(None, sr, hop_length, n_fft)
+        self.n_samples = n_samples
+        self.onset_envelope = onset_envelope
+        self.beat_envelope = beat_envelope
+        self.rms = rms
+        self.spectral_centroid = spectral_centroid
+        self.hop_energy = hop_energy
+        self.band_energy = band_energy
+        self.chroma = chroma
+        self.mfcc = mfcc
+
+    @property
+    def stft(self) -> np.ndarray:
+        raise RuntimeError('FrameFeatureBundle does not keep the spectrogram')
+
+    @property
+    def duration(self) -> float:
+        return self.n_samples / self.sr
+
+    @property
+    def n_frames(self) -> int:
+        return len(self.onset_envelope)
+
+    def segment_rms(self, boundaries) -> np.ndarray:
+        """RMS de segmentos contiguos con resolución de `hop_length` muestras"""
+        n_blocks = len(self.hop_energy)
+        blocks = np.clip(np.round(np.asarray(boundaries) / self.hop_length).astype(np.int64), 0, n_blocks)
+        block_sizes = np.full(n_blocks, self.hop_length, dtype=np.int64)
+        if n_blocks:
+            block_sizes[-1] = self.n_samples - (n_blocks - 1) * self.hop_length
+        energy = np.concatenate([[0.0], np.cumsum(self.hop_energy, dtype=np.float64)])
+        counts = np.concatenate([[0], np.cumsum(block_sizes)])
+        sums = energy[blocks[1:]] - energy[blocks[:-1]]
+        sizes = counts[blocks[1:]] - counts[blocks[:-1]]
+        return np.sqrt(np.divide(sums, sizes, out=np.zeros_like(sums), where=sizes > 0))
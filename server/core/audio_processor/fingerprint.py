@@ -0,0 +1,301 @@
+import hashlib
+import sqlite3
+import struct
+import librosa
+import numpy as np
+from typing import Iterable, Optional, Tuple
+from .decoder import AudioDecoder
+from .streaming import audio_duration
+
+# Tablas de la cabecera de frame MPEG (kbps), por (versión MPEG-1, capa)
+_BITRATES = {
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_BITRATES[(False, 3)] = _BITRATES[(False, 2)]
+_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+def _mpeg_frame_length(data: bytes, pos: int) -> int:
+    """Longitud del frame MPEG que empieza en `pos` (0 si no hay una cabecera válida)"""
+    if pos + 4 > len(data) or data[pos] != 0xFF or data[pos + 1] & 0xE0 != 0xE0:
+        return 0
+    version = (data[pos + 1] >> 3) & 0x3
+    layer = 4 - ((data[pos + 1] >> 1) & 0x3)
+    bitrate_index = data[pos + 2] >> 4
+    sr_index = (data[pos + 2] >> 2) & 0x3
+    padding = (data[pos + 2] >> 1) & 0x1
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or sr_index == 3:
+        return 0
+
+    mpeg1 = version == 3
+    bitrate = _BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][sr_index]
+    if layer == 1:
+        return (12 * bitrate // sample_rate + padding) * 4
+    if layer == 3 and not mpeg1:
+        return 72 * bitrate // sample_rate + padding
+    return 144 * bitrate // sample_rate + padding
+
+
+def _strip_tags(data: bytes) -> Tuple[int, int]:
+    """Límites [inicio, fin) de los datos tras quitar ID3v2, ID3v1, APEv2 y Lyrics3"""
+    start, end = 0, len(data)
+
+    # ID3v2 al inicio (puede haber varios seguidos)
+    while data[start:start + 3] == b'ID3' and start + 10 <= end:
+        size = 0
+        for b in data[start + 6:start + 10]:
+            size = (size << 7) | (b & 0x7F)
+        footer = 10 if data[start + 5] & 0x10 else 0
+        start += 10 + size + footer
+
+    # Etiquetas al final, en cualquier orden
+    changed = True
+    while changed and end > start:
+        changed = False
+        if end - start >= 128 and data[end - 128:end - 125] == b'TAG':
+            end -= 128
+            changed = True
+        if end - start >= 32 and data[end - 32:end - 24] == b'APETAGEX':
+            size, flags = struct.unpack('<I4xI', data[end - 20:end - 8])
+            end -= size + (32 if flags & 0x80000000 else 0)
+            changed = True
+        if end - start >= 15 and data[end - 9:end] == b'LYRICS200':
+            size = data[end - 15:end - 9]
+            if size.isdigit():
+                end -= int(size) + 15
+                changed = True
+    return start, max(end, start)
+
+
+def _flac_payload(data: bytes, start: int) -> Optional[Iterable[memoryview]]:
+    """Frames de audio FLAC: todo lo que sigue a los bloques de metadatos"""
+    pos = start + 4
+    while pos + 4 <= len(data):
+        header = data[pos]
+        pos += 4 + int.from_bytes(data[pos + 1:pos + 4], 'big')
+        if header & 0x80:
+            return [memoryview(data)[pos:]] if pos <= len(data) else None
+    return None
+
+
+def _mp4_payload(data: bytes, start: int) -> Optional[Iterable[memoryview]]:
+    """Contenido de los átomos 'mdat' (las etiquetas van en moov/udta)"""
+    chunks, pos = [], start
+    while pos + 8 <= len(data):
+        size, kind = struct.unpack('>I4s', data[pos:pos + 8])
+        header = 8
+        if size == 1 and pos + 16 <= len(data):
+            size, header = struct.unpack('>Q', data[pos + 8:pos + 16])[0], 16
+        elif size == 0:
+            size = len(data) - pos
+        if size < header:
+            break
+        if kind == b'mdat':
+            chunks.append(memoryview(data)[pos + header:pos + size])
+        pos += size
+    return chunks or None
+
+
+def _wav_payload(data: bytes, start: int) -> Optional[Iterable[memoryview]]:
+    """Chunk 'data' de un WAV (LIST/INFO e id3 quedan fuera)"""
+    pos = start + 12
+    while pos + 8 <= len(data):
+        kind, size = struct.unpack('<4sI', data[pos:pos + 8])
+        if kind == b'data':
+            return [memoryview(data)[pos + 8:pos + 8 + size]]
+        pos += 8 + size + (size & 1)
+    return None
+
+
+def _ogg_payload(data: bytes, start: int) -> Optional[Iterable[memoryview]]:
+    """Paquetes de audio del primer flujo Ogg, sin las cabeceras (Vorbis: 3, Opus: 2)
+
+    Se hashean los paquetes, no las páginas: al cambiar los comentarios
+    cambian la numeración y el CRC de todas las páginas siguientes.
+    """
+    chunks, pos, serial = [], start, None
+    packet, headers, skip = 0, None, 0
+    while data[pos:pos + 4] == b'OggS' and pos + 27 <= len(data):
+        page_serial = data[pos + 14:pos + 18]
+        segments = data[pos + 26]
+        lacing = data[pos + 27:pos + 27 + segments]
+        body = pos + 27 + segments
+        if serial is None:
+            serial = page_serial
+        if page_serial == serial:
+            offset = body
+            for value in lacing:
+                if headers is None:
+                    headers = 2 if data[offset:offset + 8] == b'OpusHead' else 3
+                if packet >= headers:
+                    chunks.append(memoryview(data)[offset:offset + value])
+                offset += value
+                if value < 255:
+                    packet += 1
+        pos = body + sum(lacing)
+    return chunks if headers is not None else None
+
+
+def audio_content_hash(data: bytes) -> str:
+    """sha256 del audio, sin etiquetas ni portada
+
+    Reetiquetar un archivo o cambiar su carátula no cambia el hash. Se
+    hashean los frames MPEG (MP3), los frames FLAC, los paquetes de audio
+    Ogg (Vorbis, Opus), los átomos mdat (M4A) o el chunk data (WAV). Si el
+    formato no se reconoce se usa el sha256 del archivo completo.
+    """
+    start, end = _strip_tags(data)
+    if data[start:start + 4] == b'fLaC':
+        payload = _flac_payload(data, start)
+    elif data[start:start + 4] == b'OggS':
+        payload = _ogg_payload(data, start)
+    elif data[start + 4:start + 8] == b'ftyp':
+        payload = _mp4_payload(data, start)
+    elif data[start:start + 4] == b'RIFF' and data[start + 8:start + 12] == b'WAVE':
+        payload = _wav_payload(data, start)
+    else:
+        payload = None
+    if payload is not None:
+        digest = hashlib.sha256()
+        for chunk in payload:
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    # MPEG: saltar basura hasta la primera cabecera válida seguida de otra
+    pos = data.find(b'\xFF', start, end)
+    while pos != -1:
+        length = _mpeg_frame_length(data, pos)
+        if length and (_mpeg_frame_length(data, pos + length) or pos + length >= end):
+            return hashlib.sha256(data[pos:end]).hexdigest()
+        pos = data.find(b'\xFF', pos + 1, end)
+    return hashlib.sha256(data).hexdigest()
+
+
+def chroma_fingerprint(y: np.ndarray, sr: int, frame_length: int = 8192, hop_length: int = 1024,
+                       block_frames: int = 256) -> np.ndarray:
+    """Huella compacta de 32 bits por frame a partir de croma y energía por bandas
+
+    Frames de ~0.37 s cada ~46 ms (a 22050 Hz). Por frame:
+    - 12 bits: cada clase de altura frente a la siguiente
+    - 12 bits: cada clase de altura frente a su quinta
+    - 8 bits: diferencia entre bandas de energía adyacentes frente al frame anterior
+    Sólo comparaciones relativas, así que el volumen, la ecualización suave y
+    el retardo del codificador de una recodificación apenas cambian los bits.
+    Los frames se procesan por bloques para acotar la memoria.
+    """
+    y = np.asarray(y, dtype=np.float32)
+    if len(y) < frame_length:
+        y = np.pad(y, (0, frame_length - len(y)))
+    frames = np.lib.stride_tricks.sliding_window_view(y, frame_length)[::hop_length]
+    window = np.hanning(frame_length).astype(np.float32)
+    freqs = np.fft.rfftfreq(frame_length, 1.0 / sr)
+
+    valid = (freqs >= 55) & (freqs <= 5000)
+    pitch_class = np.round(12 * np.log2(freqs[valid] / 440.0)).astype(int) % 12
+    chroma_map = np.eye(12, dtype=np.float32)[pitch_class]
+    edges = np.searchsorted(freqs, np.geomspace(55, 5000, 10))[:-1]
+
+    chroma = np.empty((len(frames), 12), dtype=np.float32)
+    bands = np.empty((len(frames), 9), dtype=np.float32)
+    for i in range(0, len(frames), block_frames):
+        S = np.abs(np.fft.rfft(frames[i:i + block_frames] * window, axis=1)) ** 2
+        chroma[i:i + block_frames] = S[:, valid] @ chroma_map
+        bands[i:i + block_frames] = np.add.reduceat(S, edges, axis=1)[:, :9]
+    chroma /= chroma.sum(axis=1, keepdims=True) + 1e-10
+    bands = np.log(bands + 1e-10)
+    band_diff = bands[:, :-1] - bands[:, 1:]
+
+    bits = np.concatenate([
+        chroma > np.roll(chroma, -1, axis=1),
+        chroma > np.roll(chroma, -5, axis=1),
+        band_diff > np.vstack([band_diff[:1], band_diff[:-1]]),
+    ], axis=1)
+    weights = (1 << np.arange(32, dtype=np.uint64)).astype(np.uint64)
+    return (bits.astype(np.uint64) @ weights).astype(np.uint32)
+
+
+def fingerprint_distance(a: np.ndarray, b: np.ndarray, max_shift: int = 4) -> float:
+    """Tasa de bits distintos (0-1) con el mejor desfase de hasta `max_shift` frames"""
+    best = 1.0
+    for shift in range(-max_shift, max_shift + 1):
+        x = a[max(shift, 0):]
+        z = b[max(-shift, 0):]
+        n = min(len(x), len(z))
+        if n == 0:
+            continue
+        errors = np.unpackbits(np.bitwise_xor(x[:n], z[:n]).view(np.uint8)).sum()
+        best = min(best, errors / (32.0 * n))
+    return best
+
+
+class FingerprintIndex:
+    """Identidad de audio en dos niveles sobre la base de datos del servidor
+
+    1. Hash de los frames de audio (exacto, ignora etiquetas)
+    2. Huella de croma/energía para recodificaciones casi idénticas
+
+    Devuelve un hash canónico: el del primer archivo visto con ese audio.
+    Los trabajos y todas las cachés (PCM, análisis) usan ese hash.
+    """
+
+    # Recodificaciones: < 0.07 de bits distintos; pistas distintas: > 0.25
+    MATCH_THRESHOLD = 0.15
+    DURATION_TOLERANCE = 2.0
+    # La huella sale de los primeros minutos, decodificados aparte y sin caché
+    # (la pista completa la decodifica el análisis con su propio perfil)
+    FINGERPRINT_SECONDS = 120.0
+    SAMPLE_RATE = 22050
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('''CREATE TABLE IF NOT EXISTS audio_fingerprints
+                        (audio_hash TEXT PRIMARY KEY,
+                         duration REAL,
+                         fingerprint BLOB)''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_fingerprint_duration ON audio_fingerprints (duration)')
+        conn.commit()
+        conn.close()
+
+    def resolve(self, file_path: str, audio_hash: str) -> str:
+        """Hash canónico del audio en `file_path` (cuyo hash de frames es `audio_hash`)"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            known = conn.execute('SELECT 1 FROM audio_fingerprints WHERE audio_hash = ?',
+                                 (audio_hash,)).fetchone()
+            if known:
+                return audio_hash
+
+            # Memoria acotada aunque la pista dure horas: unos 10 MB de PCM
+            y = AudioDecoder().decode(file_path, self.SAMPLE_RATE, duration=self.FINGERPRINT_SECONDS)
+            fingerprint = chroma_fingerprint(y, self.SAMPLE_RATE)
+            # Duración completa de las cabeceras (mutagen o, si no la tienen, soundfile/audioread)
+            duration = audio_duration(file_path) or librosa.get_duration(path=file_path)
+
+            match = self._lookup(conn, fingerprint, duration)
+            if match is not None:
+                print(f"Audio casi idéntico a {match[:16]}... (recodificación)")
+                return match
+
+            conn.execute('INSERT OR REPLACE INTO audio_fingerprints VALUES (?, ?, ?)',
+                         (audio_hash, duration, fingerprint.tobytes()))
+            conn.commit()
+            return audio_hash
+        finally:
+            conn.close()
+
+    def _lookup(self, conn: sqlite3.Connection, fingerprint: np.ndarray, duration: float) -> Optional[str]:
+        rows = conn.execute('SELECT audio_hash, fingerprint FROM audio_fingerprints '
+                            'WHERE duration BETWEEN ? AND ?',
+                            (duration - self.DURATION_TOLERANCE, duration + self.DURATION_TOLERANCE))
+        best_hash, best_distance = None, self.MATCH_THRESHOLD
+        for audio_hash, blob in rows:
+            distance = fingerprint_distance(fingerprint, np.frombuffer(blob, dtype=np.uint32))
+            if distance < best_distance:
+                best_hash, best_distance = audio_hash, distance
+        return best_hash
@@ -0,0 +1,328 @@
+import os
+import json
+import time
+import shutil
+import threading
+import numpy as np
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from ..config import Config
+from ..event_table import EventTable
+
+try:
+    import fcntl
+    msvcrt = None
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+Range = Optional[Tuple[Optional[float], Optional[float]]]
+
+
+def track_summary(audio_hash: str, result: Dict[str, Any], bins: int = 16) -> Dict[str, Any]:
+    """Fila del índice a partir del resultado de EventGenerator.generate_events
+
+    La energía sale de la intensidad de los eventos (RMS absoluto, así que
+    es comparable entre pistas) ponderada por su duración; el perfil es esa
+    misma energía en `bins` tramos iguales de la canción.
+    """
+    metadata = result['metadata']
+    events = EventTable.coerce(result['events'])
+    duration = float(metadata.get('duration') or (events.end_times[-1] if len(events) else 0.0))
+
+    profile = np.zeros(bins, dtype=np.float32)
+    energy = peak = 0.0
+    if len(events) and duration > 0:
+        intensity = np.asarray(events.column('intensity'), dtype=np.float64)
+        starts = np.clip(events.start_times, 0.0, duration)
+        ends = np.clip(events.end_times, 0.0, duration)
+        energy = float(np.sum(intensity * (ends - starts)) / duration)
+        peak = float(np.percentile(intensity, 90))
+
+        # Intensidad media por tramo: solapamiento de cada evento con cada tramo
+        edges = np.linspace(0.0, duration, bins + 1)
+        overlap = np.clip(np.minimum(ends[:, None], edges[None, 1:]) - np.maximum(starts[:, None], edges[None, :-1]),
+                          0.0, None)
+        profile = (intensity @ overlap / np.diff(edges)).astype(np.float32)
+
+    return {
+        'audio_hash': audio_hash,
+        'tempo': float(np.atleast_1d(metadata.get('tempo', 0.0))[0]),
+        'duration': duration,
+        'event_density': len(events) / duration * 60.0 if duration > 0 else 0.0,
+        'energy': energy,
+        'energy_peak': peak,
+        'energy_profile': profile,
+        'sections': len({s['label'] for s in metadata.get('sections', [])}),
+        'added_at': time.time(),
+    }
+
+
+class LibraryIndex:
+    """Índice columnar del análisis de toda la biblioteca del servidor
+
+    Una fila por audio (hash canónico) con tempo, duración, densidad de
+    eventos (por minuto) y energía. Cada columna es un .npy que se mapea en
+    memoria, así que una consulta es un par de comparaciones vectorizadas
+    sobre arreglos contiguos, sin tocar la base de datos ni reanalizar.
+
+    Las escrituras generan una nueva versión de las columnas en un
+    directorio aparte y cambian `current.json` de forma atómica: los
+    lectores ven siempre una versión completa. Leer, escribir y cambiar de
+    versión se hace con un lock de archivo (`index.lock`), así que varios
+    procesos pueden escribir sin perder filas. Cada escritura copia las
+    columnas (unos 150 bytes por pista), así que los lotes deben ir por
+    add_many.
+    """
+
+    PROFILE_BINS = 16
+    COLUMNS = {
+        'audio_hash': 'S64',
+        'tempo': 'f4',
+        'duration': 'f4',
+        'event_density': 'f4',
+        'energy': 'f4',
+        'energy_peak': 'f4',
+        'energy_profile': ('f4', PROFILE_BINS),
+        'sections': 'i2',
+        'added_at': 'f8',
+    }
+    # Niveles de energía: tercios de la biblioteca actual
+    ENERGY_LEVELS = {'low': (0.0, 1 / 3), 'medium': (1 / 3, 2 / 3), 'high': (2 / 3, 1.0)}
+    _lock = threading.Lock()
+
+    def __init__(self, index_dir: Optional[str] = None):
+        self.index_dir = Path(index_dir or Config.CACHE['LIBRARY_DIR'])
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self._pointer = self.index_dir / 'current.json'
+        self._lock_path = self.index_dir / 'index.lock'
+        self._loaded_stamp = None
+        self._columns = None
+        self._quantiles = None
+
+    # --- Lectura ---
+
+    def _stamp(self) -> Optional[str]:
+        """Nombre de la versión actual (el mtime de current.json no cambia en dos escrituras seguidas)"""
+        try:
+            with open(self._pointer) as f:
+                return json.load(f)['generation']
+        except FileNotFoundError:
+            return None
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Columnas actuales (mapeadas en memoria); se recargan si el índice cambió"""
+        stamp = self._stamp()
+        if self._columns is None or stamp != self._loaded_stamp:
+            try:
+                self._columns, self._loaded_stamp = self._load(stamp), stamp
+            except FileNotFoundError:
+                # Otro proceso cambió de versión y borró esta entre las dos lecturas
+                with self._exclusive():
+                    stamp = self._stamp()
+                    self._columns, self._loaded_stamp = self._load(stamp), stamp
+        return self._columns
+
+    def _load(self, generation: Optional[str]) -> Dict[str, np.ndarray]:
+        if generation is None:
+            return self._empty()
+        path = self.index_dir / generation
+        return {name: np.load(path / f'{name}.npy', mmap_mode='r') for name in self.COLUMNS}
+
+    @contextmanager
+    def _exclusive(self):
+        """Lock entre hilos (de la clase) y entre procesos (index.lock)"""
+        with self._lock, open(self._lock_path, 'a+b') as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                while True:
+                    try:
+                        # LK_LOCK sólo reintenta 10 segundos
+                        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        pass
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _empty(self) -> Dict[str, np.ndarray]:
+        columns = {}
+        for name, dtype in self.COLUMNS.items():
+            shape = (0, dtype[1]) if isinstance(dtype, tuple) else (0,)
+            columns[name] = np.zeros(shape, dtype=dtype[0] if isinstance(dtype, tuple) else dtype)
+        return columns
+
+    def __len__(self) -> int:
+        return len(self.columns()['audio_hash'])
+
+    def get(self, audio_hash: str) -> Optional[Dict[str, Any]]:
+        columns = self.columns()
+        found = np.flatnonzero(columns['audio_hash'] == audio_hash.encode())
+        return self._row(columns, int(found[0])) if len(found) else None
+
+    def query(self, tempo: Range = None, energy: Union[Range, str] = None, duration: Range = None,
+              event_density: Range = None, tempo_octaves: bool = False, order_by: str = 'energy',
+              descending: bool = True, limit: Optional[int] = 100) -> Dict[str, Any]:
+        """Pistas que cumplen todos los filtros
+
+        Los rangos son (mínimo, máximo) inclusivos; cualquiera de los dos
+        puede ser None. `energy` acepta también 'low', 'medium' o 'high'
+        (tercios de la energía de la biblioteca). Con `tempo_octaves` el
+        rango de tempo incluye también la mitad y el doble, por si el
+        detector eligió otra octava.
+
+        Returns:
+            {'count': total de coincidencias, 'tracks': hasta `limit` filas ordenadas por `order_by`}
+        """
+        if order_by not in self.COLUMNS or order_by in ('audio_hash', 'energy_profile'):
+            raise ValueError(f"cannot order by {order_by}")
+        columns = self.columns()
+        mask = np.ones(len(columns['audio_hash']), dtype=bool)
+
+        if tempo is not None:
+            factors = (0.5, 1.0, 2.0) if tempo_octaves else (1.0,)
+            tempo_mask = np.zeros_like(mask)
+            for factor in factors:
+                low, high = tempo
+                tempo_mask |= _in_range(columns['tempo'], (low * factor if low is not None else None,
+                                                           high * factor if high is not None else None))
+            mask &= tempo_mask
+        if isinstance(energy, str):
+            energy = self._energy_level(columns['energy'], energy)
+        for name, bounds in (('energy', energy), ('duration', duration), ('event_density', event_density)):
+            if bounds is not None:
+                mask &= _in_range(columns[name], bounds)
+
+        matches = np.flatnonzero(mask)
+        keys = columns[order_by][matches]
+        keys = -keys.astype(np.float64) if descending else keys
+        if limit is not None and limit < len(matches):
+            # Sólo se ordenan las `limit` primeras
+            top = np.argpartition(keys, limit - 1)[:limit]
+            order = top[np.argsort(keys[top], kind='stable')]
+        else:
+            order = np.argsort(keys, kind='stable')
+        return {'count': len(matches), 'tracks': self._rows(columns, matches[order])}
+
+    def _energy_level(self, energy: np.ndarray, level: str) -> Tuple[float, float]:
+        if level not in self.ENERGY_LEVELS:
+            raise ValueError(f"unknown energy level: {level}")
+        if len(energy) == 0:
+            return (0.0, 0.0)
+        # Los cuantiles sólo cambian cuando se recarga el índice
+        if self._quantiles is None or self._quantiles[0] != self._loaded_stamp:
+            self._quantiles = (self._loaded_stamp, {})
+        levels = self._quantiles[1]
+        if level not in levels:
+            levels[level] = tuple(float(q) for q in np.quantile(energy, self.ENERGY_LEVELS[level]))
+        return levels[level]
+
+    def _row(self, columns: Dict[str, np.ndarray], i: int) -> Dict[str, Any]:
+        return self._rows(columns, np.array([i]))[0]
+
+    def _rows(self, columns: Dict[str, np.ndarray], indices: np.ndarray) -> List[Dict[str, Any]]:
+        values = {}
+        for name in self.COLUMNS:
+            column = columns[name][indices]
+            if name == 'audio_hash':
+                values[name] = [h.decode() for h in column]
+            elif name == 'sections':
+                values[name] = column.tolist()
+            else:
+                values[name] = np.round(column.astype(np.float64), 3).tolist()
+        return [dict(zip(values, row)) for row in zip(*values.values())]
+
+    # --- Escritura ---
+
+    def add(self, audio_hash: str, result: Dict[str, Any]):
+        """Añade (o reemplaza) la pista con el resultado de generate_events"""
+        self.add_many([track_summary(audio_hash, result, self.PROFILE_BINS)])
+
+    def add_many(self, rows: Iterable[Dict[str, Any]]):
+        """Añade o reemplaza varias filas (de track_summary) en una sola escritura"""
+        rows = list({row['audio_hash']: row for row in rows}.values())
+        if not rows:
+            return
+        new = self._as_columns(rows)
+        with self._exclusive():
+            columns = self._load(self._stamp())
+            keep = ~np.isin(columns['audio_hash'], new['audio_hash'])
+            self._write({name: np.concatenate([columns[name][keep], new[name]]) for name in self.COLUMNS})
+
+    def rebuild(self, cache) -> int:
+        """Reconstruye el índice a partir de los resultados guardados en AnalysisCache"""
+        rows = {audio_hash: track_summary(audio_hash, result, self.PROFILE_BINS)
+                for audio_hash, result in cache.results()}
+        with self._exclusive():
+            self._write(self._as_columns(list(rows.values())))
+        return len(rows)
+
+    def _as_columns(self, rows: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        columns = self._empty()
+        if rows:
+            for name, empty in columns.items():
+                columns[name] = np.array([row[name] for row in rows], dtype=empty.dtype)
+        return columns
+
+    def _write(self, columns: Dict[str, np.ndarray]):
+        """Nueva versión y cambio de current.json (con el lock de _exclusive tomado)"""
+        generation = f'gen_{time.time_ns()}_{os.getpid()}'
+        path = self.index_dir / generation
+        path.mkdir()
+        for name, values in columns.items():
+            np.save(path / f'{name}.npy', np.ascontiguousarray(values))
+
+        temp_pointer = self._pointer.with_suffix('.tmp')
+        with open(temp_pointer, 'w') as f:
+            json.dump({'generation': generation, 'rows': len(columns['audio_hash'])}, f)
+        os.replace(temp_pointer, self._pointer)
+
+        # Versiones anteriores: los lectores que las tengan mapeadas siguen funcionando, y
+        # los que leyeron current.json antes del cambio la vuelven a leer con el lock
+        for old in self.index_dir.glob('gen_*'):
+            if old.name != generation:
+                shutil.rmtree(old, ignore_errors=True)
+
+
+def _in_range(values: np.ndarray, bounds: Tuple[Optional[float], Optional[float]]) -> np.ndarray:
+    low, high = bounds
+    mask = np.ones(len(values), dtype=bool)
+    if low is not None:
+        mask &= values >= low
+    if high is not None:
+        mask &= values <= high
+    return mask
+
+
+def main():
+    import argparse
+    from .analysis_cache import AnalysisCache
+
+    parser = argparse.ArgumentParser(description="Índice de análisis de la biblioteca")
+    parser.add_argument('--rebuild', action='store_true', help="Reconstruir desde la caché de análisis")
+    parser.add_argument('--tempo', nargs=2, type=float, metavar=('MIN', 'MAX'))
+    parser.add_argument('--energy', choices=list(LibraryIndex.ENERGY_LEVELS))
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    index = LibraryIndex()
+    if args.rebuild:
+        print(f"Índice reconstruido con {index.rebuild(AnalysisCache())} pistas")
+    start = time.perf_counter()
+    result = index.query(tempo=tuple(args.tempo) if args.tempo else None, energy=args.energy, limit=args.limit)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(json.dumps(result, indent=2))
+    print(f"{result['count']} de {len(index)} pistas en {elapsed:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+import sys
+import json
+import argparse
+import librosa
+import numpy as np
+import soundfile as sf
+import soxr
+from typing import BinaryIO, Dict, Iterator, List, Optional
+from ..config import Config
+from ..event_table import EventTable
+from .streaming import StreamingAnalyzer
+
+
+def wav_chunks(file_path: str, chunk_seconds: float = 0.5) -> Iterator[np.ndarray]:
+    """Lee un archivo de audio por bloques (mono, float32), como llegaría por la red"""
+    sr = sf.info(file_path).samplerate
+    for block in sf.blocks(file_path, blocksize=max(1, int(chunk_seconds * sr)), dtype='float32', always_2d=True):
+        yield block.mean(axis=1)
+
+
+def pcm_chunks(stream: BinaryIO, channels: int = 1, chunk_frames: int = 4096,
+               dtype: str = '<i2') -> Iterator[np.ndarray]:
+    """Lee PCM crudo entrelazado (por defecto s16le) de un pipe o stdin, en bloques mono float32"""
+    sample = np.dtype(dtype)
+    frame_bytes = sample.itemsize * channels
+    scale = float(2 ** (8 * sample.itemsize - 1)) if sample.kind == 'i' else 1.0
+    carry = b''
+    while True:
+        data = stream.read(chunk_frames * frame_bytes)
+        if not data:
+            break
+        data = carry + data
+        usable = len(data) - len(data) % frame_bytes
+        carry = data[usable:]
+        if usable:
+            frames = np.frombuffer(data[:usable], dtype=sample).reshape(-1, channels)
+            yield (frames.astype(np.float32) / scale).mean(axis=1)
+
+
+class OnlineEventDetector(StreamingAnalyzer):
+    """Detección incremental de eventos sobre PCM que llega por bloques
+
+    Reutiliza el enmarcado y la envolvente de onset de StreamingAnalyzer
+    (mismos frames que el análisis completo) y decide cada frame en cuanto
+    tiene `online_lookahead` segundos de contexto por delante:
+
+    - Onsets: máximo local sobre la envolvente, por encima de su media
+      reciente más `online_delta` veces un pico que decae lentamente (el
+      máximo global no se conoce todavía).
+    - Beats: seguidor causal. El periodo se reestima cada
+      `online_tempo_update` segundos con la autocorrelación de los últimos
+      `online_tempo_window` segundos de envolvente; cada beat se predice un
+      periodo después del anterior y se ajusta al pico más fuerte de la
+      envolvente cerca de la predicción.
+
+    Los eventos se emiten en orden, con la misma separación mínima que el
+    análisis completo, como mucho `latency` segundos después de ocurrir
+    (la anticipación más el margen del ajuste de beat).
+
+    Por bloque sólo se calculan la envolvente de onset y el RMS por frame,
+    y tras cada decisión se descarta todo lo anterior a la ventana que aún
+    se consulta (la del tempo, la más larga), así que la memoria no crece
+    con la duración del stream. Los eventos no se guardan: quien necesite
+    la tabla completa acumula lo que devuelven push y flush. Uso:
+
+        detector = OnlineEventDetector()
+        detector.start(44100)
+        events = []
+        for chunk in wav_chunks(path):
+            events.extend(detector.push(chunk))
+        events.extend(detector.flush())
+        table = events_table(events, detector.duration)
+    """
+
+    def __init__(self, cfg: Optional[Dict] = None):
+        super().__init__(cfg)
+        self._resampler = None
+        self._started = False
+
+    # ------------------------------------------------------------------
+    # Entrada
+    # ------------------------------------------------------------------
+    def start(self, sample_rate: int):
+        """Prepara el detector para una señal de `sample_rate` Hz"""
+        sr, hop = self.cfg['sr'], self.cfg['hop_length']
+        quality = self.cfg['res_type'].replace('soxr_', '').upper()
+        self._resampler = soxr.ResampleStream(sample_rate, sr, 1, dtype='float32', quality=quality) \
+            if sample_rate != sr else None
+        self._reset()
+        self._buffer = np.zeros(self.cfg['n_fft'] // 2, dtype=np.float32)
+
+        frame_rate = sr / hop
+        self._lookahead = max(1, int(round(self.cfg['online_lookahead'] * frame_rate)))
+        self._pre_max = self._lookahead
+        self._pre_avg = max(1, int(round(self.cfg['online_history'] * frame_rate)))
+        self._wait = max(1, int(round(self.cfg['online_wait'] * frame_rate)))
+        self._peak_decay = 0.5 ** (1.0 / (self.cfg['online_peak_halflife'] * frame_rate))
+        # Tolerancia del ajuste de beat: no puede mirar más allá del contexto disponible
+        self._beat_tolerance = max(1, self._lookahead // 2)
+
+        # Frames que se siguen consultando por detrás del último decidido
+        self._horizon = max(int(self.cfg['online_tempo_window'] * frame_rate), self._pre_avg,
+                            self._pre_max, 2 * self._beat_tolerance) + 1
+
+        # Envolvente y RMS por frame, desde el frame absoluto self._base hasta _n_env / _n_rms
+        pad = 1 + self.cfg['n_fft'] // (2 * hop)
+        self._base = 0
+        self._env = np.zeros(pad, dtype=np.float32)
+        self._n_env = pad
+        self._frame_rms = np.zeros(0, dtype=np.float32)
+        self._n_rms = 0
+        self._initial_intensity = None
+        self._decided = -1
+        self._peak = 1e-6
+        self._last_onset = -np.inf
+        self._period = None
+        self._next_beat = None
+        self._last_beat = None
+        self._last_tempo_update = 0
+        self._pending = []
+        self._last_start = None
+        self._new_beats = []
+        self._started = True
+
+    def push(self, samples: np.ndarray) -> List[Dict]:
+        """Añade un bloque de muestras (mono, a la frecuencia de start) y devuelve los eventos nuevos"""
+        if not self._started:
+            raise RuntimeError('call start() before push()')
+        samples = np.asarray(samples, dtype=np.float32)
+        self._new_beats = []
+        self._consume(self._resampler.resample_chunk(samples) if self._resampler else samples)
+        return self._emit(self._decided - 2 * self._beat_tolerance)
+
+    def flush(self) -> List[Dict]:
+        """Procesa el final de la señal y devuelve los eventos que quedaban pendientes"""
+        self._new_beats = []
+        if self._resampler:
+            self._consume(self._resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True))
+        self._finish()
+        # Al final ya no hay contexto futuro que esperar (la envolvente no pasa del último frame)
+        self._decide(min(self._n_env, self._n_frames) - 1)
+        events = self._emit(np.inf)
+        self._started = False
+        return events
+
+    @property
+    def duration(self) -> float:
+        """Segundos de señal recibidos hasta ahora"""
+        return self._n_samples / self.cfg['sr']
+
+    @property
+    def beat_times(self) -> np.ndarray:
+        """Beats decididos en la última llamada a push o flush
+
+        Algunos no llegan a evento por la separación mínima.
+        """
+        return np.asarray(self._new_beats, dtype=float) * self.cfg['hop_length'] / self.cfg['sr']
+
+    @property
+    def latency(self) -> float:
+        """Retardo máximo (s) entre un evento y su emisión, sin contar el tamaño del bloque
+
+        Frames de anticipación y de margen del beat, más la media ventana de
+        la STFT que cada frame necesita por delante.
+        """
+        frames = self._lookahead + 2 * self._beat_tolerance
+        return (frames * self.cfg['hop_length'] + self.cfg['n_fft'] // 2) / self.cfg['sr']
+
+    # ------------------------------------------------------------------
+    # Procesamiento por frame
+    # ------------------------------------------------------------------
+    def _accumulate_energy(self, samples: np.ndarray):
+        # La energía por hop sólo sirve para el bundle del análisis completo
+        pass
+
+    def _process_frames(self, chunk: np.ndarray):
+        """Sólo envolvente de onset y RMS, con los mismos frames que StreamingAnalyzer"""
+        hop, n_fft = self.cfg['hop_length'], self.cfg['n_fft']
+        S = np.abs(librosa.stft(chunk, n_fft=n_fft, hop_length=hop, center=False))
+        self._n_frames += S.shape[1]
+
+        rms = librosa.feature.rms(S=S, frame_length=n_fft, hop_length=hop)[0]
+        self._frame_rms = _append(self._frame_rms, self._n_rms - self._base, rms)
+        self._n_rms += len(rms)
+
+        mel_db = librosa.power_to_db(self._mel_basis @ (S**2), top_db=None)
+        self._db_max = max(self._db_max, float(mel_db.max()))
+        mel_db = np.maximum(mel_db, self._db_max - 80.0)
+        if self._prev_mel_db is not None:
+            mel_db_ext = np.concatenate([self._prev_mel_db, mel_db], axis=1)
+        else:
+            mel_db_ext = mel_db
+        flux = np.maximum(0.0, mel_db_ext[:, 1:] - mel_db_ext[:, :-1]).mean(axis=0)
+        self._prev_mel_db = mel_db[:, -1:]
+        self._env = _append(self._env, self._n_env - self._base, flux)
+        self._n_env += len(flux)
+
+        self._decide(self._n_env - 1 - self._lookahead)
+        self._trim()
+
+    def _trim(self):
+        """Descarta la envolvente y el RMS que ya no se van a consultar"""
+        keep_from = self._decided + 1 - self._horizon
+        if self._pending:
+            keep_from = min(keep_from, min(frame for frame, _ in self._pending))
+        drop = keep_from - self._base
+        if drop <= 0:
+            return
+        if self._initial_intensity is None:
+            # El evento inicial (frame 0) puede emitirse después de descartar su RMS
+            self._initial_intensity = self._intensity(0)
+        n_env, n_rms = self._n_env - self._base, self._n_rms - self._base
+        self._env[:n_env - drop] = self._env[drop:n_env]
+        self._frame_rms[:max(0, n_rms - drop)] = self._frame_rms[drop:n_rms]
+        self._base = keep_from
+
+    def _decide(self, last_frame: int):
+        """Decide onsets y beats de los frames (self._decided, last_frame]"""
+        # Índices absolutos de frame; el buffer empieza en self._base
+        base = self._base
+        env = self._env[:self._n_env - base]
+        for t in range(self._decided + 1, last_frame + 1):
+            self._peak = max(float(env[t - base]), self._peak * self._peak_decay)
+            self._update_tempo(t)
+
+            lo, hi = max(base, t - self._pre_max) - base, min(self._n_env, t + self._lookahead + 1) - base
+            avg_lo = max(base, t - self._pre_avg) - base
+            value = env[t - base]
+            is_peak = value > 0 and value >= env[lo:hi].max()
+            above = value >= env[avg_lo:hi].mean() + self.cfg['online_delta'] * self._peak
+            if is_peak and above and t - self._last_onset >= self._wait:
+                self._last_onset = t
+                self._pending.append((t, 'onset'))
+
+            # Beat: al llegar al final de la ventana de tolerancia de la predicción
+            if self._next_beat is not None and t >= self._next_beat + self._beat_tolerance:
+                w_lo = max(base, self._next_beat - self._beat_tolerance)
+                window = env[w_lo - base:t + 1 - base]
+                # Ajustar al pico si es claro; si no, mantener la predicción
+                beat = w_lo + int(np.argmax(window)) if window.max() > 0.5 * self._peak else self._next_beat
+                self._pending.append((beat, 'beat'))
+                self._new_beats.append(beat)
+                self._last_beat = beat
+                self._next_beat = beat + self._period
+        self._decided = max(self._decided, last_frame)
+
+    def _update_tempo(self, t: int):
+        """Reestima periodo y fase del beat (en frames) con la envolvente reciente"""
+        frame_rate = self.cfg['sr'] / self.cfg['hop_length']
+        if t - self._last_tempo_update < self.cfg['online_tempo_update'] * frame_rate:
+            return
+        self._last_tempo_update = t
+        window = int(self.cfg['online_tempo_window'] * frame_rate)
+        base = self._base
+        raw = np.asarray(self._env[max(base, t - window) - base:t + 1 - base], dtype=np.float64)
+        if len(raw) < 0.5 * window or not raw.any():
+            return
+        history = raw - raw.mean()
+        spectrum = np.fft.rfft(history, n=2 * len(history))
+        ac = np.fft.irfft(spectrum * np.conj(spectrum))[:len(history)]
+
+        # Periodos entre 40 y 250 BPM, con preferencia log-normal alrededor de 120 BPM (como librosa)
+        lags = np.arange(max(1, int(frame_rate * 60 / 250)), min(len(ac), int(frame_rate * 60 / 40) + 1))
+        if len(lags) == 0:
+            return
+        bpm = 60.0 * frame_rate / lags
+        prior = np.exp(-0.5 * (np.log2(bpm / 120.0)) ** 2)
+        period = int(lags[np.argmax(ac[lags] * prior)])
+        self._period = period
+
+        # Fase: el desfase cuyo peine de beats (hacia atrás desde t) recoge más envolvente
+        n_beats = len(raw) // period
+        comb = raw[len(raw) - n_beats * period:][::-1].reshape(n_beats, period).sum(axis=0)
+        next_beat = t - int(np.argmax(comb)) + period
+        # Evitar un beat doble si la nueva fase cae justo después del último beat
+        if self._last_beat is not None and next_beat - self._last_beat < period // 2:
+            next_beat += period
+        self._next_beat = next_beat
+
+    # ------------------------------------------------------------------
+    # Salida
+    # ------------------------------------------------------------------
+    def _emit(self, until_frame: float) -> List[Dict]:
+        """Emite en orden los eventos pendientes hasta `until_frame` (inclusive)"""
+        ready = sorted(e for e in self._pending if e[0] <= until_frame)
+        if not ready:
+            return []
+        self._pending = [e for e in self._pending if e[0] > until_frame]
+
+        frame_time = self.cfg['hop_length'] / self.cfg['sr']
+        emitted = []
+        for frame, event_type in ready:
+            start = frame * frame_time
+            previous = self._last_start
+            if previous is None and start > 0.1:
+                # Igual que el análisis completo: siempre hay un evento inicial
+                initial = self._intensity(0) if self._initial_intensity is None else self._initial_intensity
+                emitted.append({'start_time': 0.0, 'type': 'beat', 'intensity': initial})
+                previous = 0.0
+            if previous is not None and start - previous < self.cfg['min_event_interval']:
+                self._last_start = previous
+                continue
+            emitted.append({'start_time': start, 'type': event_type, 'intensity': self._intensity(frame)})
+            self._last_start = start
+        return emitted
+
+    def _intensity(self, frame: int) -> float:
+        """Intensidad (0-1) con el RMS del frame del evento y la ventana de anticipación"""
+        lo, hi = frame - self._base, min(frame + self._lookahead + 1, self._n_rms) - self._base
+        window = self._frame_rms[max(0, lo):max(0, hi)]
+        return float(np.clip(window.mean() * 2, 0, 1)) if len(window) else 0.0
+
+
+def events_table(events: List[Dict], duration: float) -> EventTable:
+    """Eventos emitidos (push y flush) como EventTable; cada uno dura hasta el siguiente"""
+    starts = np.array([e['start_time'] for e in events], dtype=float)
+    ends = np.append(starts[1:], max(duration, starts[-1])) if len(starts) else starts
+    return EventTable.from_columns(starts, ends, [e['type'] for e in events],
+                                   [e['intensity'] for e in events])
+
+
+def _append(buffer: np.ndarray, used: int, values: np.ndarray) -> np.ndarray:
+    """Escribe `values` tras las `used` primeras posiciones, duplicando la capacidad si hace falta"""
+    needed = used + len(values)
+    if needed > len(buffer):
+        grown = np.zeros(max(needed, 2 * len(buffer)), dtype=buffer.dtype)
+        grown[:used] = buffer[:used]
+        buffer = grown
+    buffer[used:needed] = values
+    return buffer
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Detección incremental de eventos')
+    parser.add_argument('source', help="Archivo de audio, o '-' para PCM s16le crudo por stdin")
+    parser.add_argument('--sr', type=int, default=44100, help='Frecuencia del PCM de stdin')
+    parser.add_argument('--channels', type=int, default=1, help='Canales del PCM de stdin')
+    parser.add_argument('--chunk-seconds', type=float, default=0.5)
+    args = parser.parse_args()
+
+    detector = OnlineEventDetector()
+    if args.source == '-':
+        detector.start(args.sr)
+        chunks = pcm_chunks(sys.stdin.buffer, args.channels, int(args.chunk_seconds * args.sr))
+    else:
+        detector.start(sf.info(args.source).samplerate)
+        chunks = wav_chunks(args.source, args.chunk_seconds)
+
+    # Una línea JSON por evento, en cuanto se decide
+    for chunk in chunks:
+        for event in detector.push(chunk):
+            print(json.dumps(event), flush=True)
+    for event in detector.flush():
+        print(json.dumps(event), flush=True)
+
+
+if __name__ == "__main__":
+    main()
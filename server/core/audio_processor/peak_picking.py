@@ -0,0 +1,68 @@
+import numpy as np
+from scipy.ndimage import maximum_filter1d
+from typing import Dict, List
+
+
+def normalize_envelope(envelope: np.ndarray) -> np.ndarray:
+    """Normaliza la envolvente a [0, 1] igual que librosa.onset.onset_detect"""
+    x = envelope - np.min(envelope)
+    x /= np.max(x) + np.finfo(x.dtype).tiny
+    return x
+
+
+def peak_pick_sweep(envelope: np.ndarray, levels: List[Dict]) -> List[np.ndarray]:
+    """Selección de picos para varios niveles de sensibilidad sobre una sola envolvente
+
+    Equivale a llamar librosa.util.peak_pick (vía onset_detect) una vez por
+    nivel, pero la envolvente se normaliza una sola vez y las condiciones de
+    máximo local y umbral sobre la media se evalúan vectorizadas. Sólo la
+    regla de espera (`wait`) se aplica secuencialmente, y únicamente sobre
+    los candidatos.
+
+    Returns:
+        Lista con los índices de frame de los picos de cada nivel
+    """
+    x = normalize_envelope(envelope)
+    if not x.any() or not np.all(np.isfinite(x)):
+        return [np.array([], dtype=int) for _ in levels]
+
+    n = len(x)
+    idx = np.arange(n)
+    cumsum = np.concatenate([[0.0], np.cumsum(x, dtype=np.float64)])
+    local_max_cache = {}
+    avg_cache = {}
+
+    results = []
+    for params in levels:
+        pre_max, post_max = int(np.ceil(params['pre_max'])), int(np.ceil(params['post_max']))
+        pre_avg, post_avg = int(np.ceil(params['pre_avg'])), int(np.ceil(params['post_avg']))
+        wait = int(np.ceil(params['wait']))
+
+        # Máximo en la ventana [n - pre_max, n + post_max)
+        if (pre_max, post_max) not in local_max_cache:
+            size = pre_max + post_max
+            local_max_cache[(pre_max, post_max)] = maximum_filter1d(
+                x, size, mode='constant', cval=-np.inf, origin=pre_max - size // 2)
+        local_max = local_max_cache[(pre_max, post_max)]
+
+        # Media en la ventana [n - pre_avg, n + post_avg) con sumas acumuladas
+        if (pre_avg, post_avg) not in avg_cache:
+            lo = np.maximum(idx - pre_avg, 0)
+            hi = np.minimum(idx + post_avg, n)
+            avg_cache[(pre_avg, post_avg)] = ((cumsum[hi] - cumsum[lo]) / (hi - lo)).astype(x.dtype)
+        avg = avg_cache[(pre_avg, post_avg)]
+
+        candidates = np.flatnonzero((x == local_max) & (x >= avg + np.float32(params['delta'])))
+        results.append(_apply_wait(candidates, wait))
+
+    return results
+
+
+def _apply_wait(candidates: np.ndarray, wait: int) -> np.ndarray:
+    """Descarta los candidatos a menos de `wait` frames del último pico aceptado"""
+    peaks = []
+    i = 0
+    while i < len(candidates):
+        peaks.append(candidates[i])
+        i = np.searchsorted(candidates, candidates[i] + wait + 1)
+    return np.array(peaks, dtype=int)
@@ -0,0 +1,58 @@
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from ..config import Config
+from .features import AudioFeatureBundle
+
+
+class SilenceDetector:
+    """Detecta silencios y regiones de baja energía (intros ambientales, fade-outs)
+
+    Trabaja sobre el RMS por frame ya calculado en AudioFeatureBundle. Un
+    frame es silencioso si su nivel queda `silence_threshold_db` por debajo
+    del percentil 95 de la pista; sólo cuentan las rachas de al menos
+    `silence_min_duration` segundos, así que las pausas cortas entre golpes
+    no se marcan.
+    """
+
+    def __init__(self, cfg: Optional[Dict] = None):
+        self.cfg = cfg or Config.AUDIO
+
+    def frame_mask(self, features: AudioFeatureBundle) -> np.ndarray:
+        """Máscara booleana por frame de las regiones silenciosas"""
+        rms = np.asarray(features.rms, dtype=np.float64)
+        if len(rms) == 0:
+            return np.zeros(0, dtype=bool)
+        reference = np.percentile(rms, 95)
+        if reference <= 0:
+            return np.ones(len(rms), dtype=bool)
+
+        level_db = 20 * np.log10(np.maximum(rms, 1e-10) / reference)
+        quiet = level_db < self.cfg['silence_threshold_db']
+
+        # Descartar rachas más cortas que la duración mínima
+        min_frames = int(np.ceil(self.cfg['silence_min_duration'] * features.sr / features.hop_length))
+        edges = np.diff(np.concatenate([[0], quiet.astype(np.int8), [0]]))
+        starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+        mask = np.zeros(len(rms), dtype=bool)
+        for start, end in zip(starts, ends):
+            if end - start >= min_frames:
+                mask[start:end] = True
+        return mask
+
+    def regions(self, features: AudioFeatureBundle, mask: Optional[np.ndarray] = None) -> List[Tuple[float, float]]:
+        """Regiones silenciosas como (inicio, fin) en segundos"""
+        mask = self.frame_mask(features) if mask is None else mask
+        edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+        frame_time = features.hop_length / features.sr
+        return [(float(start * frame_time), float(min(end * frame_time, features.duration)))
+                for start, end in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1))]
+
+    def silent_events(self, features: AudioFeatureBundle, start_times: np.ndarray,
+                      end_times: np.ndarray, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """Marca los eventos cuya duración cae mayormente (silence_event_fraction) en silencio"""
+        mask = self.frame_mask(features) if mask is None else mask
+        cumulative = np.concatenate([[0], np.cumsum(mask)])
+        start_frames = features.time_to_frames(start_times)
+        end_frames = np.maximum(features.time_to_frames(end_times), start_frames + 1)
+        fraction = (cumulative[end_frames] - cumulative[start_frames]) / (end_frames - start_frames)
+        return fraction >= self.cfg['silence_event_fraction']
@@ -0,0 +1,163 @@
+import librosa
+import numpy as np
+import soxr
+from mutagen import File as MutagenFile
+from typing import Dict, Optional
+from ..config import Config
+from .features import FrameFeatureBundle, band_energy
+
+
+def audio_duration(file_path: str) -> float:
+    """Duración leída de las cabeceras con mutagen, sin decodificar (0 si no se puede)"""
+    try:
+        audio = MutagenFile(file_path)
+        return float(audio.info.length) if audio is not None else 0.0
+    except Exception:
+        return 0.0
+
+
+class StreamingAnalyzer:
+    """Análisis por bloques con memoria acotada para pistas largas
+
+    Lee el archivo en bloques con librosa.stream, los remuestrea con un
+    remuestreador soxr continuo y los enmarca con el mismo relleno centrado
+    que librosa.stft, así que los frames coinciden con los del análisis
+    completo. Entre bloques sólo se conservan las últimas n_fft - hop
+    muestras y el último frame mel (para la diferencia de la envolvente).
+
+    Lo único que difiere del análisis completo es el piso de 80 dB del
+    espectrograma mel, que aquí es relativo al máximo visto hasta el
+    momento en lugar del máximo global.
+    """
+
+    def __init__(self, cfg: Optional[Dict] = None):
+        self.cfg = cfg or Config.AUDIO
+
+    def analyze(self, file_path: str) -> FrameFeatureBundle:
+        sr, hop, n_fft = self.cfg['sr'], self.cfg['hop_length'], self.cfg['n_fft']
+        native_sr = librosa.get_samplerate(file_path)
+        block_length = int(self.cfg['stream_block_seconds'] * native_sr)
+
+        quality = self.cfg['res_type'].replace('soxr_', '').upper()
+        resampler = soxr.ResampleStream(native_sr, sr, 1, dtype='float32', quality=quality) \
+            if native_sr != sr else None
+
+        self._reset()
+        # Relleno centrado inicial, igual que librosa.stft(center=True)
+        self._buffer = np.zeros(n_fft // 2, dtype=np.float32)
+
+        for block in librosa.stream(file_path, block_length=block_length, frame_length=1,
+                                    hop_length=1, mono=True, dtype=np.float32):
+            samples = resampler.resample_chunk(block) if resampler else block
+            self._consume(samples)
+
+        if resampler:
+            self._consume(resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True))
+        self._finish()
+
+        return self._build_bundle()
+
+    def _reset(self):
+        self._mel_basis = librosa.filters.mel(sr=self.cfg['sr'], n_fft=self.cfg['n_fft'])
+        self._prev_mel_db = None
+        self._db_max = -np.inf
+        self._flux_mean = []
+        self._flux_median = []
+        self._rms = []
+        self._centroid = []
+        self._band_energy = []
+        self._chroma = []
+        self._mfcc = []
+        self._hop_energy = []
+        self._energy_carry = np.zeros(0, dtype=np.float32)
+        self._n_samples = 0
+        self._n_frames = 0
+
+    def _consume(self, samples: np.ndarray):
+        """Añade muestras remuestreadas y procesa todos los frames completos"""
+        if len(samples) == 0:
+            return
+        hop, n_fft = self.cfg['hop_length'], self.cfg['n_fft']
+        self._n_samples += len(samples)
+        self._accumulate_energy(samples)
+
+        self._buffer = np.concatenate([self._buffer, samples])
+        n_frames = 1 + (len(self._buffer) - n_fft) // hop if len(self._buffer) >= n_fft else 0
+        if n_frames <= 0:
+            return
+        self._process_frames(self._buffer[:n_fft + (n_frames - 1) * hop])
+        self._buffer = self._buffer[n_frames * hop:]
+
+    def _finish(self):
+        """Relleno centrado final y últimos frames"""
+        hop, n_fft = self.cfg['hop_length'], self.cfg['n_fft']
+        padded = np.concatenate([self._buffer, np.zeros(n_fft // 2, dtype=np.float32)])
+        # El análisis completo produce 1 + n // hop frames en total
+        remaining = 1 + self._n_samples // hop - self._n_frames
+        if remaining > 0:
+            needed = n_fft + (remaining - 1) * hop
+            if len(padded) < needed:
+                padded = np.concatenate([padded, np.zeros(needed - len(padded), dtype=np.float32)])
+            self._process_frames(padded[:needed])
+        self._buffer = None
+
+        if len(self._energy_carry):
+            self._hop_energy.append(np.array([np.sum(np.square(self._energy_carry))]))
+
+    def _accumulate_energy(self, samples: np.ndarray):
+        """Energía por bloques no solapados de hop muestras (para el RMS por evento)"""
+        hop = self.cfg['hop_length']
+        data = np.concatenate([self._energy_carry, samples])
+        n_full = len(data) // hop
+        if n_full:
+            self._hop_energy.append(np.square(data[:n_full * hop]).reshape(n_full, hop).sum(axis=1))
+        self._energy_carry = data[n_full * hop:]
+
+    def _process_frames(self, chunk: np.ndarray):
+        sr, hop, n_fft = self.cfg['sr'], self.cfg['hop_length'], self.cfg['n_fft']
+        S = np.abs(librosa.stft(chunk, n_fft=n_fft, hop_length=hop, center=False))
+        self._n_frames += S.shape[1]
+
+        self._rms.append(librosa.feature.rms(S=S, frame_length=n_fft, hop_length=hop)[0])
+        self._centroid.append(librosa.feature.spectral_centroid(S=S, sr=sr, n_fft=n_fft, hop_length=hop)[0])
+        self._band_energy.append(band_energy(S, sr, n_fft))
+        self._chroma.append(librosa.feature.chroma_stft(S=S**2, sr=sr, n_fft=n_fft, tuning=0.0))
+
+        mel_db = librosa.power_to_db(self._mel_basis @ (S**2), top_db=None)
+        self._db_max = max(self._db_max, float(mel_db.max()))
+        mel_db = np.maximum(mel_db, self._db_max - 80.0)
+        self._mfcc.append(librosa.feature.mfcc(S=mel_db, n_mfcc=13))
+
+        # Diferencia de primer orden, enlazando con el último frame del bloque anterior
+        if self._prev_mel_db is not None:
+            mel_db_ext = np.concatenate([self._prev_mel_db, mel_db], axis=1)
+        else:
+            mel_db_ext = mel_db
+        flux = np.maximum(0.0, mel_db_ext[:, 1:] - mel_db_ext[:, :-1])
+        if flux.shape[1]:
+            self._flux_mean.append(flux.mean(axis=0))
+            self._flux_median.append(np.median(flux, axis=0))
+        self._prev_mel_db = mel_db[:, -1:]
+
+    def _envelope(self, flux_blocks) -> np.ndarray:
+        """Ensambla la envolvente con el mismo desfase que onset_strength(center=True)"""
+        pad = 1 + self.cfg['n_fft'] // (2 * self.cfg['hop_length'])
+        flux = np.concatenate(flux_blocks) if flux_blocks else np.zeros(0)
+        envelope = np.concatenate([np.zeros(pad), flux])[:self._n_frames]
+        return envelope.astype(np.float32)
+
+    def _build_bundle(self) -> FrameFeatureBundle:
+        return FrameFeatureBundle(
+            sr=self.cfg['sr'],
+            hop_length=self.cfg['hop_length'],
+            n_fft=self.cfg['n_fft'],
+            n_samples=self._n_samples,
+            onset_envelope=self._envelope(self._flux_mean),
+            beat_envelope=self._envelope(self._flux_median),
+            rms=np.concatenate(self._rms),
+            spectral_centroid=np.concatenate(self._centroid),
+            hop_energy=np.concatenate(self._hop_energy) if self._hop_energy else np.zeros(0),
+            band_energy=np.concatenate(self._band_energy, axis=1),
+            chroma=np.concatenate(self._chroma, axis=1),
+            mfcc=np.concatenate(self._mfcc, axis=1),
+        )
@@ -0,0 +1,122 @@
+import string
+import librosa
+import numpy as np
+from scipy.signal import find_peaks
+from typing import Dict, List, Optional
+from ..config import Config
+from ..event_table import EventTable
+from .features import AudioFeatureBundle
+
+
+class StructureAnalyzer:
+    """Segmenta la canción en secciones y etiqueta las que se repiten (A, B, C...)
+
+    Trabaja sobre croma y MFCC sincronizados con los beats, tomados de
+    AudioFeatureBundle. Las fronteras salen de la novedad de Foote: un
+    kernel de tablero de ajedrez recorre la diagonal de la matriz de
+    auto-similitud (sólo la banda alrededor de la diagonal, así que el coste
+    es lineal en la duración). Después cada sección recibe la etiqueta de
+    la primera sección anterior cuya secuencia de beats se le parece, o una
+    nueva si no hay ninguna.
+    """
+
+    def __init__(self, cfg: Optional[Dict] = None):
+        self.cfg = cfg or Config.AUDIO
+
+    @staticmethod
+    def _beat_frames(features: AudioFeatureBundle, beat_times: np.ndarray) -> np.ndarray:
+        """Fronteras de frame de los intervalos entre beats (incluye el inicio y el final)"""
+        frames = np.unique(features.time_to_frames(beat_times))
+        return librosa.util.fix_frames(frames, x_min=0, x_max=features.n_frames)
+
+    def beat_features(self, features: AudioFeatureBundle, beat_times: np.ndarray) -> np.ndarray:
+        """Croma y MFCC (sin el coeficiente de energía) por beat, normalizados por columna"""
+        frames = self._beat_frames(features, beat_times)
+        chroma = librosa.util.sync(features.chroma, frames, aggregate=np.median)
+        mfcc = np.asarray(features.mfcc[1:], dtype=np.float64)
+        # Cada coeficiente centrado y escalado, para que ninguno domine
+        mfcc = (mfcc - mfcc.mean(axis=1, keepdims=True)) / (mfcc.std(axis=1, keepdims=True) + 1e-6)
+        mfcc = librosa.util.sync(mfcc, frames, aggregate=np.mean)
+        stacked = np.vstack([librosa.util.normalize(chroma, axis=0), librosa.util.normalize(mfcc, axis=0)])
+        return librosa.util.normalize(stacked, axis=0)
+
+    def novelty(self, beat_features: np.ndarray, width: int) -> np.ndarray:
+        """Curva de novedad de Foote por beat (kernel de 2 * width beats)"""
+        n = beat_features.shape[1]
+        sign = np.concatenate([-np.ones(width), np.ones(width)])
+        gauss = np.exp(-0.5 * (np.linspace(-2, 2, 2 * width)) ** 2)
+        kernel = np.outer(sign, sign) * np.outer(gauss, gauss)
+
+        padded = np.pad(beat_features, ((0, 0), (width, width)), mode='edge')
+        novelty = np.zeros(n)
+        for i in range(n):
+            block = padded[:, i:i + 2 * width]
+            novelty[i] = np.sum(kernel * (block.T @ block))
+        return np.maximum(novelty, 0)
+
+    def sections(self, features: AudioFeatureBundle, beat_times: np.ndarray) -> List[Dict]:
+        """Secciones de la canción como {'start', 'end', 'label'} en segundos"""
+        duration = features.duration
+        beat_times = np.asarray(beat_times, dtype=float)
+        if len(beat_times) < 4 or duration < 2 * self.cfg['structure_min_seconds']:
+            return [{'start': 0.0, 'end': float(duration), 'label': 'A'}]
+
+        # Duraciones en segundos: así no dependen de que el tracker elija el doble o la mitad del tempo
+        beat_period = float(np.median(np.diff(beat_times)))
+        min_beats = max(2, int(round(self.cfg['structure_min_seconds'] / beat_period)))
+
+        X = self.beat_features(features, beat_times)
+        novelty = self.novelty(X, min_beats)
+        peaks, _ = find_peaks(novelty, distance=min_beats,
+                              prominence=self.cfg['structure_novelty'] * novelty.max())
+        # La columna j de X empieza en el beat j-1 (la primera, en el inicio)
+        segment_times = np.concatenate([[0.0], beat_times])
+        bounds = np.concatenate([[0], peaks, [X.shape[1]]])
+        bounds = np.unique(bounds)
+
+        labels = self._label_segments(X, bounds)
+        starts = segment_times[np.minimum(bounds[:-1], len(segment_times) - 1)]
+        ends = np.append(starts[1:], duration)
+        return [{'start': float(s), 'end': float(e), 'label': l} for s, e, l in zip(starts, ends, labels)]
+
+    def label_events(self, events: EventTable, sections: List[Dict]):
+        """Añade a cada evento su sección ('section') y su posición dentro de ella ('section_pos')
+
+        Dos eventos con la misma etiqueta y la misma posición ocupan el mismo
+        lugar en repeticiones distintas de una sección.
+        """
+        if not sections or len(events) == 0:
+            return
+        section_starts = np.array([s['start'] for s in sections])
+        occurrence = np.maximum(np.searchsorted(section_starts, events.start_times, side='right') - 1, 0)
+        first_event = np.searchsorted(occurrence, occurrence, side='left')
+        labels = np.array([s['label'] for s in sections], dtype=object)
+        events.set_column('section', labels[occurrence].tolist())
+        events.set_column('section_pos', (np.arange(len(events)) - first_event).tolist())
+
+    def _label_segments(self, X: np.ndarray, bounds: np.ndarray) -> List[str]:
+        """Agrupa secciones parecidas comparándolas beat a beat desde su inicio
+
+        Comparar la secuencia (y no el perfil medio) distingue secciones con
+        los mismos acordes en distinto orden.
+        """
+        # Centrado en la media de la pista: sólo cuenta en qué se distingue cada beat
+        centered = librosa.util.normalize(X - X.mean(axis=1, keepdims=True), norm=2, axis=0)
+        segments = [centered[:, a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+        threshold = self.cfg['structure_similarity']
+        representatives, labels = [], []
+        for segment in segments:
+            similarity = []
+            for rep in representatives:
+                length = min(segment.shape[1], rep.shape[1])
+                similarity.append(float(np.mean(np.sum(segment[:, :length] * rep[:, :length], axis=0))))
+            if similarity and max(similarity) >= threshold:
+                labels.append(_label_name(int(np.argmax(similarity))))
+            else:
+                representatives.append(segment)
+                labels.append(_label_name(len(representatives) - 1))
+        return labels
+
+def _label_name(index: int) -> str:
+    letters = string.ascii_uppercase
+    return letters[index] if index < len(letters) else f'{letters[index % 26]}{index // 26}'
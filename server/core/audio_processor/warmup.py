@@ -0,0 +1,47 @@
+import os
+import time
+import numpy as np
+from ..config import Config
+
+
+def configure_jit_cache(cache_dir: str = None) -> str:
+    """Fija el directorio persistente de la caché de compilación de numba
+
+    Debe llamarse antes de importar librosa/numba. Por defecto numba guarda
+    la caché junto al código fuente de librosa, que en un despliegue suele
+    ser de sólo lectura, y entonces cada reinicio vuelve a compilar.
+    """
+    cache_dir = os.environ.setdefault('NUMBA_CACHE_DIR', cache_dir or Config.CACHE['NUMBA_DIR'])
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def _click_track(seconds: float, sr: int, bpm: float = 120.0) -> np.ndarray:
+    """Señal corta con clics periódicos: suficiente para recorrer todos los kernels"""
+    rng = np.random.default_rng(0)
+    y = 0.01 * rng.standard_normal(int(seconds * sr)).astype(np.float32)
+    click_len = int(0.03 * sr)
+    click = (rng.standard_normal(click_len) * np.exp(-np.arange(click_len) / (0.005 * sr))).astype(np.float32)
+    for start in np.arange(0, seconds - 0.1, 60.0 / bpm):
+        s = int(start * sr)
+        y[s:s + click_len] += click
+    return y
+
+
+def warm_up(seconds: float = 5.0) -> float:
+    """Ejecuta el análisis completo sobre una señal sintética para compilar los kernels JIT
+
+    Returns:
+        Tiempo empleado en segundos
+    """
+    start = time.perf_counter()
+    from .event_generation import EventGenerator
+
+    generator = EventGenerator()
+    analyzer = generator.analyzer
+    y = _click_track(seconds, Config.AUDIO['sr'])
+    analyzer._validate_tempo(analyzer.get_features(y).tempo)
+    beats = analyzer._detect_beats(y)
+    onsets = analyzer._detect_onsets(y)
+    generator._structure_events(analyzer._combine_events(beats, onsets), y)
+    return time.perf_counter() - start
@@ -1,9 +1,64 @@
+import os
+
+_SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Raíz de las cachés (PCM, análisis, índices...); SYNESTHESIA_CACHE_DIR la lleva fuera del repositorio
+_CACHE_DIR = os.environ.get('SYNESTHESIA_CACHE_DIR', os.path.join(_SERVER_DIR, 'cache'))
+
 class Config:
     AUDIO = {
         'sr': 22050, 
         'WHISPER_SR': 16000, 
         'hop_length': 512, 
+        'n_fft': 2048,
+        'res_type': 'soxr_hq',
+        'onset_levels': None,  # índices de AudioAnalyzer.ONSET_SENSITIVITY_LEVELS (None = todos)
         'min_event_interval': 0.5,
+        'onset_sweep': 'vectorized',  # 'vectorized' o 'librosa'
+        'streaming_threshold': 20 * 60,  # segundos; a partir de aquí se analiza por bloques
+        'stream_block_seconds': 30,
+        'parallel_workers': 1,  # procesos para las características (1 = sin pool, None = todos los núcleos)
+        'parallel_chunk_seconds': 30,
+        'parallel_min_seconds': 120,  # pistas más cortas se analizan en un solo proceso
+        'silence_threshold_db': -35,  # relativo al percentil 95 del RMS
+        'silence_min_duration': 1.5,  # segundos
+        'silence_event_fraction': 0.8,  # fracción del evento en silencio para marcarlo
+        'band_onset_window': 0.05,  # segundos tras el inicio del evento (el doble hacia atrás)
+        'band_min_strength': 0.2,  # por debajo, el evento no se etiqueta como percusión
+        'structure_min_seconds': 8,  # duración mínima de una sección (y medio ancho del kernel de novedad)
+        'structure_novelty': 0.2,  # prominencia mínima de una frontera (fracción del máximo)
+        'structure_similarity': 0.5,  # similitud coseno media (beat a beat) para repetir etiqueta
+        'online_lookahead': 0.1,  # segundos de contexto futuro para decidir cada frame (OnlineEventDetector)
+        'online_history': 1.0,  # segundos de envolvente para la media local de los onsets
+        'online_delta': 0.1,  # umbral sobre la media local, en fracción del pico reciente
+        'online_wait': 0.1,  # separación mínima entre onsets, en segundos
+        'online_peak_halflife': 10.0,  # segundos en que el pico de referencia cae a la mitad
+        'online_tempo_window': 8.0,  # segundos de envolvente para estimar el tempo
+        'online_tempo_update': 1.0,  # cada cuántos segundos se reestima el tempo
+    }
+    
+    # Perfiles de análisis: sobrescriben AUDIO ('balanced' es la configuración base)
+    DEFAULT_AUDIO_PROFILE = 'balanced'
+    AUDIO_PROFILES = {
+        'fast': {
+            'sr': 11025,
+            'hop_length': 512,  # ~46 ms por frame: la mitad de frames que 'balanced'
+            'n_fft': 2048,  # con 1024 la envolvente se retrasa ~45 ms respecto a 'balanced'
+            'res_type': 'soxr_lq',
+            'onset_levels': [1, 3],
+        },
+        'balanced': {},
+        'accurate': {
+            'sr': 44100,
+            'hop_length': 512,  # ~12 ms por frame
+            'n_fft': 4096,
+            'res_type': 'soxr_vhq',
+        },
+    }
+    
+    # Presupuesto de imágenes generadas con difusión por trabajo (ver EventBudgetPlanner)
+    EVENT_BUDGET = {
+        'max_images': 500,
+        'images_per_minute': None,  # si se da, el presupuesto escala con la duración (con max_images de tope)
     }
     
     TEXT_RENDERING = {
@@ -18,4 +73,36 @@ class Config:
         'FPS': 24,  # Cuadros por segundo
         'RESOLUTION': (1920, 1080),  # 1080p
         'DEFAULT_OUTPUT': 'output_video.mp4'
-    }
\ No newline at end of file
+    }
+    
+    CACHE = {
+        'PCM_DIR': os.path.join(_CACHE_DIR, 'pcm'),
+        'PCM_MAX_BYTES': 4 * 1024**3,
+        'ANALYSIS_DIR': os.path.join(_CACHE_DIR, 'analysis'),
+        'ANALYSIS_MAX_BYTES': 512 * 1024**2,
+        'NUMBA_DIR': os.path.join(_CACHE_DIR, 'numba'),
+        'LIBRARY_DIR': os.path.join(_CACHE_DIR, 'library'),
+        'TIMELINE_DIR': os.path.join(_CACHE_DIR, 'timeline'),
+        'LYRICS_DB': os.path.join(_CACHE_DIR, 'lyrics.db'),
+    }
+    
+    LYRICS = {
+        'BASE_URL': os.environ.get('SYNESTHESIA_LYRICS_URL', 'https://lrclib.net'),
+        'TIMEOUT': (3.05, 10),  # segundos (conexión, lectura)
+        'CACHE_TTL': 30 * 24 * 3600,  # letras encontradas
+        'NEGATIVE_TTL': 3 * 24 * 3600,  # "sin letra": se reintenta antes por si se publica
+        'DURATION_TOLERANCE': 2.0,  # segundos entre la duración del audio y la de la entrada
+        'MAX_DURATION_DIFF': 10.0,  # candidatos de la búsqueda más alejados se descartan
+        'POOL_SIZE': 8,  # conexiones reutilizables (y búsquedas simultáneas en lote)
+        'RETRIES': 2,  # reintentos ante errores de conexión y 502/503/504
+        'LOCAL_DIR': os.environ.get('SYNESTHESIA_LRC_DIR', os.path.join(_SERVER_DIR, 'lyrics')),  # .lrc locales
+        'FUZZY_CUTOFF': 0.85,  # similitud mínima (difflib) para aceptar un .lrc local aproximado
+        'LOCAL_RESCAN_SECONDS': 300,  # relectura completa del directorio de .lrc aunque no cambie su mtime
+    }
+    
+    @classmethod
+    def get_audio_profile(cls, profile_name=None) -> dict:
+        """Configuración de audio completa para un perfil (el perfil por defecto si no existe)"""
+        if profile_name not in cls.AUDIO_PROFILES:
+            profile_name = cls.DEFAULT_AUDIO_PROFILE
+        return {**cls.AUDIO, **cls.AUDIO_PROFILES[profile_name], 'profile': profile_name}
@@ -0,0 +1,291 @@
+import json
+import numpy as np
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+
+class EventTable:
+    """Tabla columnar de eventos ordenada por tiempo de inicio
+
+    Los campos numéricos viven en un arreglo estructurado de NumPy y el tipo
+    se guarda como un código de un byte. Los campos opcionales ('lyric' y
+    cualquier otro que añadan las etapas posteriores) van en columnas
+    aparte. Indexar la tabla devuelve un EventRecord, que se comporta como
+    el diccionario de evento de siempre, así que las etapas pueden migrar
+    poco a poco.
+    """
+
+    DTYPE = np.dtype([
+        ('start_time', 'f8'),
+        ('end_time', 'f8'),
+        ('duration', 'f8'),
+        ('intensity', 'f4'),
+        ('type', 'u1'),
+    ])
+    CORE_FIELDS = DTYPE.names
+
+    def __init__(self, data: np.ndarray, type_names: List[str], extra: Optional[Dict[str, np.ndarray]] = None):
+        self._data = data
+        self.type_names = type_names
+        self._extra = extra or {}
+        self._max_end = None
+
+    # ------------------------------------------------------------------
+    # Construcción
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_columns(cls, start_times, end_times, types, intensities, durations=None, **extra) -> 'EventTable':
+        """Crea la tabla a partir de arreglos por columna (se ordena por inicio)"""
+        start_times = np.asarray(start_times, dtype=float)
+        end_times = np.asarray(end_times, dtype=float)
+        type_names, codes = np.unique(np.asarray(types, dtype=str), return_inverse=True)
+
+        data = np.empty(len(start_times), dtype=cls.DTYPE)
+        data['start_time'] = start_times
+        data['end_time'] = end_times
+        data['duration'] = end_times - start_times if durations is None else durations
+        data['intensity'] = intensities
+        data['type'] = codes
+
+        columns = {name: _object_column(values) for name, values in extra.items()}
+
+        order = np.argsort(start_times, kind='stable')
+        return cls(data[order], [str(t) for t in type_names], {k: v[order] for k, v in columns.items()})
+
+    @classmethod
+    def from_dicts(cls, events: Iterable[Dict[str, Any]]) -> 'EventTable':
+        """Crea la tabla a partir de la lista de diccionarios de evento clásica"""
+        events = list(events)
+        extra_keys = []
+        for event in events:
+            for key in event.keys():
+                if key not in cls.CORE_FIELDS and key not in extra_keys:
+                    extra_keys.append(key)
+
+        return cls.from_columns(
+            [e['start_time'] for e in events],
+            [e['end_time'] for e in events],
+            [e.get('type', 'beat') for e in events],
+            [e.get('intensity', 0.5) for e in events],
+            durations=[e.get('duration', e['end_time'] - e['start_time']) for e in events],
+            **{key: [e.get(key) for e in events] for key in extra_keys}
+        )
+
+    @classmethod
+    def coerce(cls, events) -> 'EventTable':
+        """Devuelve `events` como EventTable (sin copiar si ya lo es)"""
+        if isinstance(events, EventTable):
+            return events
+        return cls.from_dicts(events)
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return [record.copy() for record in self]
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Serializa la tabla a arreglos sin objetos (aptos para np.savez sin pickle)
+
+        Las columnas opcionales se guardan como JSON, ya que pueden contener
+        texto, None o listas.
+        """
+        arrays = {'data': self._data, 'type_names': np.asarray(self.type_names, dtype=str)}
+        for name, values in self._extra.items():
+            arrays[f'extra:{name}'] = np.asarray(json.dumps(values.tolist(), default=_json_default))
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays) -> 'EventTable':
+        """Inverso de to_arrays (acepta el resultado de np.load)"""
+        extra = {}
+        for key in arrays.keys():
+            if key.startswith('extra:'):
+                extra[key[len('extra:'):]] = _object_column(json.loads(str(arrays[key])))
+        return cls(np.array(arrays['data'], dtype=cls.DTYPE), [str(t) for t in arrays['type_names']], extra)
+
+    # ------------------------------------------------------------------
+    # Acceso tipo lista
+    # ------------------------------------------------------------------
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __iter__(self) -> Iterator['EventRecord']:
+        for i in range(len(self._data)):
+            yield EventRecord(self, i)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.take(np.arange(len(self))[index])
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('event index out of range')
+        return EventRecord(self, index)
+
+    def take(self, indices) -> 'EventTable':
+        """Subtabla con las filas indicadas (máscara booleana o índices crecientes)"""
+        indices = np.asarray(indices)
+        return EventTable(self._data[indices], list(self.type_names),
+                          {k: v[indices] for k, v in self._extra.items()})
+
+    # ------------------------------------------------------------------
+    # Columnas
+    # ------------------------------------------------------------------
+    @property
+    def start_times(self) -> np.ndarray:
+        return self._data['start_time']
+
+    @property
+    def end_times(self) -> np.ndarray:
+        return self._data['end_time']
+
+    @property
+    def fields(self) -> List[str]:
+        return list(self.CORE_FIELDS) + list(self._extra)
+
+    def column(self, name: str) -> np.ndarray:
+        """Devuelve una columna completa ('type' se devuelve como nombres)"""
+        if name == 'type':
+            return np.asarray(self.type_names, dtype=object)[self._data['type']]
+        if name in self.CORE_FIELDS:
+            return self._data[name]
+        if name in self._extra:
+            return self._extra[name]
+        return np.full(len(self), None, dtype=object)
+
+    def set_column(self, name: str, values):
+        """Asigna una columna completa (añadiéndola si es opcional)"""
+        if name == 'start_time':
+            raise ValueError('start_time is the sort key and cannot be reassigned')
+        if name == 'type':
+            names, codes = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+            self.type_names = [str(t) for t in names]
+            self._data['type'] = codes
+        elif name in self.CORE_FIELDS:
+            self._data[name] = values
+        else:
+            self._extra[name] = _object_column(values)
+        if name == 'end_time':
+            self._max_end = None
+
+    def _get(self, index: int, name: str):
+        if name == 'type':
+            return self.type_names[self._data['type'][index]]
+        if name in self.CORE_FIELDS:
+            return float(self._data[name][index])
+        if name in self._extra:
+            return self._extra[name][index]
+        raise KeyError(name)
+
+    def _set(self, index: int, name: str, value):
+        if name == 'start_time':
+            raise ValueError('start_time is the sort key and cannot be reassigned')
+        if name == 'type':
+            if value not in self.type_names:
+                self.type_names.append(value)
+            self._data['type'][index] = self.type_names.index(value)
+        elif name in self.CORE_FIELDS:
+            self._data[name][index] = value
+            if name == 'end_time':
+                self._max_end = None
+        else:
+            if name not in self._extra:
+                self._extra[name] = np.full(len(self), None, dtype=object)
+            self._extra[name][index] = value
+
+    # ------------------------------------------------------------------
+    # Búsquedas por tiempo (O(log n))
+    # ------------------------------------------------------------------
+    def nearest(self, time: float) -> Optional[int]:
+        """Índice del evento cuyo inicio está más cerca de `time`"""
+        if len(self) == 0:
+            return None
+        starts = self.start_times
+        i = int(np.searchsorted(starts, time))
+        if i == 0:
+            return 0
+        if i == len(starts):
+            return i - 1
+        # En empate gana el anterior, como min() sobre la lista ordenada
+        return i if starts[i] - time < time - starts[i - 1] else i - 1
+
+    def find(self, time: float, tolerance: float) -> Optional[int]:
+        """Primer evento (en orden) cuyo inicio está a menos de `tolerance` de `time`"""
+        i = int(np.searchsorted(self.start_times, time - tolerance, side='right'))
+        if i < len(self) and abs(self.start_times[i] - time) < tolerance:
+            return i
+        return None
+
+    def overlapping(self, t0: float, t1: float) -> np.ndarray:
+        """Índices de los eventos que se solapan con [t0, t1)
+
+        Usa el máximo acumulado de los tiempos de fin como índice de
+        intervalos, de modo que sólo se revisan los candidatos posibles.
+        """
+        if self._max_end is None:
+            self._max_end = np.maximum.accumulate(self.end_times) if len(self) else self.end_times
+        lo = int(np.searchsorted(self._max_end, t0, side='right'))
+        hi = int(np.searchsorted(self.start_times, t1, side='left'))
+        if lo >= hi:
+            return np.array([], dtype=int)
+        candidates = np.arange(lo, hi)
+        return candidates[self.end_times[lo:hi] > t0]
+
+    def at(self, time: float) -> Optional[int]:
+        """Índice del último evento que contiene el instante `time`"""
+        hits = self.overlapping(time, np.nextafter(time, np.inf))
+        return int(hits[-1]) if len(hits) else None
+
+
+def _object_column(values) -> np.ndarray:
+    """Columna de objetos; se llena elemento a elemento para que las listas no se expandan"""
+    values = list(values)
+    column = np.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        column[i] = value
+    return column
+
+
+def _json_default(value):
+    # Escalares y arreglos de NumPy dentro de columnas opcionales
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+class EventRecord(MutableMapping):
+    """Vista de una fila de EventTable compatible con el diccionario de evento"""
+    __slots__ = ('_table', '_index')
+
+    def __init__(self, table: EventTable, index: int):
+        self._table = table
+        self._index = index
+
+    def __getitem__(self, key):
+        value = self._table._get(self._index, key)
+        if value is None:
+            # Los campos opcionales vacíos se comportan como claves ausentes
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self._table._set(self._index, key, value)
+
+    def __delitem__(self, key):
+        if key in EventTable.CORE_FIELDS:
+            raise KeyError(f'{key} is a required event field')
+        self._table._set(self._index, key, None)
+
+    def __iter__(self):
+        for name in self._table.fields:
+            if name in EventTable.CORE_FIELDS or self._table._extra[name][self._index] is not None:
+                yield name
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def copy(self) -> Dict[str, Any]:
+        return dict(self)
+
+    def __repr__(self):
+        return f'EventRecord({dict(self)!r})'
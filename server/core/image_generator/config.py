@@ -1,6 +1,11 @@
 class ImageGenConfig:
     # Configuraciones base
     DEFAULT_STEPS = 30
+    # Secciones repetidas (estribillos, versos): 'vary' pasa la imagen de la primera
+    # aparición por el refinador con poca fuerza, 'copy' la reutiliza tal cual y
+    # 'off' genera siempre una imagen nueva
+    SECTION_REUSE = 'vary'
+    SECTION_VARY_STRENGTH = 0.3
     DEFAULT_NEGATIVE_PROMPT = (        
         "worst quality, low quality, normal quality, text, signature, watermark, username, artist name, label, title, "
         "nsfw, nude, nudity, bare skin, erotic, sexual, sensual, sexy, lingerie, cleavage, breasts, nipples, genital, "
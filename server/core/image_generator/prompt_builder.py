@@ -1,4 +1,11 @@
 class PromptBuilder:
+    # Percusión dominante al inicio del evento (ver BandOnsetDetector)
+    DRUM_ELEMENTS = {
+        "kick": "heavy low-end pulse, bold massive shapes",
+        "snare": "sharp crack, fragmented angular shards",
+        "hat": "fine shimmering particles, delicate texture",
+    }
+
     def __init__(self, style_preset, color_palette=None):
         self.style_preset = style_preset
         self.color_palette = color_palette
@@ -13,6 +20,15 @@ class PromptBuilder:
             prompt_parts.append("rhythmic geometric, pulsating forms")
         elif event_data["type"] == "onset":
             prompt_parts.append("dynamic transition, energy burst")
+
+        # Carácter de la percusión al inicio del evento
+        drum_element = self.DRUM_ELEMENTS.get(event_data.get("drum"))
+        if drum_element:
+            prompt_parts.append(drum_element)
+            # Varias bandas fuertes a la vez: golpe de toda la batería
+            strengths = event_data.get("band_strength") or []
+            if sum(s > 0.7 for s in strengths) >= 2:
+                prompt_parts.append("full-spectrum impact, layered explosion")
             
         # Textura y calidad
         prompt_parts.append(self.style_preset["composition"])
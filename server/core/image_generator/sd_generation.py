@@ -2,7 +2,11 @@ import torch
 from diffusers import StableDiffusionXLPipeline, AutoPipelineForText2Image, AutoPipelineForImage2Image
 from .config import ImageGenConfig
 from .prompt_builder import PromptBuilder
+from .static_frames import StaticFrameRenderer
+from ..event_table import EventTable
 import os
+import shutil
+from PIL import Image
 from tqdm import tqdm
 from pathlib import Path
 
@@ -35,21 +39,36 @@ class ImageGenerator:
 
         return refiner
     
-    def generate_images(self, events, output_dir, style_preset="minimal_geometric", color_palette=None):
-        """Genera imágenes para todos los eventos"""
+    def generate_images(self, events, output_dir, style_preset="minimal_geometric", color_palette=None, cover_path=None,
+                        max_images=None):
+        """Genera imágenes para todos los eventos
+
+        Los eventos marcados como 'silent' (intros, silencios, fade-outs) usan
+        un cuadro estático (portada o degradado de la paleta) sin difusión.
+        Los eventos de una sección repetida reutilizan la imagen del evento en
+        la misma posición de su primera aparición (ver ImageGenConfig.SECTION_REUSE).
+        El número de imágenes se fija antes con EventBudgetPlanner; `max_images`
+        queda sólo como tope de seguridad. `cover_path` puede ser una ruta o la
+        portada ya decodificada (AudioAsset.cover_image()).
+        """
+        events = EventTable.coerce(events)
         os.makedirs(output_dir, exist_ok=True)
         preset = ImageGenConfig.get_preset(style_preset)
         prompt_builder = PromptBuilder(preset, color_palette)
+        static_frames = StaticFrameRenderer()
         
         # Generar semilla base basada en el primer evento
         base_seed = hash(events[0]["start_time"]) % 1000000
 
 
-        max_images = 500    #limite de imagenes
-        print(f"Generando imágenes para {len(events)} eventos (límite: {max_images})")   
+        print(f"Generando imágenes para {len(events)} eventos (límite: {max_images or 'ninguno'})")   
         
         # Contador para imágenes generadas
         generated_count = 0
+        static_count = 0
+        reused_count = 0
+        # (sección, posición) -> imagen de la primera aparición
+        section_images = {}
         
         for i, event in enumerate(tqdm(events, desc="Generando imágenes")):
             # Verificar límite de imágenes
@@ -61,13 +80,35 @@ class ImageGenerator:
             filename = f"{event['start_time']:.2f}s.png"
             filepath = os.path.join(output_dir, filename)
             
+            section_key = (event['section'], event['section_pos']) if event.get('section') else None
+            
             # Saltar si el archivo ya existe
             if os.path.exists(filepath):
+                if section_key is not None and not event.get('silent'):
+                    section_images.setdefault(section_key, filepath)
+                continue
+            
+            # Regiones en silencio: cuadro estático, no cuenta para el límite
+            if event.get('silent'):
+                static_frames.render(cover_path, color_palette).save(filepath)
+                static_count += 1
                 continue
                 
             # Construir prompt específico para el evento
             prompt = prompt_builder.build_prompt(event)
             
+            # Sección repetida: copiar o variar ligeramente la imagen ya generada
+            source = section_images.get(section_key) if ImageGenConfig.SECTION_REUSE != 'off' else None
+            if source is not None:
+                if ImageGenConfig.SECTION_REUSE == 'copy':
+                    shutil.copyfile(source, filepath)
+                else:
+                    with Image.open(source) as previous:
+                        self.refiner(prompt=prompt, image=previous.convert('RGB'),
+                                     strength=ImageGenConfig.SECTION_VARY_STRENGTH).images[0].save(filepath)
+                reused_count += 1
+                continue
+            
             # Crear semilla única para este evento
             seed = base_seed + i
             
@@ -84,6 +125,12 @@ class ImageGenerator:
             # Guardar la imagen
             refined_image.save(filepath)
             generated_count += 1
+            if section_key is not None:
+                section_images.setdefault(section_key, filepath)
         
+        if static_count:
+            print(f"{static_count} eventos en silencio renderizados con cuadro estático")
+        if reused_count:
+            print(f"{reused_count} eventos de secciones repetidas reutilizaron una imagen anterior")
         return generated_count
         
@@ -0,0 +1,52 @@
+import numpy as np
+from PIL import Image, ImageOps, ImageFilter
+from typing import Optional, Union
+
+
+class StaticFrameRenderer:
+    """Cuadro estático barato para los eventos en silencio
+
+    Usa la portada del álbum si existe; si no, un degradado con los dos
+    colores dominantes de la paleta. El cuadro se genera una sola vez y se
+    reutiliza para todos los eventos silenciosos.
+    """
+
+    DEFAULT_COLORS = [(20, 20, 24), (60, 60, 72)]
+
+    def __init__(self, size=(1024, 1024)):
+        self.size = size
+        self._frame = None
+
+    def render(self, cover_path: Optional[Union[str, Image.Image]] = None,
+               color_palette: Optional[dict] = None) -> Image.Image:
+        if self._frame is None:
+            self._frame = self._from_cover(cover_path) if cover_path else None
+            if self._frame is None:
+                self._frame = self._gradient(color_palette)
+        return self._frame
+
+    def _from_cover(self, cover_path: Union[str, Image.Image]) -> Optional[Image.Image]:
+        try:
+            # Ruta de la imagen o portada ya decodificada (AudioAsset.cover_image())
+            cover = cover_path if isinstance(cover_path, Image.Image) else Image.open(cover_path)
+            cover = cover.convert('RGB')
+        except (OSError, ValueError) as e:
+            print(f"No se pudo usar la portada como cuadro estático: {e}")
+            return None
+        # Ligero desenfoque y oscurecido para que el texto de la letra siga siendo legible
+        frame = ImageOps.fit(cover, self.size, Image.LANCZOS).filter(ImageFilter.GaussianBlur(2))
+        return Image.blend(frame, Image.new('RGB', self.size, (0, 0, 0)), 0.25)
+
+    def _gradient(self, color_palette: Optional[dict]) -> Image.Image:
+        colors = list(color_palette.get('rgb_colors', [])) if color_palette else []
+        if len(colors) >= 2:
+            top, bottom = colors[:2]
+        elif colors:
+            top, bottom = colors[0], self.DEFAULT_COLORS[0]
+        else:
+            top, bottom = self.DEFAULT_COLORS
+        width, height = self.size
+        t = np.linspace(0.0, 1.0, height)[:, None, None]
+        gradient = (1 - t) * np.asarray(top, dtype=float) + t * np.asarray(bottom, dtype=float)
+        pixels = np.broadcast_to(gradient, (height, width, 3)).astype(np.uint8)
+        return Image.fromarray(np.ascontiguousarray(pixels), 'RGB')
@@ -1,158 +1,122 @@
+import numpy as np
+from bisect import bisect_right
 from .api_lyrics import LyricsFetcher
-from mutagen.id3 import ID3
-from mutagen.mp3 import MP3
+from .local_lyrics import LocalLyricsProvider
+from .lrc_parser import LrcLyrics, parse_lrc
+from ..event_table import EventTable
+from ..audio_asset import AudioAsset
 from typing import List, Dict
 
 class LyricsHandler:
     def __init__(self):
+        self.local = LocalLyricsProvider()
         self.fetcher = LyricsFetcher()
     
-    def process(self, audio_path: str, events: list) -> list:
-        artist, title = self._get_metadata(audio_path)
-        result = self.fetcher.search_lyrics(artist, title)
+    def process(self, audio, events: EventTable) -> EventTable:
+        """`audio` es el AudioAsset del trabajo (o la ruta del archivo)
+
+        Los .lrc locales (junto al audio o en Config.LYRICS['LOCAL_DIR']) se
+        prueban antes que la búsqueda en red.
+        """
+        artist, title, album, duration = self._get_metadata(audio)
+        audio_path = audio.path if isinstance(audio, AudioAsset) else str(audio)
+        result = self.local.find(artist, title, duration, audio_path)
         if result is None:
+            result = self.fetcher.search_lyrics(artist, title, duration, album)
+        if result is None or not result.get('syncedLyrics'):
             return events
-        print('Letra encontrada')
+        print(f"Letra encontrada ({result.get('source', 'lrclib')})")
         lyrics = self._parse_lrc_to_events(result['syncedLyrics'])
-        new_events = self._assign_lyrics_to_events(events, lyrics, 0.5)
-        return new_events
+        return self._assign_lyrics_to_events(events, lyrics, 0.5)
     
-    def _get_metadata(self, audio_path: str) -> tuple:
+    def _get_metadata(self, audio) -> tuple:
         try:
-            audio = MP3(audio_path, ID3=ID3)
-            artist = audio.tags.get('TPE1', ['Unknown'])[0]
-            title = audio.tags.get('TIT2', ['Unknown'])[0]
-            return artist, title
+            asset = AudioAsset.coerce(audio)
+            return asset.artist, asset.title, asset.album, asset.duration
         except:
-            return "Unknown", "Unknown"
-        
-    def _parse_lrc_to_events(self, lrc_text: str) -> List[tuple[float, str]]:
-        """Convierte texto LRC en lista de eventos de tiempo y texto"""
-        events = []
-        for line in lrc_text.split('\n'):
-            if not line.startswith('[') or ']' not in line:
-                continue
-                
-            try:
-                # Dividir tiempo y texto
-                time_part, text = line.split(']', 1)
-                time_str = time_part[1:]  # Remover el corchete inicial
-                
-                # Convertir tiempo a segundos
-                if ':' in time_str:
-                    parts = time_str.split(':')
-                    minutes = float(parts[0])
-                    seconds = float(parts[1])
-                    total_seconds = minutes * 60 + seconds
-                    events.append((total_seconds, text.strip()))
-            except Exception as e:
-                print(f"Error parseando línea LRC: {line} | Error: {e}")
+            return "Unknown", "Unknown", None, None
         
-        return events
+    def _parse_lrc_to_events(self, lrc_text: str) -> LrcLyrics:
+        """Convierte texto LRC en líneas (y palabras, si las hay) con su tiempo"""
+        return parse_lrc(lrc_text)
 
-    def _assign_lyrics_to_events(self, audio_events: List[Dict], 
-                           lyric_events: List[tuple[float, str]], 
-                           max_gap: float = 0.5) -> List[Dict]:
+    def _assign_lyrics_to_events(self, audio_events, lyric_events,
+                           max_gap: float = 0.5) -> EventTable:
         """
         Asigna letras a eventos de audio, creando nuevos eventos si es necesario
+
+        Los eventos que empiezan a menos de `max_gap` del primero de su grupo
+        se fusionan en uno, que lleva la última línea de letra anterior al
+        último evento del grupo (las líneas en el mismo instante que un
+        evento cuentan para el siguiente). Las líneas que no quedan en
+        ningún evento se añaden como eventos 'lyric' que duran hasta el
+        siguiente evento de audio.
+
+        `lyric_events` es un LrcLyrics o la lista de (tiempo, texto). Si la
+        letra trae tiempos por palabra, cada evento los lleva en
+        'lyric_words' ([[tiempo, palabra], ...]) para que las capas de texto
+        los sigan sin crear eventos nuevos.
+
+        Todo es una mezcla de listas ordenadas (searchsorted/bisect), en
+        O((n + m) log m) en lugar de recorrer la lista por cada línea.
         """
-        # 1. Crear lista combinada de todos los eventos
-        all_events = []
-        
-        # 2. Primero añadimos los eventos de audio existentes
-        for event in audio_events:
-            all_events.append({
-                'time': event['start_time'],
-                'source': 'audio',
-                'data': event
-            })
-        
-        # 3. Añadir eventos de letra como puntos de referencia
-        for time, text in lyric_events:
-            all_events.append({
-                'time': time,
-                'source': 'lyric_marker',
-                'text': text
-            })
-        
-        # 4. Ordenar todos los eventos por tiempo
-        all_events.sort(key=lambda x: x['time'])
-        
-        # 5. Fusionar eventos cercanos y asignar letras
-        merged_events = []
-        current_lyric = ""
-        
-        for i, event in enumerate(all_events):
-            # Si es un marcador de letra, actualizamos la letra actual
-            if event['source'] == 'lyric_marker':
-                current_lyric = event['text']
-                continue
-                
-            # Para eventos de audio, verificar si debemos fusionar con evento anterior
-            if merged_events:
-                prev_event = merged_events[-1]
-                time_diff = event['time'] - prev_event['time']
-                
-                # Fusionar con evento anterior si están muy cerca
-                if time_diff < max_gap:
-                    prev_event['data']['end_time'] = event['data']['end_time']
-                    prev_event['data']['duration'] = event['data']['end_time'] - prev_event['time']
-                    # Mantener la letra más reciente
-                    prev_event['data']['lyric'] = current_lyric
-                    continue
-            
-            # Crear nuevo evento fusionado
-            audio_data = event['data'].copy()
-            audio_data['lyric'] = current_lyric
-            merged_events.append({
-                'time': event['time'],
-                'data': audio_data
-            })
-        
-        # 6. Crear nuevos eventos para letras sin evento cercano
-        final_events = [e['data'] for e in merged_events]
-        used_lyric_times = set()
-        
-        # Marcar tiempos de letra ya usados
-        for event in final_events:
-            if 'lyric_time' in event:
-                used_lyric_times.add(event['lyric_time'])
+        events = EventTable.coerce(audio_events)
+        lyrics = LrcLyrics.coerce(lyric_events)
+        lyric_times = lyrics.line_times
+        starts = events.start_times
+        ends = events.end_times
 
-        # Obtener todos los tiempos de inicio ordenados
-        all_start_times = sorted([e['start_time'] for e in final_events])
-        
-        # Añadir nuevos eventos para letras no asignadas
-        for time, text in lyric_events:
-            if time in used_lyric_times:
+        # Línea vigente en cada evento: la última estrictamente anterior (-1 = ninguna)
+        current = np.searchsorted(lyric_times, starts, side='left') - 1
+
+        # Grupos de eventos cercanos: inicio y último miembro de cada uno
+        leaders, lasts = [], []
+        group_start = None
+        for i, start in enumerate(starts.tolist()):
+            if group_start is not None and start - group_start < max_gap:
+                lasts[-1] = i
                 continue
-                
-            # Encontrar el próximo evento temporal
-            next_event_time = next((t for t in all_start_times if t > time), None)
-            
-            # Calcular end_time basado en el próximo evento o usar duración mínima
-            if next_event_time is not None:
-                end_time = next_event_time
+            group_start = start
+            leaders.append(i)
+            lasts.append(i)
+        leaders = np.array(leaders, dtype=int)
+        lasts = np.array(lasts, dtype=int)
+
+        merged_ends = ends[lasts]
+        durations = np.where(lasts != leaders, merged_ends - starts[leaders], events.column('duration')[leaders])
+        assigned = current[lasts]
+        texts = [lyrics.line_texts[j] if j >= 0 else "" for j in assigned.tolist()]
+
+        # Líneas sin evento: duran hasta el siguiente evento fusionado
+        used = np.zeros(len(lyrics), dtype=bool)
+        used[assigned[assigned >= 0]] = True
+        merged_starts = starts[leaders].tolist()
+        new_times, new_ends, new_texts = [], [], []
+        unused = np.flatnonzero(~used).tolist()
+        for j in unused:
+            time, text = float(lyric_times[j]), lyrics.line_texts[j]
+            k = bisect_right(merged_starts, time)
+            if k < len(merged_starts):
+                end_time = merged_starts[k]
             else:
                 # Si es el último evento, usar duración basada en el texto
-                avg_duration = max(3.0, len(text.split()) * 0.5)  # 0.5s por palabra
-                end_time = time + avg_duration
-            
-            # Crear nuevo evento de tipo 'lyric'
-            new_event = {
-                'start_time': time,
-                'end_time': end_time,
-                'duration': end_time - time,
-                'type': 'lyric',
-                'intensity': 0.5,  # Intensidad estándar
-                'lyric': text
-            }
-            
-            # Buscar posición para insertar
-            insert_index = next((i for i, e in enumerate(final_events) 
-                            if e['start_time'] > time), len(final_events))
-            final_events.insert(insert_index, new_event)
-            
-            # Actualizar lista de tiempos para futuras inserciones
-            all_start_times.insert(insert_index, time)
-        
-        return final_events
\ No newline at end of file
+                end_time = time + max(3.0, len(text.split()) * 0.5)  # 0.5s por palabra
+            new_times.append(time)
+            new_ends.append(end_time)
+            new_texts.append(text)
+
+        # from_columns ordena de forma estable: en empate, el evento de audio va primero
+        extra = {name: events.column(name)[leaders].tolist() + [None] * len(new_times)
+                 for name in events.fields if name not in EventTable.CORE_FIELDS and name not in ('lyric', 'lyric_words')}
+        if lyrics.has_words:
+            words = lyrics.word_lists()
+            extra['lyric_words'] = [words[j] if j >= 0 else None for j in assigned.tolist() + unused]
+        return EventTable.from_columns(
+            np.concatenate([starts[leaders], new_times]),
+            np.concatenate([merged_ends, new_ends]),
+            events.column('type')[leaders].tolist() + ['lyric'] * len(new_times),
+            np.concatenate([events.column('intensity')[leaders], np.full(len(new_times), 0.5)]),
+            durations=np.concatenate([durations, np.subtract(new_ends, new_times)]),
+            lyric=texts + new_texts,
+            **extra
+        )
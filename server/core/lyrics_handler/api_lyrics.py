@@ -1,13 +1,180 @@
 #LRCGET v0.2.0 (https://github.com/tranxuanthang/lrcget)
+import asyncio
 import requests
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Dict, List, Optional, Tuple
+from ..config import Config
+from .lyrics_cache import LyricsCache, MISSING, normalize
+
+# (artista, título, álbum, duración) de una pista a buscar
+Track = Tuple[str, str, Optional[str], Optional[float]]
+
 
 class LyricsFetcher:
-    
-    def search_lyrics(self, artist, title):
-        url = f"https://lrclib.net/api/search?track_name={title}&artist_name={artist}"
-        response = requests.get(url)
-        if response.status_code == 200:
-            results = response.json()
-            if results:
-                return results[0]  # primera coincidencia
-        return None
\ No newline at end of file
+    """Búsqueda de letras sincronizadas en lrclib, con caché persistente
+
+    Primero prueba la coincidencia exacta (/api/get, con artista, título,
+    álbum y duración) y si no hay, la búsqueda (/api/search), cuyos
+    candidatos se puntúan por coincidencia de título y artista y por
+    diferencia de duración en lugar de tomar siempre el primero.
+
+    Todas las peticiones comparten una Session con conexiones reutilizables,
+    reintentos ante errores transitorios y timeouts de conexión y lectura.
+
+    Los aciertos y los "sin letra" se guardan en LyricsCache; los errores de
+    red (incluido el timeout) devuelven None sin guardarse, así que nunca
+    detienen el trabajo y se reintentan en el siguiente; `last_error` indica
+    si la última búsqueda falló. Las búsquedas simultáneas de la misma
+    clave (en cualquier instancia del proceso) se agrupan: sólo la primera
+    va a la red y las demás esperan su resultado.
+    """
+
+    # (servidor, clave de caché) -> Future de la búsqueda en curso
+    _inflight: Dict[tuple, Future] = {}
+    _inflight_lock = threading.Lock()
+
+    def __init__(self, cache: Optional[LyricsCache] = None, base_url: Optional[str] = None):
+        self.cfg = Config.LYRICS
+        self.base_url = (base_url or self.cfg['BASE_URL']).rstrip('/')
+        self.cache = cache if cache is not None else LyricsCache()
+        self.session = self._session()
+        self.last_error = None
+
+    def _session(self) -> requests.Session:
+        session = requests.Session()
+        retries = Retry(total=self.cfg['RETRIES'], backoff_factor=0.3, status_forcelist=(502, 503, 504),
+                        allowed_methods=('GET',))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.cfg['POOL_SIZE'], max_retries=retries)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers['User-Agent'] = 'Synesthesia (https://github.com/AngelArellano2809/Synesthesia)'
+        return session
+
+    def search_lyrics(self, artist, title, duration: Optional[float] = None, album: Optional[str] = None):
+        result, self.last_error = self._lookup(artist, title, album, duration)
+        return result
+
+    def _lookup(self, artist, title, album, duration) -> Tuple[Optional[Dict], Optional[object]]:
+        """(resultado, error): hace la búsqueda sin tocar last_error, para poder usarla en paralelo"""
+        cached = self.cache.get(artist, title, duration)
+        if cached is MISSING:
+            return None, None
+        if cached is not None:
+            return cached, None
+
+        key = (self.base_url, *self.cache.key(artist, title, duration))
+        with self._inflight_lock:
+            pending = self._inflight.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._inflight[key] = Future()
+        if not owner:
+            return pending.result()
+        try:
+            # Otra búsqueda de la misma clave pudo terminar justo antes del registro
+            cached = self.cache.get(artist, title, duration)
+            if cached is None:
+                outcome = self._fetch(artist, title, album, duration)
+            else:
+                outcome = (None if cached is MISSING else cached), None
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        else:
+            pending.set_result(outcome)
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+        return outcome
+
+    def _fetch(self, artist, title, album, duration) -> Tuple[Optional[Dict], Optional[object]]:
+        """Búsqueda en red (exacta y después por candidatos); guarda el resultado en la caché"""
+        try:
+            result = self._get_exact(artist, title, album, duration)
+            if result is None:
+                result = self._search(artist, title, duration)
+        except (requests.RequestException, ValueError) as e:
+            # ValueError: respuesta que no es JSON
+            print(f"Error buscando letras: {e}")
+            return None, e
+        self.cache.put(artist, title, duration, result)
+        return result, None
+
+    def _get(self, path: str, params: Dict) -> Optional[requests.Response]:
+        """GET con parámetros codificados; None si el recurso no existe"""
+        response = self.session.get(f"{self.base_url}{path}", params=params, timeout=self.cfg['TIMEOUT'])
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response
+
+    def _get_exact(self, artist, title, album, duration) -> Optional[Dict]:
+        # /api/get necesita la duración (lrclib acepta ±2 s)
+        if not duration:
+            return None
+        params = {'artist_name': artist, 'track_name': title, 'duration': int(round(duration))}
+        if album and album != 'Unknown Album':
+            params['album_name'] = album
+        response = self._get('/api/get', params)
+        if response is None and 'album_name' in params:
+            # El álbum de las etiquetas a veces no coincide (recopilatorios, ediciones)
+            del params['album_name']
+            response = self._get('/api/get', params)
+        result = response.json() if response is not None else None
+        # Las entradas sólo con letra plana (o instrumentales) no sirven: se prueba la búsqueda
+        return result if result and result.get('syncedLyrics') else None
+
+    def _search(self, artist, title, duration) -> Optional[Dict]:
+        response = self._get('/api/search', {'track_name': title, 'artist_name': artist})
+        candidates = response.json() if response is not None else []
+        return self.best_candidate(candidates, artist, title, duration)
+
+    def best_candidate(self, candidates: List[Dict], artist, title, duration) -> Optional[Dict]:
+        """Candidato más probable de la búsqueda, o None si ninguno es aceptable
+
+        Se ordenan por: tiene letra sincronizada, título y artista
+        normalizados iguales y menor diferencia de duración. Con duración
+        conocida se descartan los que difieren más de MAX_DURATION_DIFF. Si
+        el mejor no tiene letra sincronizada no hay ninguno que la tenga: es
+        un "sin letra" (se guarda con el TTL negativo).
+        """
+        artist, title = normalize(artist), normalize(title)
+
+        def score(candidate):
+            diff = abs(candidate.get('duration', 0) - duration) if duration and candidate.get('duration') else 0.0
+            return (not candidate.get('syncedLyrics'),
+                    normalize(candidate.get('trackName')) != title,
+                    normalize(candidate.get('artistName')) != artist,
+                    diff)
+
+        ranked = sorted(candidates, key=score)
+        if duration:
+            ranked = [c for c in ranked if score(c)[3] <= self.cfg['MAX_DURATION_DIFF']]
+        return ranked[0] if ranked and ranked[0].get('syncedLyrics') else None
+
+    async def search_many(self, tracks: List[Track], concurrency: Optional[int] = None) -> List[Optional[Dict]]:
+        """Busca varias pistas (un álbum, un lote de trabajos) en paralelo, en el orden dado"""
+        outcomes = await self.lookup_many(tracks, concurrency)
+        errors = [error for _, error in outcomes if error is not None]
+        self.last_error = errors[-1] if errors else None
+        return [result for result, _ in outcomes]
+
+    async def lookup_many(self, tracks: List[Track], concurrency: Optional[int] = None) -> List[Tuple[Optional[Dict], Optional[object]]]:
+        """(resultado, error) por pista
+
+        Cada búsqueda corre en un hilo propio del lote (el ejecutor por
+        defecto de asyncio tiene muy pocos hilos en máquinas con pocos
+        núcleos) sobre la Session compartida; el número de hilos limita las
+        peticiones simultáneas, por defecto al tamaño del pool de conexiones.
+        """
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=concurrency or self.cfg['POOL_SIZE']) as executor:
+            return await asyncio.gather(*(loop.run_in_executor(executor, self._lookup, artist, title, album, duration)
+                                          for artist, title, album, duration in tracks))
+
+    def search_batch(self, tracks: List[Track], concurrency: Optional[int] = None) -> List[Optional[Dict]]:
+        """Versión síncrona de search_many (para scripts y código sin bucle de eventos)"""
+        return asyncio.run(self.search_many(tracks, concurrency))
@@ -0,0 +1,191 @@
+import os
+import re
+import difflib
+import time
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from ..config import Config
+from .lyrics_cache import normalize
+
+# Etiquetas de cabecera LRC: [ar:Artista], [ti:Título], [al:Álbum], [length:03:25]
+_HEADER_TAG = re.compile(r'^\[(ar|ti|al|length):([^\]]*)\]', re.IGNORECASE)
+_TIMESTAMP = re.compile(r'^\[\d+:\d')
+_FILENAME = re.compile(r'^(?P<artist>.+?)\s+-\s+(?P<title>.+)$')
+
+
+def _parse_length(value: str) -> Optional[float]:
+    try:
+        minutes, _, seconds = value.strip().rpartition(':')
+        return (float(minutes) * 60 if minutes else 0.0) + float(seconds)
+    except ValueError:
+        return None
+
+
+def read_header(path: Path) -> Dict[str, str]:
+    """Etiquetas de cabecera de un .lrc (sólo lee hasta la primera línea con tiempo)"""
+    tags = {}
+    with open(path, encoding='utf-8-sig', errors='replace') as f:
+        for line in f:
+            line = line.strip()
+            if _TIMESTAMP.match(line):
+                break
+            match = _HEADER_TAG.match(line)
+            if match:
+                tags[match.group(1).lower()] = match.group(2).strip()
+    return tags
+
+
+class _DirectoryIndex:
+    """Índice construido de un directorio y lo necesario para saber si sigue al día"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.dir_mtimes: Dict[str, int] = {}
+        self.files: Dict[str, Tuple[float, Dict]] = {}
+        self.keys: Dict[str, List[Dict]] = {}
+        self.scanned_at = -float('inf')
+
+    def is_fresh(self, rescan_seconds: float) -> bool:
+        """Sin cambios en ningún subdirectorio y dentro del intervalo de relectura"""
+        if time.monotonic() - self.scanned_at > rescan_seconds:
+            return False
+        for directory, mtime in self.dir_mtimes.items():
+            try:
+                if os.stat(directory).st_mtime_ns != mtime:
+                    return False
+            except OSError:
+                return False
+        return True
+
+
+class LocalLyricsProvider:
+    """Letras desde archivos .lrc locales, sin red
+
+    Busca primero el .lrc junto al audio (mismo nombre, p. ej. el que se
+    sube con el MP3) y después en un directorio indexado por artista y
+    título normalizados. El artista y el título salen de las etiquetas
+    [ar:] y [ti:] o, si faltan, del nombre "Artista - Título.lrc". Si no hay
+    coincidencia exacta se prueba una aproximada (difflib) y, cuando el .lrc
+    declara [length:], se descarta si la duración no coincide.
+
+    El índice se comparte entre instancias del mismo directorio y se
+    guarda ya construido. Una búsqueda sólo comprueba el mtime de los
+    subdirectorios; el directorio se vuelve a recorrer cuando alguno cambia
+    (archivos añadidos, borrados o renombrados) o cada
+    LOCAL_RESCAN_SECONDS (archivos editados en su sitio), y entonces sólo
+    se leen las cabeceras de los archivos nuevos o modificados.
+    """
+
+    _shared: Dict[str, _DirectoryIndex] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, directory: Optional[str] = None):
+        self.cfg = Config.LYRICS
+        directory = directory if directory is not None else self.cfg['LOCAL_DIR']
+        self.directory = Path(directory) if directory else None
+
+    # --- Índice ---
+
+    def _directory_index(self) -> Optional[_DirectoryIndex]:
+        """Índice del directorio, releído sólo si ha cambiado o ha caducado"""
+        if self.directory is None or not self.directory.is_dir():
+            return None
+        key = str(self.directory.resolve())
+        with self._lock:
+            state = self._shared.setdefault(key, _DirectoryIndex())
+        rescan_seconds = self.cfg['LOCAL_RESCAN_SECONDS']
+        if state.is_fresh(rescan_seconds):
+            return state
+        with state.lock:
+            # Otro hilo puede haberlo releído mientras se esperaba
+            if not state.is_fresh(rescan_seconds):
+                self._scan(state)
+        return state
+
+    def _scan(self, state: _DirectoryIndex):
+        """Recorre el directorio reutilizando las entradas de los archivos sin cambios"""
+        started = time.monotonic()
+        dir_mtimes, files = {}, {}
+        for root, _, names in os.walk(self.directory):
+            try:
+                dir_mtimes[root] = os.stat(root).st_mtime_ns
+            except OSError:
+                continue
+            for name in names:
+                if not name.lower().endswith('.lrc'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    mtime = os.stat(path).st_mtime
+                except OSError:
+                    continue
+                cached = state.files.get(path)
+                files[path] = cached if cached and cached[0] == mtime else (mtime, self._entry(Path(path)))
+
+        keys = {}
+        for _, entry in files.values():
+            keys.setdefault(f"{entry['artist']} {entry['title']}".strip(), []).append(entry)
+        # Las lecturas sin lock ven el índice anterior o el nuevo, nunca uno a medias
+        state.files, state.keys, state.dir_mtimes = files, keys, dir_mtimes
+        state.scanned_at = started
+
+    @staticmethod
+    def _entry(path: Path) -> Dict:
+        try:
+            tags = read_header(path)
+        except OSError:
+            tags = {}
+        artist, title = tags.get('ar'), tags.get('ti')
+        if not artist or not title:
+            match = _FILENAME.match(path.stem)
+            if match:
+                artist = artist or match.group('artist')
+                title = title or match.group('title')
+            else:
+                title = title or path.stem
+        return {'path': str(path), 'artist': normalize(artist), 'title': normalize(title),
+                'length': _parse_length(tags['length']) if 'length' in tags else None}
+
+    def index(self) -> Dict[str, List[Dict]]:
+        """'artista título' normalizado -> entradas (no modificar: es el índice compartido)"""
+        state = self._directory_index()
+        return state.keys if state is not None else {}
+
+    # --- Búsqueda ---
+
+    def find(self, artist: str, title: str, duration: Optional[float] = None,
+             audio_path: Optional[str] = None) -> Optional[Dict]:
+        """Resultado con la forma de lrclib ({'syncedLyrics', ...}) o None"""
+        if audio_path:
+            sidecar = Path(audio_path).with_suffix('.lrc')
+            if sidecar.is_file():
+                return self._result(sidecar, 'sidecar')
+
+        index = self.index()
+        if not index:
+            return None
+        key = f"{normalize(artist)} {normalize(title)}".strip()
+        candidates = index.get(key)
+        if not candidates:
+            close = difflib.get_close_matches(key, index.keys(), n=3, cutoff=self.cfg['FUZZY_CUTOFF'])
+            candidates = [entry for match in close for entry in index[match]]
+        candidates = [c for c in candidates if self._duration_ok(c, duration)]
+        if not candidates:
+            return None
+        # Entre varias versiones, la de duración más parecida
+        best = min(candidates, key=lambda c: abs(c['length'] - duration) if c['length'] and duration else 0.0)
+        return self._result(Path(best['path']), 'local')
+
+    def _duration_ok(self, entry: Dict, duration: Optional[float]) -> bool:
+        if not entry['length'] or not duration:
+            return True
+        return abs(entry['length'] - duration) <= self.cfg['MAX_DURATION_DIFF']
+
+    @staticmethod
+    def _result(path: Path, source: str) -> Optional[Dict]:
+        try:
+            text = path.read_text(encoding='utf-8-sig', errors='replace')
+        except OSError:
+            return None
+        return {'syncedLyrics': text, 'source': source, 'path': str(path)}
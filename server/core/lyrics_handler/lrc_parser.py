@@ -0,0 +1,147 @@
+import re
+import numpy as np
+from typing import Iterable, List, Optional, Tuple
+
+# Una línea útil del LRC: [offset:±ms] o uno o más tiempos seguidos del texto
+_LINE = re.compile(
+    r'^[ \t]*(?:\[offset:[ \t]*(?P<offset>[+-]?\d+)[ \t]*\]'
+    r'|(?P<stamps>(?:\[\d+:\d+(?:[.:]\d+)?\][ \t]*)+)(?P<text>[^\r\n]*))',
+    re.MULTILINE | re.IGNORECASE)
+# [mm:ss], [mm:ss.xx], [mm:ss.xxx] o [mm:ss:xx]
+_STAMP = re.compile(r'\[(\d+):(\d+)(?:[.:](\d+))?\]')
+# Tiempo por palabra del LRC extendido: <mm:ss.xx>palabra
+_WORD = re.compile(r'<(\d+):(\d+)(?:[.:](\d+))?>([^<]*)')
+_WORD_TAG = re.compile(r'<\d+:\d+(?:[.:]\d+)?>')
+
+
+def _seconds(minutes: str, seconds: str, fraction: str) -> float:
+    return int(minutes) * 60 + int(seconds) + (int(fraction) / 10 ** len(fraction) if fraction else 0.0)
+
+
+def _to_seconds(stamps: List[Tuple[str, str, str]]) -> np.ndarray:
+    """_seconds sobre muchos tiempos a la vez (los de cada palabra)"""
+    if not stamps:
+        return np.zeros(0)
+    minutes, seconds, fractions = zip(*stamps)
+    return (np.array(minutes, dtype=float) * 60 + np.array(seconds, dtype=float)
+            + np.char.add('0.', np.array(fractions, dtype=str)).astype(float))
+
+
+class LrcLyrics:
+    """Letra sincronizada por columnas: líneas y palabras con su tiempo
+
+    Las líneas están ordenadas por tiempo (`line_times`, `line_texts`). Las
+    palabras con tiempo propio (LRC extendido) van en `word_times` y
+    `word_texts`; las de la línea i son las del rango
+    word_bounds[i]:word_bounds[i + 1], así que las líneas sin tiempos por
+    palabra simplemente tienen un rango vacío.
+    """
+
+    def __init__(self, line_times: np.ndarray, line_texts: List[str],
+                 word_times: np.ndarray, word_texts: List[str], word_bounds: np.ndarray):
+        self.line_times = line_times
+        self.line_texts = line_texts
+        self.word_times = word_times
+        self.word_texts = word_texts
+        self.word_bounds = word_bounds
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[Tuple[float, str]]) -> 'LrcLyrics':
+        """A partir de la lista clásica de (tiempo, texto), sin palabras"""
+        lines = sorted(lines, key=lambda line: line[0])
+        return cls(np.array([time for time, _ in lines], dtype=float), [text for _, text in lines],
+                   np.zeros(0), [], np.zeros(len(lines) + 1, dtype=int))
+
+    @classmethod
+    def coerce(cls, lyrics) -> 'LrcLyrics':
+        """Devuelve `lyrics` como LrcLyrics (sin copiar si ya lo es)"""
+        if isinstance(lyrics, LrcLyrics):
+            return lyrics
+        return cls.from_lines(lyrics)
+
+    def __len__(self) -> int:
+        return len(self.line_times)
+
+    @property
+    def has_words(self) -> bool:
+        return len(self.word_times) > 0
+
+    def lines(self) -> List[Tuple[float, str]]:
+        return list(zip(self.line_times.tolist(), self.line_texts))
+
+    def words(self, line: int) -> Optional[List[List]]:
+        """[[tiempo, palabra], ...] de la línea, o None si no tiene tiempos por palabra"""
+        start, end = self.word_bounds[line], self.word_bounds[line + 1]
+        if start == end:
+            return None
+        return [[round(time, 3), text] for time, text in zip(self.word_times[start:end].tolist(),
+                                                              self.word_texts[start:end])]
+
+    def word_lists(self) -> List[Optional[List[List]]]:
+        """words() de todas las líneas, calculado de una vez"""
+        pairs = [[time, text] for time, text in zip(np.round(self.word_times, 3).tolist(), self.word_texts)]
+        bounds = self.word_bounds.tolist()
+        return [pairs[start:end] or None for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def parse_lrc(text: str) -> LrcLyrics:
+    """Analiza un LRC (o LRC extendido) en una sola pasada
+
+    - Varios tiempos en una línea ([00:12.00][01:30.00]estribillo) generan
+      una línea por tiempo; los tiempos por palabra se desplazan con ella.
+    - [offset:ms] adelanta (positivo) o retrasa (negativo) las líneas que
+      le siguen, como en los archivos con varias canciones.
+    - Las etiquetas de cabecera ([ar:], [ti:]...) y las líneas sin tiempo
+      se ignoran.
+
+    El texto se recorre una vez con expresiones compiladas; los tiempos se
+    convierten a segundos y se ordenan al final, por columnas.
+    """
+    line_times, line_shifts, line_sources = [], [], []
+    texts, word_stamps, word_texts, word_ranges = [], [], [], []
+    offset = 0.0
+    for match in _LINE.finditer(text):
+        if match.group('offset') is not None:
+            offset = int(match.group('offset')) / 1000
+            continue
+
+        body = match.group('text')
+        first_word = len(word_texts)
+        first_tag = body.find('<')
+        if first_tag >= 0:
+            # Texto antes de la primera etiqueta: empieza con la línea (tiempo NaN)
+            prefix = body[:first_tag].strip()
+            if prefix:
+                word_stamps.append(('nan', '0', ''))
+                word_texts.append(prefix)
+            for minutes, seconds, fraction, word in _WORD.findall(body, first_tag):
+                word = word.strip()
+                if word:
+                    word_stamps.append((minutes, seconds, fraction))
+                    word_texts.append(word)
+            body = _WORD_TAG.sub('', body)
+        texts.append(' '.join(body.split()))
+        word_ranges.append((first_word, len(word_texts)))
+
+        stamps = [_seconds(*stamp) for stamp in _STAMP.findall(match.group('stamps'))]
+        for stamp in stamps:
+            line_times.append(stamp - offset)
+            # Las palabras están escritas para el primer tiempo de la línea
+            line_shifts.append(stamp - stamps[0] - offset)
+            line_sources.append(len(texts) - 1)
+
+    times = np.maximum(np.array(line_times, dtype=float), 0.0)
+    order = np.argsort(times, kind='stable')
+    sources = np.array(line_sources, dtype=int)[order]
+
+    # Palabras de cada línea en el orden final, desplazadas con su línea
+    starts, ends = np.array(word_ranges, dtype=int).reshape(-1, 2)[sources].T
+    counts = ends - starts
+    bounds = np.concatenate([[0], np.cumsum(counts)]).astype(int)
+    word_index = np.repeat(starts - bounds[:-1], counts) + np.arange(bounds[-1])
+    raw = _to_seconds(word_stamps)[word_index]
+    shifts = np.repeat(np.array(line_shifts, dtype=float)[order], counts)
+    word_times = np.where(np.isnan(raw), np.repeat(times[order], counts), np.maximum(raw + shifts, 0.0))
+
+    return LrcLyrics(times[order], [texts[i] for i in sources.tolist()],
+                     word_times, [word_texts[i] for i in word_index.tolist()], bounds)
@@ -0,0 +1,120 @@
+import re
+import json
+import time
+import sqlite3
+import unicodedata
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from ..config import Config
+
+# Sufijos que no cambian la letra: "(feat. X)", "[Remastered 2011]", "- Radio Edit"...
+_BRACKETS = re.compile(r'\s*[\(\[][^\)\]]*[\)\]]')
+_SUFFIX = re.compile(r'\s+-\s+(?:.*\b(?:remaster(?:ed)?|version|edit|mix|live|mono|stereo)\b.*)$')
+_FEAT = re.compile(r'\s+(?:feat\.?|ft\.?|featuring)\s+.*$')
+_NON_WORD = re.compile(r'[^\w]+')
+
+# Marca de entrada negativa ("la búsqueda no encontró letra")
+MISSING = object()
+
+
+def normalize(text: Optional[str]) -> str:
+    """Forma canónica de un artista o título: minúsculas, sin acentos ni añadidos entre paréntesis"""
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKD', str(text).casefold())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = _FEAT.sub('', _SUFFIX.sub('', _BRACKETS.sub('', text)))
+    return _NON_WORD.sub(' ', text).strip()
+
+
+class LyricsCache:
+    """Caché persistente (SQLite) de búsquedas de letras
+
+    La clave es (artista, título) normalizados más la duración del audio:
+    una búsqueda con duración sólo reutiliza entradas dentro de
+    `DURATION_TOLERANCE` segundos, así que versiones de distinta duración
+    (radio edit, extended) no comparten letra sincronizada. Las letras
+    guardadas sin duración sirven para cualquiera; los "sin letra" sin
+    duración sólo para búsquedas sin duración (con duración se puede
+    probar /api/get, que sin ella no se intentó).
+
+    También guarda los resultados negativos ("sin letra"), con un TTL más
+    corto, para no repetir la búsqueda en cada trabajo. Los errores de red
+    no se guardan.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, ttl: Optional[float] = None,
+                 negative_ttl: Optional[float] = None):
+        self.cfg = Config.LYRICS
+        self.db_path = Path(db_path or Config.CACHE['LYRICS_DB'])
+        self.ttl = ttl if ttl is not None else self.cfg['CACHE_TTL']
+        self.negative_ttl = negative_ttl if negative_ttl is not None else self.cfg['NEGATIVE_TTL']
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS lyrics
+                            (artist TEXT,
+                             title TEXT,
+                             duration REAL,
+                             result TEXT,
+                             fetched_at REAL,
+                             PRIMARY KEY (artist, title, duration))''')
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def key(artist: str, title: str, duration: Optional[float] = None) -> Tuple[str, str, float]:
+        # Duración 0 = desconocida
+        return normalize(artist), normalize(title), round(float(duration), 1) if duration else 0.0
+
+    def get(self, artist: str, title: str, duration: Optional[float] = None):
+        """Resultado guardado, MISSING si se sabe que no hay letra o None si no está (o caducó)"""
+        artist, title, duration = self.key(artist, title, duration)
+        now = time.time()
+        # Las caducadas se descartan antes de elegir, para que no oculten una vigente
+        fresh = "((result IS NOT NULL AND fetched_at >= ?) OR (result IS NULL AND fetched_at >= ?))"
+        with self._connect() as conn:
+            if duration:
+                row = conn.execute(
+                    f"SELECT result FROM lyrics WHERE artist = ? AND title = ? AND {fresh} "
+                    "AND (ABS(duration - ?) <= ? OR (duration = 0 AND result IS NOT NULL)) "
+                    "ORDER BY duration = 0, ABS(duration - ?) LIMIT 1",
+                    (artist, title, now - self.ttl, now - self.negative_ttl,
+                     duration, self.cfg['DURATION_TOLERANCE'], duration)).fetchone()
+            else:
+                row = conn.execute(
+                    f"SELECT result FROM lyrics WHERE artist = ? AND title = ? AND {fresh} "
+                    "ORDER BY fetched_at DESC LIMIT 1",
+                    (artist, title, now - self.ttl, now - self.negative_ttl)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]) if row[0] is not None else MISSING
+
+    def put(self, artist: str, title: str, duration: Optional[float], result: Optional[Dict[str, Any]]):
+        """Guarda un resultado (None = no hay letra)"""
+        key = self.key(artist, title, duration)
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO lyrics VALUES (?, ?, ?, ?, ?)",
+                         (*key, json.dumps(result) if result is not None else None, time.time()))
+
+    def purge(self) -> int:
+        """Elimina las entradas caducadas y devuelve cuántas había"""
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "DELETE FROM lyrics WHERE (result IS NOT NULL AND fetched_at < ?) "
+                "OR (result IS NULL AND fetched_at < ?)", (now - self.ttl, now - self.negative_ttl))
+            return cursor.rowcount
+
+    def stats(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            found, missing = conn.execute(
+                "SELECT COUNT(result), COUNT(*) - COUNT(result) FROM lyrics").fetchone()
+        return {'found': found, 'missing': missing}
@@ -0,0 +1,52 @@
+"""Precarga la caché de letras para un directorio de pistas
+
+Lee artista, título y duración de cada archivo de audio (AudioAsset) y
+busca su letra con LyricsFetcher (varias búsquedas a la vez), que guarda
+aciertos y "sin letra" en la caché. Las pistas ya en caché no generan
+peticiones.
+
+Uso (desde la raíz del repositorio):
+    python -m server.core.lyrics_handler.prefetch <directorio> [--base-url URL]
+"""
+import time
+import asyncio
+import argparse
+from pathlib import Path
+from typing import Dict, Optional
+from ..audio_asset import AudioAsset, SUPPORTED_FORMATS
+from .api_lyrics import LyricsFetcher
+
+
+def prefetch(directory: str, fetcher: Optional[LyricsFetcher] = None,
+             concurrency: Optional[int] = None) -> Dict[str, int]:
+    """Busca la letra de todas las pistas de `directory` (recursivo), varias a la vez"""
+    fetcher = fetcher or LyricsFetcher()
+    extensions = set(SUPPORTED_FORMATS.values())
+    paths = [p for p in sorted(Path(directory).rglob('*')) if p.suffix.lower() in extensions]
+    assets = [AudioAsset.from_path(str(p)) for p in paths]
+    tracks = [(a.artist, a.title, a.album, a.duration) for a in assets]
+    outcomes = asyncio.run(fetcher.lookup_many(tracks, concurrency))
+
+    counts = {'tracks': len(paths), 'found': 0, 'missing': 0, 'errors': 0}
+    for path, (result, error) in zip(paths, outcomes):
+        status = 'errors' if error is not None else 'missing' if result is None else 'found'
+        counts[status] += 1
+        print(f"{path.name}: {'error' if error is not None else 'ok' if result else 'sin letra'}")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('directory')
+    parser.add_argument('--base-url', help='Servidor compatible con lrclib (por defecto Config.LYRICS)')
+    parser.add_argument('--concurrency', type=int, help='Búsquedas simultáneas (por defecto LYRICS POOL_SIZE)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    counts = prefetch(args.directory, LyricsFetcher(base_url=args.base_url), args.concurrency)
+    print(f"{counts['tracks']} pistas en {time.perf_counter() - start:.1f} s: {counts['found']} con letra, "
+          f"{counts['missing']} sin letra, {counts['errors']} errores")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import os
+import json
+import msgpack
+import numpy as np
+from pathlib import Path
+from typing import Any, Dict, Optional
+from .config import Config
+from .audio_asset import AudioAsset
+from .event_table import EventTable
+from .audio_processor.event_generation import EventGenerator
+from .audio_processor.analysis_cache import analysis_fingerprint
+from .lyrics_handler import LyricsHandler
+from .album_processor import AlbumProcessor
+
+# Incrementar cuando cambie el formato de la línea de tiempo
+TIMELINE_VERSION = 2
+
+
+class TimelineBuilder:
+    """Línea de tiempo de eventos de una canción, sin generar imágenes
+
+    Ejecuta sólo las etapas de CPU del procesamiento (metadatos,
+    EventGenerator, letras y paleta) y devuelve los eventos por columnas:
+    cada campo es una lista con un valor por evento, lo que ocupa mucho
+    menos que una lista de diccionarios. No importa torch ni diffusers.
+
+    El resultado se guarda como msgpack por (hash del audio, huella del
+    perfil de análisis); si la búsqueda de letras falla no se guarda, para
+    reintentarla en la siguiente petición.
+    """
+
+    # Campos que no hace falta enviar ('duration' = end_time - start_time)
+    SKIP_FIELDS = ('duration',)
+
+    def __init__(self, profile: Optional[str] = None, cache_dir: Optional[str] = None):
+        self.profile = profile
+        self.cfg = Config.get_audio_profile(profile)
+        self.cache_dir = Path(cache_dir or Config.CACHE['TIMELINE_DIR'])
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _cache_path(self, audio_hash: str) -> Path:
+        return self.cache_dir / f"{audio_hash}_{analysis_fingerprint(self.cfg)}_v{TIMELINE_VERSION}.msgpack"
+
+    def get(self, audio_hash: str) -> Optional[Dict[str, Any]]:
+        """Línea de tiempo guardada o None"""
+        path = self._cache_path(audio_hash)
+        try:
+            with open(path, 'rb') as f:
+                return msgpack.unpackb(f.read())
+        except (OSError, ValueError, msgpack.UnpackException):
+            return None
+
+    def build(self, asset: AudioAsset, audio_hash: Optional[str] = None, refresh: bool = False) -> Dict[str, Any]:
+        """Analiza `asset` (cuyo archivo está en asset.path) y devuelve la línea de tiempo
+
+        Con refresh=True no se usa la línea de tiempo guardada (p. ej. si se subió un .lrc).
+        """
+        if audio_hash is not None and not refresh:
+            cached = self.get(audio_hash)
+            if cached is not None:
+                print(f"Línea de tiempo recuperada de caché ({audio_hash[:12]})")
+                return cached
+
+        analysis = EventGenerator(profile=self.profile).generate_events(asset.path, audio_hash, asset.duration)
+        lyrics = LyricsHandler()
+        try:
+            events = EventTable.coerce(lyrics.process(asset, analysis['events']))
+            lyrics_ok = lyrics.fetcher.last_error is None
+        except Exception as e:
+            print(f"No se pudieron buscar las letras: {e}")
+            events, lyrics_ok = analysis['events'], False
+        # Sólo los colores: los nombres (para los prompts) requieren una API externa
+        palette = AlbumProcessor(n_colors=5).process_album(asset, describe=False)
+
+        metadata = analysis['metadata']
+        timeline = {
+            'version': TIMELINE_VERSION,
+            'audio_hash': audio_hash,
+            'profile': metadata['profile'],
+            'metadata': {
+                **asset.metadata(),
+                'duration': float(metadata['duration']),
+                'tempo': float(np.atleast_1d(metadata['tempo'])[0]),
+                'silent_regions': _plain(metadata['silent_regions']),
+                'sections': _plain(metadata['sections']),
+            },
+            'palette': palette['hex_colors'] if palette else [],
+            'events': self._columns(events),
+        }
+
+        if audio_hash is not None and lyrics_ok:
+            self._put(audio_hash, timeline)
+        return timeline
+
+    def _columns(self, events: EventTable) -> Dict[str, list]:
+        columns = {}
+        for name in events.fields:
+            if name in self.SKIP_FIELDS:
+                continue
+            values = events.column(name)
+            if values.dtype.kind == 'f':
+                values = np.round(values.astype(np.float64), 3)
+            columns[name] = _plain(values.tolist())
+        return columns
+
+    def _put(self, audio_hash: str, timeline: Dict[str, Any]):
+        path = self._cache_path(audio_hash)
+        temp_path = path.with_name(path.name + '.tmp')
+        with open(temp_path, 'wb') as f:
+            f.write(msgpack.packb(timeline))
+        os.replace(temp_path, path)
+
+
+def pack(timeline: Dict[str, Any], fmt: str = 'json') -> bytes:
+    """Serializa la línea de tiempo como 'json' o 'msgpack' (con floats de 32 bits)"""
+    if fmt == 'msgpack':
+        return msgpack.packb(timeline, use_single_float=True)
+    return json.dumps(timeline, separators=(',', ':'), ensure_ascii=False).encode()
+
+
+def _plain(value):
+    """Convierte escalares y arreglos de NumPy en tipos nativos (para JSON y msgpack)"""
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return _plain(value.tolist())
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
@@ -1,8 +1,10 @@
 import os
 import hashlib
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont, ImageOps, ImageFilter
 from typing import List, Dict, Tuple, Optional
 from ..config import Config
+from ..event_table import EventTable
 import random
 
 class ArtisticTextRenderer:
@@ -177,14 +179,14 @@ class ArtisticTextRenderer:
             print(f"Error añadiendo texto artístico a {image_path}: {e}")
             return image_path
     
-    def process_image_directory(self, image_dir: str, events: List[Dict], palette: Optional[List[str]] = None):
+    def process_image_directory(self, image_dir: str, events: EventTable, palette: Optional[List[str]] = None):
         """Procesa todas las imágenes en un directorio basado en los eventos"""
-        # Crear un mapa de texto por tiempo para búsqueda rápida
-        text_map = {}
-        for e in events:
-            lyric = e.get('lyric', '')
-            if lyric.strip():
-                text_map[e['start_time']] = lyric
+        # Subtabla de eventos con letra para búsqueda por tiempo en O(log n)
+        events = EventTable.coerce(events)
+        has_text = np.array([bool(lyric and lyric.strip()) for lyric in events.column('lyric')], dtype=bool)
+        lyric_events = events.take(has_text)
+        if len(lyric_events) == 0:
+            return
         
         # Procesar cada imagen en el directorio
         for filename in os.listdir(image_dir):
@@ -195,8 +197,7 @@ class ArtisticTextRenderer:
                     event_time = float(time_str)
                     
                     # Encontrar el texto más cercano en el tiempo
-                    closest_time = min(text_map.keys(), key=lambda t: abs(t - event_time))
-                    text = text_map[closest_time]
+                    text = lyric_events[lyric_events.nearest(event_time)]['lyric']
                     
                     # Procesar imagen
                     image_path = os.path.join(image_dir, filename)
@@ -4,13 +4,14 @@ from typing import List
 from moviepy import *
 from moviepy.video.io.ImageSequenceClip import ImageSequenceClip
 from ..config import Config
+from ..event_table import EventTable
 
 class VideoExporter:
     def __init__(self, fps: int = None):
         self.cfg = Config.VIDEO
         self.fps = fps or self.cfg['FPS']
     
-    def create_video(self, image_dir: str, audio_path: str, events: List[dict], output_path: str):
+    def create_video(self, image_dir: str, audio_path: str, events: EventTable, output_path: str):
         """
         Crea un video a partir de imágenes y audio, sincronizado con eventos
         
@@ -58,8 +59,10 @@ class VideoExporter:
         )
         return output_path
 
-    def prepare_clips(self, image_dir: str, events: List[dict]) -> List[dict]:
+    def prepare_clips(self, image_dir: str, events: EventTable) -> List[dict]:
         """Prepara la lista de clips con sus rutas y duraciones"""
+        events = EventTable.coerce(events)
+        
         # Obtener todas las imágenes del directorio
         image_files = [f for f in os.listdir(image_dir) if f.endswith(('.png', '.jpg'))]
         
@@ -84,10 +87,11 @@ class VideoExporter:
 
         # Para cada tiempo de imagen, encontrar el evento correspondiente
         for i, time_val in enumerate(sorted_times):
-            # Encontrar el evento que coincide con este tiempo
-            matching_event = next((e for e in events if abs(e['start_time'] - time_val) < 0.1), None)
+            # Encontrar el evento que coincide con este tiempo (búsqueda binaria)
+            match_index = events.find(time_val, tolerance=0.1)
             
-            if matching_event:
+            if match_index is not None:
+                matching_event = events[match_index]
                 # Calcular duración hasta el próximo evento
                 if i < len(sorted_times) - 1:
                     next_time = sorted_times[i + 1]
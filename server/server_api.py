@@ -3,8 +3,10 @@ import uuid
 import sqlite3
 import hashlib
 from pathlib import Path
-from fastapi.responses import JSONResponse, FileResponse
+from typing import Optional
+from fastapi.responses import JSONResponse, FileResponse, Response
 from fastapi import FastAPI, UploadFile, File, Form, BackgroundTasks, HTTPException
+from fastapi.concurrency import run_in_threadpool
 import sys
 import uvicorn
 import logging
@@ -40,72 +42,141 @@ def init_db():
                  progress INTEGER, 
                  video_path TEXT, 
                  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+    # Identidad del audio independiente de etiquetas (bases de datos anteriores no la tienen)
+    columns = [row[1] for row in c.execute("PRAGMA table_info(jobs)")]
+    if 'audio_hash' not in columns:
+        c.execute("ALTER TABLE jobs ADD COLUMN audio_hash TEXT")
+    if 'profile' not in columns:
+        c.execute("ALTER TABLE jobs ADD COLUMN profile TEXT")
+    if 'image_budget' not in columns:
+        c.execute("ALTER TABLE jobs ADD COLUMN image_budget INTEGER")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_jobs_audio_hash ON jobs (audio_hash, preset)")
     conn.commit()
     conn.close()
 
 init_db()
 
+# La caché de numba debe configurarse antes de que se importe librosa
+from server.core.config import Config
+from server.core.audio_processor.warmup import configure_jit_cache, warm_up
+configure_jit_cache()
+
+from server.core.audio_processor.fingerprint import FingerprintIndex, audio_content_hash
+from server.core.audio_asset import AudioAsset, SUPPORTED_FORMATS
+fingerprints = FingerprintIndex(str(DB_PATH))
+
+from server.core.audio_processor.library_index import LibraryIndex
+# Una sola instancia: las columnas quedan mapeadas entre consultas
+library = LibraryIndex()
+
+@app.on_event("startup")
+def warm_up_audio_analysis():
+    # Compila (o carga de la caché en disco) los kernels JIT de librosa
+    # para que el primer trabajo no pague la compilación
+    elapsed = warm_up()
+    print(f"Análisis de audio precalentado en {elapsed:.2f} s")
+
 @app.get("/status")
 async def status():
     return {"status": "online", "version": "1.0"}
 
+async def read_upload(upload: UploadFile):
+    """Lee el audio subido (MP3, FLAC, OGG/Opus, M4A o WAV): contenido, sha256, hash de audio y AudioAsset"""
+    content = await upload.read()
+    # Etiquetas y portada se leen una sola vez y se pasan a todas las etapas
+    asset = AudioAsset.from_bytes(content, upload.filename)
+    if not asset.supported:
+        raise HTTPException(status_code=400,
+                            detail=f"Unsupported audio format. Supported: {', '.join(sorted(SUPPORTED_FORMATS.values()))}")
+    file_hash = hashlib.sha256(content).hexdigest()
+    # Hash de los frames de audio: reetiquetar o cambiar la portada no lo cambia
+    return content, file_hash, audio_content_hash(content), asset
+
+def save_upload(content: bytes, name: str, asset: AudioAsset) -> Path:
+    """Guarda el audio en UPLOAD_DIR con su extensión real y apunta el AudioAsset a él"""
+    temp_path = UPLOAD_DIR / f"{name}{asset.extension}"
+    with open(temp_path, "wb") as f:
+        f.write(content)
+    asset.path = str(temp_path)
+    return temp_path
+
+MAX_LRC_BYTES = 1024 * 1024
+
+async def read_lrc(upload: Optional[UploadFile]) -> Optional[bytes]:
+    """Contenido del .lrc subido junto al audio (None si no hay)"""
+    if upload is None:
+        return None
+    content = await upload.read()
+    if len(content) > MAX_LRC_BYTES:
+        raise HTTPException(status_code=400, detail="LRC file is too large")
+    try:
+        content.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="LRC file must be UTF-8 text")
+    return content
+
+def save_sidecar(lrc_content: Optional[bytes], temp_path: Path):
+    """Guarda la letra junto al audio (mismo nombre, .lrc), donde la busca LocalLyricsProvider"""
+    if lrc_content is not None:
+        with open(temp_path.with_suffix('.lrc'), "wb") as f:
+            f.write(lrc_content)
+
+def remove_upload(temp_path) -> None:
+    """Elimina el audio temporal y su .lrc, si lo hay"""
+    for path in (Path(temp_path), Path(temp_path).with_suffix('.lrc')):
+        if path.exists():
+            os.remove(path)
+
+async def resolve_audio_hash(temp_path: Path, audio_hash: str) -> str:
+    """Hash canónico: las recodificaciones casi idénticas comparten el del primer archivo visto"""
+    try:
+        return await run_in_threadpool(fingerprints.resolve, str(temp_path), audio_hash)
+    except Exception as e:
+        # Sin huella se sigue con el hash exacto; el procesamiento reportará el error si lo hay
+        print(f"No se pudo calcular la huella de audio: {e}")
+        return audio_hash
+
 @app.post("/create_video")
 async def create_video(
     background_tasks: BackgroundTasks,
     mp3: UploadFile = File(...),
-    preset: str = Form(...) 
+    preset: str = Form(...),
+    profile: str = Form(Config.DEFAULT_AUDIO_PROFILE),
+    image_budget: Optional[int] = Form(None),
+    lrc: Optional[UploadFile] = File(None)
 ):
     # Log para depuración
     print(f"Recibido MP3: {mp3.filename}")
     print(f"Recibido preset: {preset}")
+    print(f"Perfil de análisis: {profile}")
 
-    # Leer y hashear MP3
-    mp3_content = await mp3.read()
-    mp3_hash = hashlib.sha256(mp3_content).hexdigest()
+    if profile not in Config.AUDIO_PROFILES:
+        raise HTTPException(status_code=400, detail=f"Unknown analysis profile: {profile}")
+    if image_budget is not None and image_budget < 1:
+        raise HTTPException(status_code=400, detail="image_budget must be a positive integer")
 
-    # VERIFICAR SI YA EXISTE EN LA BASE DE DATOS
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    
-    # Buscar trabajos completados con el mismo hash y preset
-    c.execute("""
-        SELECT id, status, video_path 
-        FROM jobs 
-        WHERE mp3_hash = ? AND preset = ? AND status = 'completed'
-        ORDER BY created_at DESC 
-        LIMIT 1
-    """, (mp3_hash, preset))
-    
-    existing_job = c.fetchone()
+    mp3_content, mp3_hash, audio_hash, asset = await read_upload(mp3)
+    # Con letra propia no se reutiliza un video anterior (podría no tenerla)
+    lrc_content = await read_lrc(lrc)
 
-    if existing_job:
-        # El video ya existe
-        _job_id, _status, _video_path = existing_job
-        # Verificar que el archivo de video todavía existe
-        video_file = VIDEO_DIR / _job_id / "video.mp4"
-        syn_file = VIDEO_DIR / _job_id / "video.syn"
-        
-        if video_file.exists() and syn_file.exists():
-            conn.close()
-            
-            print(f" Trabajo existente encontrado para MP3 hash: {mp3_hash[:16]}... con preset: {preset}")
-            print(f"   Job ID existente: {_job_id}")
-            
-            return JSONResponse({
-                "job_id": _job_id, 
-                "status": "already_exists"
-            }, status_code=200)
-        else:
-            # Si los archivos no existen, marcar como fallido y continuar con la creación de un nuevo trabajo
-            update_job_status(_job_id, "not_found", 4)
+    existing_job_id = find_completed_job(audio_hash, preset, profile, image_budget) if lrc_content is None else None
+    if existing_job_id:
+        print(f" Trabajo existente encontrado para audio hash: {audio_hash[:16]}... con preset: {preset}")
+        print(f"   Job ID existente: {existing_job_id}")
+        return JSONResponse({"job_id": existing_job_id, "status": "already_exists"}, status_code=200)
 
     # Guardar temporalmente
-    temp_path = UPLOAD_DIR / f"temp_{mp3_hash}.mp3"
-    with open(temp_path, "wb") as f:
-        f.write(mp3_content)
+    temp_path = save_upload(mp3_content, f"temp_{mp3_hash}", asset)
+    save_sidecar(lrc_content, temp_path)
 
-    # Cerrar la conexión de la verificación
-    conn.close()
+    # Recodificaciones casi idénticas comparten el hash canónico del primer archivo visto
+    audio_hash = await resolve_audio_hash(temp_path, audio_hash)
+    existing_job_id = find_completed_job(audio_hash, preset, profile, image_budget) if lrc_content is None else None
+    if existing_job_id:
+        remove_upload(temp_path)
+        print(f" Recodificación de un audio ya procesado: {audio_hash[:16]}... con preset: {preset}")
+        print(f"   Job ID existente: {existing_job_id}")
+        return JSONResponse({"job_id": existing_job_id, "status": "already_exists"}, status_code=200)
         
     # Crear job ID
     job_id = str(uuid.uuid4())
@@ -116,16 +187,139 @@ async def create_video(
     # Registrar en base de datos
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
-    c.execute("INSERT INTO jobs (id, mp3_hash, preset, status, progress, video_path) VALUES (?, ?, ?, ?, ?, ?)", 
-                  (job_id, mp3_hash, preset, "queued", 0, str(video_dir_path)))
+    c.execute("INSERT INTO jobs (id, mp3_hash, audio_hash, preset, profile, image_budget, status, progress, video_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", 
+                  (job_id, mp3_hash, audio_hash, preset, profile, image_budget, "queued", 0, str(video_dir_path)))
     conn.commit()
     conn.close()
     
     # Procesar en segundo plano
-    background_tasks.add_task(process_video_background, job_id, str(temp_path), preset, str(video_path))
+    background_tasks.add_task(process_video_background, job_id, str(temp_path), preset, str(video_path), audio_hash, profile,
+                              image_budget, asset)
     
     return JSONResponse({"job_id": job_id, "status": "queued"}, status_code=202)
 
+def find_completed_job(audio_hash: str, preset: str, profile: str, image_budget: Optional[int] = None):
+    """ID del último trabajo completado con el mismo audio, preset, perfil y presupuesto cuyos archivos siguen existiendo"""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    
+    # Buscar trabajos completados con el mismo audio, preset, perfil y presupuesto de imágenes
+    # (los trabajos anteriores a los perfiles usaron el perfil por defecto; sin presupuesto = por defecto)
+    c.execute("""
+        SELECT id, status, video_path 
+        FROM jobs 
+        WHERE audio_hash = ? AND preset = ? AND COALESCE(profile, ?) = ? AND image_budget IS ?
+          AND status = 'completed'
+        ORDER BY created_at DESC 
+        LIMIT 1
+    """, (audio_hash, preset, Config.DEFAULT_AUDIO_PROFILE, profile, image_budget))
+    
+    existing_job = c.fetchone()
+    conn.close()
+
+    if not existing_job:
+        return None
+
+    # El video ya existe
+    _job_id, _status, _video_path = existing_job
+    # Verificar que el archivo de video todavía existe
+    video_file = VIDEO_DIR / _job_id / "video.mp4"
+    syn_file = VIDEO_DIR / _job_id / "video.syn"
+    if video_file.exists() and syn_file.exists():
+        return _job_id
+
+    # Si los archivos no existen, marcar como fallido y continuar con la creación de un nuevo trabajo
+    update_job_status(_job_id, "not_found", 4)
+    return None
+
+@app.post("/analyze")
+async def analyze(
+    mp3: UploadFile = File(...),
+    profile: str = Form(Config.DEFAULT_AUDIO_PROFILE),
+    format: str = Form("json"),
+    lrc: Optional[UploadFile] = File(None)
+):
+    """Línea de tiempo de eventos (con letras y paleta) sin generar el video
+
+    Sólo usa las etapas de CPU: no carga los modelos de difusión.
+    """
+    if profile not in Config.AUDIO_PROFILES:
+        raise HTTPException(status_code=400, detail=f"Unknown analysis profile: {profile}")
+    if format not in ("json", "msgpack"):
+        raise HTTPException(status_code=400, detail="format must be 'json' or 'msgpack'")
+
+    # Importación diferida: carga librosa pero nunca torch ni diffusers
+    from server.core.timeline import TimelineBuilder, pack
+    builder = TimelineBuilder(profile)
+
+    mp3_content, mp3_hash, audio_hash, asset = await read_upload(mp3)
+    lrc_content = await read_lrc(lrc)
+    # Con letra propia se recalcula (y reemplaza) la línea de tiempo guardada
+    timeline = builder.get(audio_hash) if lrc_content is None else None
+    if timeline is None:
+        temp_path = save_upload(mp3_content, f"analyze_{mp3_hash}", asset)
+        save_sidecar(lrc_content, temp_path)
+        try:
+            audio_hash = await resolve_audio_hash(temp_path, audio_hash)
+            timeline = await run_in_threadpool(builder.build, asset, audio_hash, lrc_content is not None)
+        finally:
+            remove_upload(temp_path)
+
+    media_type = "application/msgpack" if format == "msgpack" else "application/json"
+    return Response(content=pack(timeline, format), media_type=media_type)
+
+@app.get("/cache/stats")
+def cache_stats():
+    # Importación diferida: sólo depende del análisis de audio
+    from server.core.audio_processor.analysis_cache import AnalysisCache
+    return AnalysisCache().stats()
+
+@app.get("/library")
+def query_library(
+    tempo_min: Optional[float] = None,
+    tempo_max: Optional[float] = None,
+    tempo_octaves: bool = False,
+    energy: Optional[str] = None,
+    energy_min: Optional[float] = None,
+    energy_max: Optional[float] = None,
+    duration_min: Optional[float] = None,
+    duration_max: Optional[float] = None,
+    order_by: str = "energy",
+    descending: bool = True,
+    limit: int = 100
+):
+    """Pistas ya analizadas por tempo, energía y duración, con sus videos completados"""
+    if energy is not None and energy not in LibraryIndex.ENERGY_LEVELS:
+        raise HTTPException(status_code=400, detail=f"Unknown energy level: {energy}")
+    energy_range = (energy_min, energy_max) if energy_min is not None or energy_max is not None else None
+    if energy is not None and energy_range is not None:
+        raise HTTPException(status_code=400, detail="Use either energy or energy_min/energy_max")
+
+    def bounds(low, high):
+        return (low, high) if low is not None or high is not None else None
+
+    try:
+        result = library.query(tempo=bounds(tempo_min, tempo_max), energy=energy or energy_range,
+                               duration=bounds(duration_min, duration_max), tempo_octaves=tempo_octaves,
+                               order_by=order_by, descending=descending, limit=max(1, min(limit, 1000)))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Videos completados de las pistas devueltas (sólo las de esta página)
+    hashes = [track['audio_hash'] for track in result['tracks']]
+    jobs = {}
+    if hashes:
+        conn = sqlite3.connect(DB_PATH)
+        rows = conn.execute(f"SELECT audio_hash, id, preset FROM jobs WHERE status = 'completed' "
+                            f"AND audio_hash IN ({','.join('?' * len(hashes))}) ORDER BY created_at DESC",
+                            hashes).fetchall()
+        conn.close()
+        for audio_hash, job_id, preset in rows:
+            jobs.setdefault(audio_hash, []).append({"job_id": job_id, "preset": preset})
+    for track in result['tracks']:
+        track['jobs'] = jobs.get(track['audio_hash'], [])
+    return result
+
 @app.get("/status/{job_id}")
 def get_job_status(job_id: str):
     conn = sqlite3.connect(DB_PATH)
@@ -180,7 +374,8 @@ async def download_metadata(job_id: str):
     
     return FileResponse(str(metadata_file_path), media_type='application/json', filename=f"synesthesia_{job_id}.syn")
 
-def process_video_background(job_id: str, mp3_path: str, preset: str, output_path: str):
+def process_video_background(job_id: str, mp3_path: str, preset: str, output_path: str, audio_hash: str = None,
+                             profile: str = None, image_budget: int = None, asset=None):
     try:
         # Actualizar estado a procesando
         update_job_status(job_id, "processing", 10)
@@ -189,7 +384,7 @@ def process_video_background(job_id: str, mp3_path: str, preset: str, output_pat
             from synesthesia import process_song
             
             # Creacion de video
-            process_song(mp3_path, output_path, preset)
+            process_song(mp3_path, output_path, preset, audio_hash, profile, image_budget, asset)
             
             # Actualizar estado a completado
             update_job_status(job_id, "completed", 90)
@@ -208,9 +403,8 @@ def process_video_background(job_id: str, mp3_path: str, preset: str, output_pat
     except Exception as e:
         update_job_status(job_id, f"failed: {str(e)}", 3)
     finally:
-        # Eliminar archivo temporal
-        if os.path.exists(mp3_path):
-            os.remove(mp3_path)
+        # Eliminar archivo temporal (y su letra, si se subió)
+        remove_upload(mp3_path)
 
 def update_job_status(job_id: str, status: str, progress: int):
     conn = sqlite3.connect(DB_PATH)
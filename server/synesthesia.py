@@ -1,4 +1,6 @@
 from server.core.audio_processor.event_generation import EventGenerator
+from server.core.audio_processor.event_planner import EventBudgetPlanner
+from server.core.audio_processor.library_index import LibraryIndex
 from server.core.lyrics_handler import LyricsHandler
 from server.core.album_processor import AlbumProcessor
 from server.core.image_generator import ImageGenerator
@@ -10,99 +12,15 @@ from pathlib import Path
 from datetime import datetime
 import json
 import os
-import tempfile
-from mutagen.mp3 import MP3
-from mutagen.id3 import ID3, APIC
+from server.core.audio_asset import AudioAsset
 import logging
 
 
-def extract_audio_metadata(mp3_path):
-    """
-    Extrae metadatos básicos del archivo MP3 usando el mismo método que en lyrics_handler
-    """
-    try:
-        audio = MP3(mp3_path, ID3=ID3)
-        metadata = {}
-        
-        # Extraer título - usando el mismo método que en _get_metadata
-        title_tag = audio.tags.get('TIT2')
-        if title_tag:
-            metadata['title'] = str(title_tag.text[0])
-        else:
-            metadata['title'] = Path(mp3_path).stem
-        
-        # Extraer artista
-        artist_tag = audio.tags.get('TPE1')
-        if artist_tag:
-            metadata['artist'] = str(artist_tag.text[0])
-        else:
-            metadata['artist'] = 'Unknown Artist'
-        
-        # Extraer álbum
-        album_tag = audio.tags.get('TALB')
-        if album_tag:
-            metadata['album'] = str(album_tag.text[0])
-        else:
-            metadata['album'] = 'Unknown Album'
-        
-        # Duración
-        metadata['duration'] = audio.info.length
-        
-        print(f" Metadatos extraídos: {metadata['title']} - {metadata['artist']}\n")
-        return metadata
-        
-    except Exception as e:
-        print(f" Error extrayendo metadatos: {e}\n")
-        return {
-            'title': Path(mp3_path).stem,
-            'artist': 'Unknown Artist',
-            'album': 'Unknown Album',
-            'duration': 0
-        }
-
-def extract_album_cover(mp3_path):
-    """
-    Extrae la portada del álbum de un archivo MP3 usando el mismo método que en AlbumProcessor
-    """
-    try:
-        audio = MP3(mp3_path, ID3=ID3)
-        
-        # Buscar todas las imágenes (puede haber varias)
-        images = []
-        for tag in audio.tags.values():
-            if isinstance(tag, APIC):
-                images.append(tag)
-        
-        if not images:
-            print("ℹ No se encontraron imágenes en los metadatos del MP3\n")
-            return None
-            
-        # Seleccionar la imagen de mayor tamaño (asumimos que es la portada)
-        largest_image = max(images, key=lambda img: len(img.data))
-        
-        # Determinar extensión basada en el MIME type
-        if largest_image.mime == 'image/jpeg':
-            ext = 'jpg'
-        elif largest_image.mime == 'image/png':
-            ext = 'png'
-        else:
-            ext = 'jpg'  # fallback
-        
-        # Crear archivo temporal
-        temp_cover = tempfile.NamedTemporaryFile(delete=False, suffix=f'.{ext}')
-        temp_cover.write(largest_image.data)
-        temp_cover.close()
-        
-        print(f" Portada extraída y guardada en: {temp_cover.name}\n")
-        return temp_cover.name
-        
-    except Exception as e:
-        print(f" No se pudo extraer portada: {e}\n")
-        return None
-
-def inject_video_metadata(video_path, metadata, cover_path=None):
+def inject_video_metadata(video_path, metadata, cover=None):
     """
     Inyecta metadatos y portada del álbum en el archivo de video usando ffmpeg
+
+    La portada (bytes, AudioAsset.cover) entra a ffmpeg por stdin, sin archivo temporal
     """
     try:
         # Crear archivo temporal para el output
@@ -115,9 +33,9 @@ def inject_video_metadata(video_path, metadata, cover_path=None):
         ]
         
         # Agregar portada si está disponible
-        if cover_path and os.path.exists(cover_path):
-            cmd.extend(['-i', cover_path])  # Input imagen de portada
-            print(f" Portada encontrada, agregando al video: {cover_path}\n")
+        if cover:
+            cmd.extend(['-f', 'image2pipe', '-i', 'pipe:0'])  # Input imagen de portada
+            print(" Portada encontrada, agregando al video\n")
         
         # Agregar metadatos
         cmd.extend([
@@ -131,7 +49,7 @@ def inject_video_metadata(video_path, metadata, cover_path=None):
         ])
         
         # Si hay portada, agregarla como stream de imagen
-        if cover_path and os.path.exists(cover_path):
+        if cover:
             cmd.extend([
                 '-map', '1',  # Usar la imagen como segundo stream
                 '-disposition:v:1', 'attached_pic',  # Marcar como portada adjunta
@@ -141,7 +59,7 @@ def inject_video_metadata(video_path, metadata, cover_path=None):
         
         # Ejecutar ffmpeg
         print(f" Ejecutando comando ffmpeg para inyectar metadatos...\n")
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+        result = subprocess.run(cmd, input=cover, capture_output=True, timeout=30)
         
         if result.returncode == 0:
             # Reemplazar archivo original con el que tiene metadatos
@@ -149,7 +67,7 @@ def inject_video_metadata(video_path, metadata, cover_path=None):
             print(f" Metadatos y portada inyectados exitosamente en: {video_path}\n")
             return True
         else:
-            print(f" Error inyectando metadatos: {result.stderr}\n")
+            print(f" Error inyectando metadatos: {result.stderr.decode(errors='replace')}\n")
             # Limpiar archivo temporal en caso de error
             if os.path.exists(temp_path):
                 os.unlink(temp_path)
@@ -239,34 +157,52 @@ def save_updated_metadata(video_path, metadata):
         print(f" Error guardando metadatos actualizados: {e}\n")
         return False
 
-def process_song(file_path: str, output_dir: str, style_preset="minimal_geometric"):
+def process_song(file_path: str, output_dir: str, style_preset="minimal_geometric", audio_hash: str = None,
+                 analysis_profile: str = None, image_budget: int = None, asset: AudioAsset = None):
     logger = logging.getLogger(__name__)
-    # 0. Extraer metadatos y portada ANTES de procesar
+    # 0. Extraer metadatos y portada ANTES de procesar (una sola lectura, compartida por todas las etapas)
     print(" Extrayendo metadatos y portada del audio...\n")
-    audio_metadata = extract_audio_metadata(file_path)
-    cover_path = extract_album_cover(file_path)
+    asset = asset or AudioAsset.from_path(file_path)
+    audio_metadata = asset.metadata()
+    cover_image = asset.cover_image()
     
     print(f"   Título: {audio_metadata.get('title', 'N/A')}\n")
     print(f"   Artista: {audio_metadata.get('artist', 'N/A')}\n")
     print(f"   Álbum: {audio_metadata.get('album', 'N/A')}\n")
     print(f"   Duración: {audio_metadata.get('duration', 0):.2f} segundos\n")
-    print(f"   Portada: {' Encontrada' if cover_path else ' No encontrada'}\n")
+    print(f"   Portada: {' Encontrada' if cover_image is not None else ' No encontrada'}\n")
 
     # 1. Procesamiento de audio
     print(" Procesando audio (esto puede tomar unos segundos)...\n")
-    audio_analysis = EventGenerator().generate_events(file_path)
+    audio_analysis = EventGenerator(profile=analysis_profile).generate_events(file_path, audio_hash,
+                                                                             asset.duration)
     print(f" eventos encontrados: {len(audio_analysis["events"])}\n")
     
+    # 1a. Registrar tempo y energía en el índice de la biblioteca
+    if audio_hash is not None:
+        try:
+            LibraryIndex().add(audio_hash, audio_analysis)
+        except Exception as e:
+            print(f" No se pudo actualizar el índice de la biblioteca: {e}\n")
+    
     # 2. Procesamiento de letras
     print("\n Buscando letras...\n")
-    events_with_lyrics = LyricsHandler().process(file_path, 
+    events_with_lyrics = LyricsHandler().process(asset, 
                                                  audio_analysis["events"])
     print(f" eventos mas letra: {len(events_with_lyrics)}\n")
     
+    # 2a. Ajustar los eventos al presupuesto de imágenes, repartido por toda la canción
+    # (después de las letras: las líneas sin evento añaden eventos 'lyric' con difusión)
+    planner = EventBudgetPlanner()
+    duration = audio_analysis["metadata"]["duration"]
+    max_images = planner.budget(duration, image_budget)
+    events_with_lyrics = planner.plan(events_with_lyrics, duration, max_images)
+    print(f" eventos tras el presupuesto de imágenes ({max_images}): {len(events_with_lyrics)}\n")
+    
     # 3. Procesamiento de portada del álbum
     album_processor = AlbumProcessor(n_colors=5)
     print("\n Buscando colores...\n")
-    color_palette = album_processor.process_album(file_path)
+    color_palette = album_processor.process_album(asset)
     print(f" colores encontrados: {color_palette}\n")
     
     # 4. Crear directorio para imágenes
@@ -280,7 +216,9 @@ def process_song(file_path: str, output_dir: str, style_preset="minimal_geometri
         events_with_lyrics,
         output_dir=image_dir,
         style_preset=style_preset,
-        color_palette=color_palette
+        color_palette=color_palette,
+        cover_path=cover_image,
+        max_images=max_images
     )
 
     # 6. Añadir texto a las imágenes
@@ -312,23 +250,15 @@ def process_song(file_path: str, output_dir: str, style_preset="minimal_geometri
         'events_count': len(events_with_lyrics),
         'color_palette': color_palette.get('hex_colors', []) if color_palette else [],
         'created_at': datetime.now().isoformat(),
-        'has_cover': cover_path is not None
+        'has_cover': cover_image is not None
     }
 
     # Inyectar metadatos en el video (para reproductores externos)
-    video_success = inject_video_metadata(output_video, final_metadata, cover_path)
+    video_success = inject_video_metadata(output_video, final_metadata, asset.cover if cover_image is not None else None)
 
     # Guardar metadatos en archivo .syn (para tu interfaz)
     metadata_success = save_updated_metadata(output_video, final_metadata)
 
-    # Limpiar archivo temporal de portada
-    if cover_path and os.path.exists(cover_path):
-        try:
-            os.unlink(cover_path)
-            print(" Archivo temporal de portada eliminado\n")
-        except:
-            pass
-
     if video_success and metadata_success:
         print(" Metadatos agregados al video Y al archivo .syn\n")
     else: